@@ -1,13 +1,70 @@
-from fastapi import APIRouter, Header
-from app.api.api_v1.endpoints import warehouses, shipments
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse
+from app.api.api_v1.endpoints import warehouses, shipments, analytics
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.profiler import ProfilerBusy, collapsed, profiler
+from app.core.tracing import tracer
 
 api_router = APIRouter()
 
 # Include routers
 api_router.include_router(warehouses.router, prefix="/warehouses", tags=["warehouses"])
 api_router.include_router(shipments.router, prefix="/shipments", tags=["shipments"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 
 # Health check route with operation-name header
 @api_router.get("/ping", tags=["health"])
 def ping(operation_name: str = Header(..., alias="operation-name")):
     return {"msg": "pong", "operation": operation_name}
+
+
+# Process metrics (write counts, DB statements) used by the replication benchmark
+@api_router.get("/metrics", tags=["health"])
+def read_metrics(operation_name: str = Header(..., alias="operation-name")):
+    return {"server_id": settings.SERVER_ID, "metrics": metrics.snapshot()}
+
+
+# This server's spans of one trace (TRACE_EXPORTER=memory or jsonl)
+@api_router.get("/traces/{trace_id}", tags=["health"])
+def read_trace(trace_id: str, operation_name: str = Header(..., alias="operation-name")):
+    if not tracer.enabled:
+        raise HTTPException(status_code=404, detail="Tracing is not enabled")
+    return {"server_id": settings.SERVER_ID, "spans": tracer.exporter.find(trace_id)}
+
+
+# Sample this process's stacks for ``seconds`` (API workers and the embedded
+# consumer) and return them collapsed, one ``label;frames count`` line per stack
+@api_router.post("/admin/profile", tags=["admin"], response_class=PlainTextResponse)
+def profile(
+    seconds: float = 10.0,
+    interval_ms: float = 5.0,
+    operation_name: str = Header(..., alias="operation-name"),
+    admin_token: str = Header("", alias="X-Admin-Token")
+):
+    if not settings.ADMIN_TOKEN or admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if not 0 < seconds <= settings.PROFILE_MAX_SECONDS or interval_ms < 1:
+        raise HTTPException(status_code=422, detail=f"seconds must be in (0, {settings.PROFILE_MAX_SECONDS}]"
+                                                    " and interval_ms at least 1")
+    try:
+        stacks = profiler.profile(seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return collapsed(stacks)
+
+
+# Embedded consumer state (EMBEDDED_CONSUMER=true); 503 while it is down
+@api_router.get("/health/consumer", tags=["health"])
+def consumer_health(
+    request: Request,
+    response: Response,
+    operation_name: str = Header(..., alias="operation-name")
+):
+    event_consumer = getattr(request.app.state, "event_consumer", None)
+    if event_consumer is None:
+        return {"server_id": settings.SERVER_ID, "embedded": False}
+    health = event_consumer.health()
+    if not (health["running"] and health["connected"]):
+        response.status_code = 503
+    return dict({"server_id": settings.SERVER_ID, "embedded": True}, **health)
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Header, Query
+from typing import Optional
+from app.core.config import settings
+from app.services.analytics import shipment_analytics
+
+router = APIRouter()
+
+
+@router.get("/")
+def read_analytics(
+    bins: int = Query(20, ge=1, le=1000),
+    top: int = Query(20, ge=1, le=500),
+    operation_name: str = Header(..., alias="operation-name")
+):
+    """Status breakdown, weight distribution and origin/destination flows of
+    every shipment on this server (archived ones included), in one call"""
+    return shipment_analytics.query(lambda snapshot: {
+        "server_id": settings.SERVER_ID,
+        "shipment_count": len(snapshot),
+        "status": snapshot.status_breakdown(),
+        "weights": snapshot.weight_distribution(bins),
+        "flows": snapshot.flow_matrix(top)
+    })
+
+
+@router.get("/status")
+def read_status_breakdown(
+    warehouse_id: Optional[int] = None,
+    operation_name: str = Header(..., alias="operation-name")
+):
+    """Shipment count and total weight per status"""
+    return shipment_analytics.query(lambda snapshot: snapshot.status_breakdown(warehouse_id))
+
+
+@router.get("/weights")
+def read_weight_distribution(
+    bins: int = Query(20, ge=1, le=1000),
+    status: Optional[str] = None,
+    warehouse_id: Optional[int] = None,
+    operation_name: str = Header(..., alias="operation-name")
+):
+    """Weight histogram, percentiles and totals, optionally for one status or warehouse"""
+    return shipment_analytics.query(lambda snapshot: snapshot.weight_distribution(bins, status, warehouse_id))
+
+
+@router.get("/flows")
+def read_flow_matrix(
+    top: int = Query(20, ge=1, le=500),
+    status: Optional[str] = None,
+    warehouse_id: Optional[int] = None,
+    operation_name: str = Header(..., alias="operation-name")
+):
+    """Origin (rows) by destination (columns) shipment counts and weights over
+    the ``top`` busiest places"""
+    return shipment_analytics.query(lambda snapshot: snapshot.flow_matrix(top, status, warehouse_id))
@@ -1,13 +1,30 @@
 from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.db.session import get_db
-from app.schemas.logistic import Shipment, ShipmentCreate, ShipmentUpdate
-from app.services.logistic_service import ShipmentService
+from app.schemas.logistic import Shipment, ShipmentCreate, ShipmentUpdate, ShipmentWithWarehouse
+from app.services.logistic_service import ShipmentService, TombstoneService
+from app.core.config import settings
+from app.core.partitioning import forward_read, forward_write, holds_locally, partition_map
 
 router = APIRouter()
 
 
+def forward_to_holders(request: Request, shipment):
+    """Serve a row of a partition held elsewhere from its holders: the local copy
+    gets no more events and may be stale. Looked up by tracking number, since
+    ids are assigned per server."""
+    owners = partition_map.owners(partition_map.partition_for(shipment.warehouse_id))
+    forwarded = forward_read(request, owners, path=f"{settings.API_V1_STR}/shipments/tracking/{shipment.tracking_number}")
+    if forwarded is None:
+        raise HTTPException(status_code=503, detail="No server holding this shipment's partition is reachable")
+    return forwarded
+
+# Response fields of the Shipment schema, in order, for the fast list path
+SHIPMENT_FIELDS = list(Shipment.model_fields)
+
+
 @router.post("/", response_model=Shipment)
 def create_shipment(
     shipment: ShipmentCreate,
@@ -16,6 +33,9 @@ def create_shipment(
     db: Session = Depends(get_db)
 ):
     """Create a new shipment - This API acts as an event with operation-name header"""
+    forwarded = forward_write(request, shipment.warehouse_id, shipment.model_dump(mode="json"))
+    if forwarded is not None:
+        return forwarded
     return ShipmentService.create_shipment(db, shipment, operation_name, request)
 
 
@@ -23,21 +43,56 @@ def create_shipment(
 def read_shipments(
     skip: int = 0,
     limit: int = 100,
+    fast: bool = False,
     operation_name: str = Header(..., alias="operation-name"),
     db: Session = Depends(get_db)
 ):
-    """Get all shipments - This API acts as an event with operation-name header"""
+    """Get all shipments - This API acts as an event with operation-name header.
+    
+    With ``fast=true`` the schema's columns are selected as tuples and encoded
+    with orjson, skipping ORM objects and per-row validation (same JSON shape).
+    """
+    if fast:
+        rows = ShipmentService.get_shipment_rows(db, SHIPMENT_FIELDS, skip=skip, limit=limit)
+        return ORJSONResponse([dict(zip(SHIPMENT_FIELDS, row)) for row in rows])
     return ShipmentService.get_shipments(db, skip=skip, limit=limit)
 
 
+@router.get("/with-warehouse", response_model=List[ShipmentWithWarehouse])
+def read_shipments_with_warehouse(
+    skip: int = 0,
+    limit: int = 100,
+    operation_name: str = Header(..., alias="operation-name"),
+    db: Session = Depends(get_db)
+):
+    """Get shipments with their warehouse embedded, loaded in the same query"""
+    return ShipmentService.get_shipments_with_warehouse(db, skip=skip, limit=limit)
+
+
 @router.get("/{shipment_id}", response_model=Shipment)
 def read_shipment(
     shipment_id: int,
+    request: Request,
     operation_name: str = Header(..., alias="operation-name"),
     db: Session = Depends(get_db)
 ):
     """Get a specific shipment - This API acts as an event with operation-name header"""
     shipment = ShipmentService.get_shipment(db, shipment_id)
+    if not shipment:
+        raise HTTPException(status_code=404, detail="Shipment not found")
+    if not holds_locally(shipment.warehouse_id):
+        return forward_to_holders(request, shipment)
+    return shipment
+
+
+@router.get("/{shipment_id}/with-warehouse", response_model=ShipmentWithWarehouse)
+def read_shipment_with_warehouse(
+    shipment_id: int,
+    operation_name: str = Header(..., alias="operation-name"),
+    db: Session = Depends(get_db)
+):
+    """Get a specific shipment with its warehouse embedded"""
+    shipment = ShipmentService.get_shipment_with_warehouse(db, shipment_id)
     if not shipment:
         raise HTTPException(status_code=404, detail="Shipment not found")
     return shipment
@@ -46,13 +101,21 @@ def read_shipment(
 @router.get("/tracking/{tracking_number}", response_model=Shipment)
 def read_shipment_by_tracking(
     tracking_number: str,
+    request: Request,
     operation_name: str = Header(..., alias="operation-name"),
     db: Session = Depends(get_db)
 ):
     """Get shipment by tracking number - This API acts as an event with operation-name header"""
     shipment = ShipmentService.get_shipment_by_tracking(db, tracking_number)
+    if not shipment and settings.PARTITIONING:
+        # Tracking numbers do not reveal the warehouse, so ask the other servers
+        forwarded = forward_read(request, partition_map.servers)
+        if forwarded is not None:
+            return forwarded
     if not shipment:
         raise HTTPException(status_code=404, detail="Shipment not found")
+    if not holds_locally(shipment.warehouse_id):
+        return forward_to_holders(request, shipment)
     return shipment
 
 
@@ -66,6 +129,8 @@ def update_shipment(
 ):
     """Update a shipment - This API acts as an event with operation-name header"""
     shipment = ShipmentService.update_shipment(db, shipment_id, shipment_update, operation_name, request)
+    if not shipment and TombstoneService.superseded(db, "shipment", request):
+        raise HTTPException(status_code=410, detail="Shipment was deleted by a later write")
     if not shipment:
         raise HTTPException(status_code=404, detail="Shipment not found")
     return shipment
@@ -80,6 +145,8 @@ def delete_shipment(
 ):
     """Delete a shipment - This API acts as an event with operation-name header"""
     success = ShipmentService.delete_shipment(db, shipment_id, operation_name, request)
+    if not success and TombstoneService.superseded(db, "shipment", request, is_delete=True):
+        raise HTTPException(status_code=410, detail="Shipment was already deleted")
     if not success:
         raise HTTPException(status_code=404, detail="Shipment not found")
     return {"message": "Shipment deleted successfully"}
\ No newline at end of file
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.db.session import get_db
-from app.schemas.logistic import Warehouse, WarehouseCreate, WarehouseUpdate
-from app.services.logistic_service import WarehouseService
+from app.schemas.logistic import Warehouse, WarehouseCreate, WarehouseUpdate, WarehouseStats, WarehouseWithShipments
+from app.services.logistic_service import WarehouseService, WarehouseStatsService, TombstoneService
+from app.core.partitioning import forward_if_not_held
 
 router = APIRouter()
 
@@ -30,6 +31,21 @@ def read_warehouses(
     return WarehouseService.get_warehouses(db, skip=skip, limit=limit)
 
 
+@router.get("/with-shipments", response_model=List[WarehouseWithShipments])
+def read_warehouses_with_shipments(
+    skip: int = 0,
+    limit: int = 100,
+    shipment_skip: int = Query(0, ge=0),
+    shipment_limit: int = Query(20, ge=0, le=1000),
+    operation_name: str = Header(..., alias="operation-name"),
+    db: Session = Depends(get_db)
+):
+    """Warehouses with a page of each one's shipments (shipment_skip/shipment_limit per warehouse)"""
+    return WarehouseService.get_warehouses_with_shipments(
+        db, skip=skip, limit=limit, shipment_skip=shipment_skip, shipment_limit=shipment_limit
+    )
+
+
 @router.get("/{warehouse_id}", response_model=Warehouse)
 def read_warehouse(
     warehouse_id: int,
@@ -43,6 +59,42 @@ def read_warehouse(
     return warehouse
 
 
+@router.get("/{warehouse_id}/with-shipments", response_model=WarehouseWithShipments)
+def read_warehouse_with_shipments(
+    warehouse_id: int,
+    request: Request,
+    shipment_skip: int = Query(0, ge=0),
+    shipment_limit: int = Query(20, ge=0, le=1000),
+    operation_name: str = Header(..., alias="operation-name"),
+    db: Session = Depends(get_db)
+):
+    """Get a warehouse with a page of its shipments"""
+    forwarded = forward_if_not_held(request, warehouse_id)
+    if forwarded is not None:
+        return forwarded
+    warehouse = WarehouseService.get_warehouse(db, warehouse_id)
+    if not warehouse:
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+    WarehouseService.load_shipment_pages(db, [warehouse], shipment_skip, shipment_limit)
+    return warehouse
+
+
+@router.get("/{warehouse_id}/stats", response_model=WarehouseStats)
+def read_warehouse_stats(
+    warehouse_id: int,
+    request: Request,
+    operation_name: str = Header(..., alias="operation-name"),
+    db: Session = Depends(get_db)
+):
+    """Shipment counts by status and total weight, maintained incrementally on every write"""
+    forwarded = forward_if_not_held(request, warehouse_id)
+    if forwarded is not None:
+        return forwarded
+    if not WarehouseService.get_warehouse(db, warehouse_id):
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+    return WarehouseStatsService.get_stats(db, warehouse_id)
+
+
 @router.put("/{warehouse_id}", response_model=Warehouse)
 def update_warehouse(
     warehouse_id: int,
@@ -53,6 +105,8 @@ def update_warehouse(
 ):
     """Update a warehouse - This API acts as an event with operation-name header"""
     warehouse = WarehouseService.update_warehouse(db, warehouse_id, warehouse_update, operation_name, request)
+    if not warehouse and TombstoneService.superseded(db, "warehouse", request, warehouse_id):
+        raise HTTPException(status_code=410, detail="Warehouse was deleted by a later write")
     if not warehouse:
         raise HTTPException(status_code=404, detail="Warehouse not found")
     return warehouse
@@ -67,6 +121,8 @@ def delete_warehouse(
 ):
     """Delete a warehouse - This API acts as an event with operation-name header"""
     success = WarehouseService.delete_warehouse(db, warehouse_id, operation_name, request)
+    if not success and TombstoneService.superseded(db, "warehouse", request, warehouse_id, is_delete=True):
+        raise HTTPException(status_code=410, detail="Warehouse was already deleted")
     if not success:
         raise HTTPException(status_code=404, detail="Warehouse not found")
     return {"message": "Warehouse deleted successfully"}
\ No newline at end of file
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Shipment Archive
+Move delivered shipments to the archive now instead of waiting for the
+background pass (e.g. the first time ARCHIVE_AFTER_HOURS is turned on)
+
+Usage: SERVER_ID=A ARCHIVE_AFTER_HOURS=720 python -m app.archive run
+"""
+
+import sys
+import argparse
+import logging
+from app.db.session import init_db
+from app.db.archive import shipment_archive
+from app.services.archiver import Archiver
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive delivered shipments")
+    parser.add_argument("command", choices=["run"])
+    args = parser.parse_args()
+    
+    if shipment_archive is None:
+        logger.error("ARCHIVE_AFTER_HOURS is not set")
+        sys.exit(1)
+    init_db()
+    moved = Archiver(shipment_archive).run_pass()
+    logger.info(f"{moved} shipments archived")
+
+
+if __name__ == "__main__":
+    main()
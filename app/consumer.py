@@ -5,22 +5,34 @@ Run this script to consume events from other servers in the distributed system
 """
 
 import sys
+import time
+import signal
 import logging
 from app.core.rabbitmq import DistributedEventConsumer
 from app.core.config import settings
+from app.core.profiler import profile_to_file
+from app.core.logs import configure_logging
+from app.services.consistency import PositionTracker
+from app.services.archiver import Archiver
+from app.db.archive import shipment_archive
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 def main():
     logger.info(f"Starting distributed consumer for server {settings.SERVER_ID}")
     logger.info(f"Will consume events from servers: {settings.ALLOWED_SERVERS}")
     
-    consumer = DistributedEventConsumer()
+    positions = PositionTracker() if settings.CONSISTENCY_TOKENS else None
+    consumer = DistributedEventConsumer(positions=positions)
+    if shipment_archive is not None:
+        Archiver(shipment_archive).start()
+    
+    # kill -USR1 <pid> profiles the running consumer without restarting it
+    signal.signal(signal.SIGUSR1, lambda *_: profile_to_file(
+        settings.PROFILE_SECONDS, f"profile_{settings.SERVER_ID}_{int(time.time())}.collapsed"
+    ))
     
     try:
         consumer.start_consuming()
@@ -0,0 +1,307 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.rabbitmq import (
+    EXCHANGE_NAME, DistributedEventConsumer, decode_event, retry_route,
+    retry_queue_name, dead_letter_queue_name
+)
+from app.core.tracing import tracer
+from app.core.transport import Delivery
+from app.core.lanes import LaneScheduler, lane_routing_key, lane_stats, lane_weight
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 5.0
+
+
+class LaneBuffer:
+    """Deliveries received from every lane queue, handed to the consumer task in
+    lane-weight order (see LaneScheduler); with lanes off, plain FIFO"""
+
+    def __init__(self, lanes: List[str]):
+        self.scheduler = LaneScheduler(lanes)
+        self.ready = asyncio.Event()
+        self.closed = False
+
+    def put(self, lane: str, delivery: Delivery) -> None:
+        self.scheduler.put(lane, delivery)
+        self.ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self.ready.set()
+
+    async def next(self) -> Optional[Tuple[str, Delivery]]:
+        while True:
+            item = self.scheduler.pop()
+            if item is not None or self.closed:
+                return item
+            self.ready.clear()
+            await self.ready.wait()
+
+
+class AioPikaSource:
+    """Deliveries from RabbitMQ through aio-pika, on the API's event loop"""
+
+    def __init__(self, consumer: DistributedEventConsumer):
+        self.connection = consumer.connection
+        self.amqp = None
+        self.channel = None
+        self.buffer: Optional[LaneBuffer] = None
+        self.consumers: List[Tuple[Any, str]] = []
+        self.messages: Dict[int, Any] = {}
+
+    @property
+    def is_open(self) -> bool:
+        return self.amqp is not None and not self.amqp.is_closed
+
+    async def open(self) -> None:
+        import aio_pika
+
+        self.amqp = await aio_pika.connect_robust(
+            host=settings.RABBITMQ_HOST,
+            port=settings.RABBITMQ_PORT,
+            login=settings.RABBITMQ_USERNAME,
+            password=settings.RABBITMQ_PASSWORD,
+            virtualhost=settings.RABBITMQ_VIRTUAL_HOST
+        )
+        # Publisher confirms are on by default, so retry republishes are durable before the ack
+        self.channel = await self.amqp.channel()
+
+        # Same topology RabbitMQConnection.connect declares
+        queue_name = self.connection.queue_name
+        exchange = await self.channel.declare_exchange(EXCHANGE_NAME, aio_pika.ExchangeType.TOPIC, durable=True)
+        queue = await self.channel.declare_queue(queue_name, durable=True)
+        for delay_ms in settings.EVENT_RETRY_DELAYS_MS:
+            await self.channel.declare_queue(
+                retry_queue_name(queue_name, delay_ms),
+                durable=True,
+                arguments={
+                    "x-message-ttl": delay_ms,
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": queue_name
+                }
+            )
+        await self.channel.declare_queue(dead_letter_queue_name(queue_name), durable=True)
+        for routing_key in self.connection.binding_keys():
+            await queue.bind(exchange, routing_key=routing_key)
+        lane_queues = self.connection.lane_queues()
+        queues = {queue_name: queue}
+        if len(lane_queues) == 1:
+            # As in RabbitMQConnection.declare_lanes: take events peers published into lanes
+            for routing_key in self.connection.binding_keys():
+                await queue.bind(exchange, routing_key=f"{routing_key}.*")
+        for lane, lane_queue in lane_queues:
+            if lane_queue in queues:
+                continue
+            queues[lane_queue] = await self.channel.declare_queue(lane_queue, durable=True)
+            for routing_key in self.connection.binding_keys():
+                await queues[lane_queue].bind(exchange, routing_key=lane_routing_key(routing_key, lane))
+
+        self.buffer = LaneBuffer([lane for lane, _ in lane_queues])
+        for lane, lane_queue in lane_queues:
+            # Qos applies to the consumers started after it: a prefetch per lane, by weight
+            await self.channel.set_qos(prefetch_count=settings.CONSUMER_PREFETCH_COUNT * lane_weight(lane))
+            tag = await queues[lane_queue].consume(lambda message, lane=lane: self.receive(lane, message))
+            self.consumers.append((queues[lane_queue], tag))
+
+    async def receive(self, lane: str, message) -> None:
+        self.messages[message.delivery_tag] = message
+        self.buffer.put(lane, Delivery(
+            body=message.body,
+            routing_key=message.routing_key,
+            delivery_tag=message.delivery_tag,
+            headers=dict(message.headers or {}),
+            content_type=message.content_type,
+            redelivered=message.redelivered
+        ))
+
+    async def next(self) -> Optional[Tuple[str, Delivery]]:
+        return await self.buffer.next()
+
+    async def ack(self, delivery: Delivery) -> None:
+        await self.messages.pop(delivery.delivery_tag).ack()
+
+    async def publish(self, queue: str, body: bytes, headers: Dict[str, Any], content_type: Optional[str]) -> None:
+        import aio_pika
+
+        await self.channel.default_exchange.publish(
+            aio_pika.Message(body, headers=headers, content_type=content_type,
+                             delivery_mode=aio_pika.DeliveryMode.PERSISTENT),
+            routing_key=queue
+        )
+
+    async def stop(self) -> None:
+        # Cancels the consumers; prefetched but unprocessed messages are requeued on close
+        for queue, tag in self.consumers:
+            await queue.cancel(tag)
+        self.consumers = []
+        if self.buffer is not None:
+            self.buffer.close()
+
+    async def close(self) -> None:
+        if self.amqp is not None:
+            await self.amqp.close()
+
+
+class TransportSource:
+    """Deliveries from a blocking Transport (memory or unix) whose consume loop
+    runs in a thread and hands each delivery over to the event loop"""
+
+    def __init__(self, consumer: DistributedEventConsumer):
+        self.consumer = consumer
+        self.buffer: Optional[LaneBuffer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.consumer.connection.is_connected
+
+    async def open(self) -> None:
+        loop = asyncio.get_running_loop()
+        connection = self.consumer.connection
+        if not connection.is_connected and not await asyncio.to_thread(connection.connect):
+            raise ConnectionError(f"Cannot connect to {settings.EVENT_TRANSPORT} transport")
+        
+        transport = connection.transport
+        transport.confirm_delivery()
+        self.buffer = LaneBuffer([lane for lane, _ in connection.lane_queues()])
+        for lane, queue_name in connection.lane_queues():
+            transport.set_prefetch(settings.CONSUMER_PREFETCH_COUNT * lane_weight(lane))
+            transport.consume(queue_name, lambda delivery, lane=lane:
+                              loop.call_soon_threadsafe(self.buffer.put, lane, delivery))
+        
+        def consume_forever():
+            try:
+                transport.start_consuming()
+            finally:
+                # Ends the event loop side too, so a dropped connection is reopened
+                loop.call_soon_threadsafe(self.buffer.close)
+        
+        self.thread = threading.Thread(target=consume_forever, name="event-consumer", daemon=True)
+        self.thread.start()
+
+    async def next(self) -> Optional[Tuple[str, Delivery]]:
+        return await self.buffer.next()
+
+    async def ack(self, delivery: Delivery) -> None:
+        await asyncio.to_thread(self.consumer.connection.transport.ack, delivery.delivery_tag)
+
+    async def publish(self, queue: str, body: bytes, headers: Dict[str, Any], content_type: Optional[str]) -> None:
+        await asyncio.to_thread(self.consumer.connection.transport.publish,
+                                '', queue, body, headers=headers, content_type=content_type)
+
+    async def stop(self) -> None:
+        self.consumer.connection.transport.stop_consuming()
+
+    async def close(self) -> None:
+        if self.thread is not None:
+            await asyncio.to_thread(self.thread.join, 5)
+        # Closing the transport requeues deliveries that were buffered but never processed
+        await asyncio.to_thread(self.consumer.connection.disconnect)
+
+
+class AsyncEventConsumer:
+    """Runs a DistributedEventConsumer as a task on the API's event loop.
+
+    Events are applied one at a time, in delivery order (across priority lanes,
+    by lane weight), with the blocking database work pushed to a thread so
+    requests keep being served. On
+    shutdown the event being applied is finished and acked before the
+    connection closes; anything still prefetched goes back to the queue.
+    """
+
+    def __init__(self, consumer: DistributedEventConsumer):
+        self.consumer = consumer
+        self.source = None
+        self.task: Optional[asyncio.Task] = None
+        self.stopping = False
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.last_event_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def create_source(self):
+        # A connection built around an explicit transport (tests, benchmarks) keeps it
+        if self.consumer.connection.transport is None and settings.EVENT_TRANSPORT == "rabbitmq":
+            return AioPikaSource(self.consumer)
+        return TransportSource(self.consumer)
+
+    def start(self) -> None:
+        self.stopping = False
+        self.task = asyncio.create_task(self.run(), name="event-consumer")
+
+    async def run(self) -> None:
+        while not self.stopping:
+            self.source = self.create_source()
+            try:
+                await self.source.open()
+                logger.info(f"Embedded consumer started for server {self.consumer.server_id}")
+                while True:
+                    received = await self.source.next()
+                    if received is None or self.stopping:
+                        break
+                    await self.handle(*received)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Embedded consumer error: {e}")
+            finally:
+                await self.source.close()
+            if not self.stopping:
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def handle(self, lane: str, delivery: Delivery) -> None:
+        self.in_flight += 1
+        try:
+            try:
+                message = decode_event(delivery.body)
+                lane_stats.record(lane, message)
+                with tracer.consuming(delivery.headers, message):
+                    await asyncio.to_thread(self.consumer.process_distributed_event, message)
+                self.processed += 1
+            except Exception as e:
+                logger.error(f"Error processing distributed event: {e}")
+                self.failed += 1
+                target_queue, headers = retry_route(
+                    self.consumer.connection.queue_name, delivery.headers, str(e), getattr(e, "retryable", True)
+                )
+                await self.source.publish(target_queue, delivery.body, headers, delivery.content_type)
+            await self.source.ack(delivery)
+            self.last_event_at = time.time()
+        finally:
+            self.in_flight -= 1
+
+    async def stop(self, timeout: float) -> None:
+        """Stop taking new events and wait up to ``timeout`` seconds for the current one"""
+        if self.task is None:
+            return
+        self.stopping = True
+        if self.source is not None:
+            await self.source.stop()
+        try:
+            await asyncio.wait_for(self.task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Embedded consumer did not drain within {timeout}s")
+        except Exception as e:
+            logger.error(f"Embedded consumer stopped with error: {e}")
+        self.task = None
+
+    def health(self) -> Dict[str, Any]:
+        running = self.task is not None and not self.task.done()
+        return {
+            "running": running,
+            "connected": self.source is not None and self.source.is_open,
+            "queue": self.consumer.connection.queue_name,
+            "processed": self.processed,
+            "failed": self.failed,
+            "in_flight": self.in_flight,
+            "last_event_at": self.last_event_at,
+            "last_error": self.last_error,
+            "lanes": lane_stats.snapshot(),
+        }
@@ -1,11 +1,23 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # Database
     PROJECT_NAME: str = "Logistic Distributed System"
     PROJECT_VERSION: str = "1.0.0"
     LOG_LEVEL: str = "INFO"
+    # Logs are queued and written by a background thread, as "text" or "json"
+    # (one structured record per line). LOG_SAMPLE_RATES keeps that fraction of a
+    # category's INFO records (category: the record's ``extra`` category, else
+    # its logger name); warnings and errors are always written
+    LOG_FORMAT: str = "text"
+    LOG_SAMPLE_RATES: Dict[str, float] = {
+        "event.publish": 0.01,
+        "event.consume": 0.01,
+        "event.apply": 0.01,
+        "replication.request": 0.01,
+        "uvicorn.access": 0.01
+    }
     DATABASE_URL: str = "sqlite:///./logistic.db"
     VERSION: str = "1.0.0"
     DESCRIPTION: str = "Distributed Logistic System for Event Consumption"
@@ -18,6 +30,91 @@ class Settings(BaseSettings):
     RABBITMQ_PASSWORD: str = "tarnasi"
     RABBITMQ_VIRTUAL_HOST: str = "/"
     
+    # Event transport: "rabbitmq" (pika), "memory" (in-process broker stand-in)
+    # or "unix" (local broker for co-located servers, see app/local_broker.py)
+    EVENT_TRANSPORT: str = "rabbitmq"
+    
+    # Local Broker Configuration (EVENT_TRANSPORT=unix)
+    LOCAL_BROKER_SOCKET: str = "/tmp/logistic_events.sock"
+    LOCAL_BROKER_LOG: str = "./local_broker.log"
+    LOCAL_BROKER_FSYNC: bool = False
+    # Rewrite the journal without acked messages once this many dead lines pile up
+    LOCAL_BROKER_COMPACT_AFTER: int = 10000
+    
+    # Publishing: "direct" (each process owns a broker connection) or "sidecar"
+    # (API workers forward events to one publisher process per server, see start_server.py --prod)
+    PUBLISHER_MODE: str = "direct"
+    PUBLISHER_SOCKET: str = ""
+    
+    # Production launcher (WORKERS=0 means one worker per CPU core)
+    WORKERS: int = 0
+    SHUTDOWN_TIMEOUT: int = 30
+    
+    # Consumer Retry Configuration
+    # Delay tiers (milliseconds) a failed event waits in before being redelivered;
+    # once every tier is exhausted the event is parked in the dead-letter queue
+    EVENT_RETRY_DELAYS_MS: List[int] = [1000, 10000, 60000]
+    CONSUMER_PREFETCH_COUNT: int = 10
+    
+    # Priority lanes: events are published to a lane picked by operation-name
+    # prefix (LANE_OPERATIONS) or event_type (LANE_EVENT_TYPES), each consumed
+    # from its own queue (server_X_events.{lane}; the "default" lane keeps
+    # server_X_events), and consumers take from the lanes in LANE_WEIGHTS proportion
+    PRIORITY_LANES: bool = False
+    LANE_WEIGHTS: Dict[str, int] = {"urgent": 8, "default": 1}
+    LANE_EVENT_TYPES: Dict[str, str] = {
+        "shipment.updated": "urgent",
+        "shipment.deleted": "urgent",
+        "warehouse.updated": "urgent"
+    }
+    LANE_OPERATIONS: Dict[str, str] = {}
+    
+    # Run the consumer as an asyncio task inside the API process instead of a
+    # separate app/consumer.py process; events are applied without an HTTP round trip
+    EMBEDDED_CONSUMER: bool = False
+    CONSUMER_DRAIN_TIMEOUT: int = 10
+    
+    # Group commit: concurrent writes in one process are collected for up to
+    # GROUP_COMMIT_WINDOW_MS (at most GROUP_COMMIT_MAX_BATCH of them) and
+    # committed in a single transaction by one writer thread
+    GROUP_COMMIT: bool = False
+    GROUP_COMMIT_WINDOW_MS: float = 2.0
+    GROUP_COMMIT_MAX_BATCH: int = 64
+    
+    # Cold tier: shipments delivered (and unchanged) for ARCHIVE_AFTER_HOURS are
+    # moved, ARCHIVE_BATCH_SIZE at a time every ARCHIVE_INTERVAL_SECONDS, to
+    # compressed segments in ARCHIVE_DATABASE_URL; 0 keeps everything hot
+    ARCHIVE_AFTER_HOURS: float = 0.0
+    ARCHIVE_DATABASE_URL: str = "sqlite:///./logistic_archive.db"
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_INTERVAL_SECONDS: float = 60.0
+    ARCHIVE_COMPRESSION_LEVEL: int = 6
+    
+    # GET /api/v1/analytics/* answer from an in-memory columnar snapshot kept
+    # current by this process's shipment writes; with several workers, reload it
+    # in the background once it is ANALYTICS_RELOAD_SECONDS old (0 never)
+    ANALYTICS_RELOAD_SECONDS: float = 0.0
+    
+    # Read-your-writes: write responses carry an X-Consistency-Token naming the
+    # events they published; a GET on another server with that token waits up to
+    # CONSISTENCY_WAIT_MS for those events to be applied there, else redirects to
+    # the origin. Consumers record applied positions every CONSISTENCY_FLUSH_MS
+    CONSISTENCY_TOKENS: bool = False
+    CONSISTENCY_WAIT_MS: float = 500.0
+    CONSISTENCY_FLUSH_MS: float = 10.0
+    
+    # Tracing: "none", "memory" (recent spans, GET /api/v1/traces/{trace_id}) or
+    # "jsonl" (one span per line in TRACE_FILE, default ./traces_{SERVER_ID}.jsonl)
+    TRACE_EXPORTER: str = "none"
+    TRACE_FILE: str = ""
+    
+    # Sampling profiler: POST /api/v1/admin/profile needs X-Admin-Token equal to
+    # ADMIN_TOKEN (empty disables it); SIGUSR1 makes app/consumer.py profile
+    # itself for PROFILE_SECONDS and write ./profile_{SERVER_ID}_{time}.collapsed
+    ADMIN_TOKEN: str = ""
+    PROFILE_SECONDS: float = 30.0
+    PROFILE_MAX_SECONDS: float = 120.0
+    
     # Server Configuration
     SERVER_ID: str = "A"  
     SERVER_HOST: str = "localhost"
@@ -26,6 +123,16 @@ class Settings(BaseSettings):
     # Distributed System Configuration
     ALLOWED_SERVERS: List[str] = ["B", "C", "D"]  
     
+    # Partitioned Replication
+    # Off: every shipment event goes to every server. On: warehouse N belongs to
+    # partition N % PARTITION_COUNT, held by REPLICATION_FACTOR servers picked by
+    # consistent hashing or listed in PARTITION_PLACEMENT ({"0": ["A", "B"], ...});
+    # servers only receive shipment events for partitions they hold
+    PARTITIONING: bool = False
+    PARTITION_COUNT: int = 16
+    REPLICATION_FACTOR: int = 2
+    PARTITION_PLACEMENT: Dict[str, List[str]] = {}
+    
     # Server Endpoints
     SERVER_ENDPOINTS: dict = {
         "A": "http://localhost:8000",
@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+TOKEN_HEADER = "X-Consistency-Token"
+
+# Positions (lane -> sequence) of the events published by the current request
+_published: ContextVar[Optional[Dict[str, str]]] = ContextVar("published_positions", default=None)
+
+
+def format_token(server_id: str, positions: Dict[str, str]) -> str:
+    """``A:default=<seq>,urgent=<seq>``: the origin server and, per lane, the
+    sequence of the last event the write published"""
+    return f"{server_id}:" + ",".join(f"{lane}={seq}" for lane, seq in sorted(positions.items()))
+
+
+def parse_token(token: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    server_id, _, lanes = token.partition(":")
+    try:
+        positions = dict(item.split("=", 1) for item in lanes.split(","))
+    except ValueError:
+        return None
+    if not server_id or not all(positions.values()):
+        return None
+    return server_id, positions
+
+
+@contextmanager
+def collecting_positions() -> Iterator[Dict[str, str]]:
+    """Collect the positions of the events published inside the block (also
+    from the threadpool thread a sync endpoint runs in, which copies the context)"""
+    positions: Dict[str, str] = {}
+    token = _published.set(positions)
+    try:
+        yield positions
+    finally:
+        _published.reset(token)
+
+
+def note_published(lane: str, seq: str) -> None:
+    positions = _published.get()
+    if positions is not None and seq > positions.get(lane, ""):
+        positions[lane] = seq
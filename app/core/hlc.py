@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Callable, Tuple
+from app.core.config import settings
+
+
+def format_stamp(physical: int, logical: int, node: str) -> str:
+    # Fixed-width fields so stamps order correctly as plain strings; the node
+    # (origin server) comes last and breaks ties between concurrent writes
+    return f"{physical:013d}-{logical:06d}-{node}"
+
+
+def parse_stamp(stamp: str) -> Tuple[int, int, str]:
+    physical, logical, node = stamp.split("-", 2)
+    return int(physical), int(logical), node
+
+
+class HybridLogicalClock:
+    """Hybrid logical clock (wall-clock milliseconds + logical counter).
+
+    Stamps from ``now`` are strictly increasing on this server and, after
+    ``update`` has seen a remote stamp, greater than it - so a write made here
+    after applying a replicated one always wins over it, even with clock skew.
+    """
+
+    def __init__(self, node: str, wall_clock: Callable[[], float] = time.time):
+        self.node = node
+        self.wall_clock = wall_clock
+        self.physical = 0
+        self.logical = 0
+        self._lock = threading.Lock()
+
+    def _wall_ms(self) -> int:
+        return int(self.wall_clock() * 1000)
+
+    def now(self) -> str:
+        """Stamp for a local write"""
+        with self._lock:
+            wall = self._wall_ms()
+            if wall > self.physical:
+                self.physical, self.logical = wall, 0
+            else:
+                self.logical += 1
+            return format_stamp(self.physical, self.logical, self.node)
+
+    def update(self, stamp: str) -> None:
+        """Merge a stamp received from another server"""
+        remote_physical, remote_logical, _ = parse_stamp(stamp)
+        with self._lock:
+            wall = self._wall_ms()
+            physical = max(self.physical, remote_physical, wall)
+            if physical == self.physical == remote_physical:
+                self.logical = max(self.logical, remote_logical) + 1
+            elif physical == self.physical:
+                self.logical += 1
+            elif physical == remote_physical:
+                self.logical = remote_logical + 1
+            else:
+                self.logical = 0
+            self.physical = physical
+
+
+# Clock for writes made on this server
+hlc = HybridLogicalClock(settings.SERVER_ID)
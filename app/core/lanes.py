@@ -0,0 +1,104 @@
+import time
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+
+DEFAULT_LANE = "default"
+
+
+def lane_names() -> List[str]:
+    """Lanes this server consumes: every weighted lane when PRIORITY_LANES is on"""
+    if not settings.PRIORITY_LANES:
+        return [DEFAULT_LANE]
+    return list(dict.fromkeys(list(settings.LANE_WEIGHTS) + [DEFAULT_LANE]))
+
+
+def lane_weight(lane: str) -> int:
+    return max(1, int(settings.LANE_WEIGHTS.get(lane, 1)))
+
+
+def lane_for(event_type: str, operation_name: str = "") -> str:
+    """Lane of an event: by operation-name prefix first (so a bulk import can be
+    kept out of the fast lane whatever its events are), then by event_type"""
+    if not settings.PRIORITY_LANES:
+        return DEFAULT_LANE
+    for prefix, lane in settings.LANE_OPERATIONS.items():
+        if operation_name.startswith(prefix):
+            return lane
+    return settings.LANE_EVENT_TYPES.get(event_type, DEFAULT_LANE)
+
+
+def lane_queue_name(queue_name: str, lane: str) -> str:
+    # The default lane keeps the original queue, so turning lanes on loses nothing queued
+    return queue_name if lane == DEFAULT_LANE else f"{queue_name}.{lane}"
+
+
+def lane_routing_key(routing_key: str, lane: str) -> str:
+    return routing_key if lane == DEFAULT_LANE else f"{routing_key}.{lane}"
+
+
+class LaneScheduler:
+    """Buffers deliveries per lane and hands them out by weight.
+
+    Smooth weighted round robin: with weights 8 and 1 the order is eight picks
+    from the first lane spread around one from the second while both have
+    work, and an empty lane's turns go to the others, so a busy bulk lane keeps
+    its share and never starves, yet cannot hold the fast lane back.
+    """
+
+    def __init__(self, lanes: List[str]):
+        self.buffers: Dict[str, Deque[Any]] = {lane: deque() for lane in lanes}
+        self.weights = {lane: lane_weight(lane) for lane in lanes}
+        self.current = {lane: 0 for lane in lanes}
+
+    def __len__(self) -> int:
+        return sum(len(buffer) for buffer in self.buffers.values())
+
+    def put(self, lane: str, item: Any) -> None:
+        self.buffers[lane].append(item)
+
+    def pop(self) -> Optional[Tuple[str, Any]]:
+        ready = [lane for lane, buffer in self.buffers.items() if buffer]
+        if not ready:
+            return None
+        total = 0
+        for lane in ready:
+            self.current[lane] += self.weights[lane]
+            total += self.weights[lane]
+        lane = max(ready, key=self.current.__getitem__)
+        self.current[lane] -= total
+        return lane, self.buffers[lane].popleft()
+
+
+class LaneStats:
+    """Per-lane lag: time from publish on the origin to the start of the apply here"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lanes: Dict[str, Dict[str, float]] = {}
+
+    def record(self, lane: str, message: Dict[str, Any]) -> None:
+        now = time.time()
+        try:
+            lag = max(0.0, now - datetime.fromisoformat(message["timestamp"]).timestamp())
+        except (KeyError, TypeError, ValueError):
+            return
+        lag_ms = lag * 1000
+        metrics.increment(f"lanes.{lane}.events")
+        metrics.increment(f"lanes.{lane}.lag_ms", lag_ms)
+        with self._lock:
+            stats = self._lanes.setdefault(lane, {"events": 0, "last_lag_ms": 0.0, "max_lag_ms": 0.0})
+            stats["events"] += 1
+            stats["last_lag_ms"] = lag_ms
+            stats["max_lag_ms"] = max(stats["max_lag_ms"], lag_ms)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {lane: dict(stats) for lane, stats in self._lanes.items()}
+
+
+# Lag of the events applied in this process
+lane_stats = LaneStats()
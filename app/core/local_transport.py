@@ -0,0 +1,579 @@
+import os
+import json
+import time
+import base64
+import socket
+import struct
+import logging
+import threading
+import itertools
+import queue as queue_module
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.transport import (
+    Delivery, DeliveryCallback, InMemoryBroker, InMemoryTransport, Transport
+)
+
+logger = logging.getLogger(__name__)
+
+# Frame layout: header length, body length, JSON header, raw body
+_FRAME_PREFIX = struct.Struct("!II")
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], body: bytes = b"") -> None:
+    encoded = json.dumps(header, separators=(",", ":")).encode()
+    sock.sendall(_FRAME_PREFIX.pack(len(encoded), len(body)) + encoded + body)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Tuple[Dict[str, Any], bytes]]:
+    """Read one frame; returns None when the peer closed the connection"""
+    prefix = _recv_exact(sock, _FRAME_PREFIX.size)
+    if prefix is None:
+        return None
+    header_len, body_len = _FRAME_PREFIX.unpack(prefix)
+    header = _recv_exact(sock, header_len)
+    body = _recv_exact(sock, body_len) if body_len else b""
+    if header is None or body is None:
+        return None
+    return json.loads(header), body
+
+
+class MessageLog:
+    """Append-only JSON-lines journal that makes the local broker durable.
+
+    Declarations and every enqueued message are appended; removals append a
+    tombstone. On startup ``replay`` rebuilds the broker from the live entries.
+    The file is rewritten without dead entries at startup and again whenever
+    ``compact_after`` dead lines have piled up, so a long-running broker's
+    journal stays proportional to its backlog rather than its traffic.
+    """
+
+    def __init__(self, path: str, fsync: bool = False, compact_after: Optional[int] = None):
+        self.path = path
+        self.fsync = fsync
+        self.compact_after = settings.LOCAL_BROKER_COMPACT_AFTER if compact_after is None else compact_after
+        self._file = None
+        self._lock = threading.Lock()
+        # Live state mirrored from the journal, written out on compaction
+        self._declarations: Dict[Any, Dict[str, Any]] = {}
+        self._messages: Dict[int, Dict[str, Any]] = {}
+        self._dead_lines = 0
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._apply(record)
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            if self.compact_after and self._dead_lines >= self.compact_after:
+                self._compact()
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record["op"]
+        if op == "enq":
+            self._messages[record["id"]] = record
+        elif op == "del":
+            if self._messages.pop(record["id"], None) is not None:
+                self._dead_lines += 1
+            # The tombstone itself is dead as soon as it is written
+            self._dead_lines += 1
+        else:
+            key = (op, record.get("name"), record.get("queue"), record.get("exchange"), record.get("routing_key"))
+            if key in self._declarations:
+                # Redeclared on every client (re)connect
+                self._dead_lines += 1
+            self._declarations[key] = record
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only the live entries (caller holds the lock)"""
+        compacted = self.path + ".compact"
+        with open(compacted, "w") as f:
+            for record in list(self._declarations.values()) + [self._messages[i] for i in sorted(self._messages)]:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        if self._file:
+            self._file.close()
+        os.replace(compacted, self.path)
+        self._file = open(self.path, "a")
+        self._dead_lines = 0
+
+    def declared_exchange(self, exchange: str, exchange_type: str) -> None:
+        self._append({"op": "exchange", "name": exchange, "type": exchange_type})
+
+    def declared_queue(self, queue: str, arguments: Dict[str, Any]) -> None:
+        self._append({"op": "queue", "name": queue, "arguments": arguments})
+
+    def bound(self, queue: str, exchange: str, routing_key: str) -> None:
+        self._append({"op": "bind", "queue": queue, "exchange": exchange, "routing_key": routing_key})
+
+    def enqueued(self, queue: str, message) -> None:
+        self._append({
+            "op": "enq", "id": message.id, "queue": queue,
+            "routing_key": message.routing_key, "headers": message.headers,
+            "content_type": message.content_type,
+            "body": base64.b64encode(message.body).decode()
+        })
+
+    def removed(self, message_id: int) -> None:
+        self._append({"op": "del", "id": message_id})
+
+    def replay(self, broker: InMemoryBroker) -> int:
+        """Load the journal into ``broker``, compact it and start appending; returns live messages"""
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final write after a crash
+                        break
+                    self._apply(record)
+        declarations, messages = list(self._declarations.values()), self._messages
+
+        for record in declarations:
+            if record["op"] == "exchange":
+                broker.declare_exchange(record["name"], record["type"])
+            elif record["op"] == "queue":
+                broker.declare_queue(record["name"], record["arguments"])
+            else:
+                broker.bind_queue(record["queue"], record["exchange"], record["routing_key"])
+        for message_id in sorted(messages):
+            record = messages[message_id]
+            broker.restore(
+                record["queue"], message_id, record["routing_key"],
+                base64.b64decode(record["body"]), record["headers"], record["content_type"]
+            )
+
+        with self._lock:
+            self._compact()
+        return len(messages)
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class _Session:
+    """One client connection to the local broker"""
+
+    def __init__(self, server: "LocalBrokerServer", sock: socket.socket):
+        self.server = server
+        self.sock = sock
+        self.transport = InMemoryTransport(server.broker)
+        self.transport.connect()
+        self._send_lock = threading.Lock()
+
+    def send(self, header: Dict[str, Any], body: bytes = b"") -> None:
+        with self._send_lock:
+            send_frame(self.sock, header, body)
+
+    def deliver(self, queue: str, delivery: Delivery) -> None:
+        try:
+            self.send({
+                "op": "deliver", "queue": queue, "tag": delivery.delivery_tag,
+                "routing_key": delivery.routing_key, "headers": delivery.headers,
+                "content_type": delivery.content_type, "redelivered": delivery.redelivered
+            }, delivery.body)
+        except OSError:
+            # Client went away; closing the session requeues everything unacked
+            pass
+
+    def serve(self) -> None:
+        try:
+            while True:
+                frame = recv_frame(self.sock)
+                if frame is None:
+                    break
+                header, body = frame
+                rid = header.get("rid")
+                try:
+                    result = self.handle(header, body)
+                except Exception as e:
+                    if rid is not None:
+                        self.send({"op": "reply", "rid": rid, "error": str(e)})
+                    continue
+                if rid is not None:
+                    reply_body = b""
+                    if isinstance(result, Delivery):
+                        reply_body = result.body
+                        result = {"tag": result.delivery_tag, "routing_key": result.routing_key,
+                                  "headers": result.headers, "content_type": result.content_type,
+                                  "redelivered": result.redelivered}
+                    self.send({"op": "reply", "rid": rid, "result": result}, reply_body)
+        except OSError:
+            pass
+        finally:
+            self.transport.close()
+            self.sock.close()
+
+    def handle(self, header: Dict[str, Any], body: bytes):
+        op = header["op"]
+        transport = self.transport
+        if op == "publish":
+            transport.publish(header["exchange"], header["routing_key"], body,
+                              header.get("headers"), header.get("content_type"))
+        elif op == "ack":
+            transport.ack(header["tag"])
+        elif op == "nack":
+            transport.nack(header["tag"], header.get("requeue", False))
+        elif op == "declare_exchange":
+            transport.declare_exchange(header["exchange"], header["type"])
+        elif op == "declare_queue":
+            return transport.declare_queue(header["queue"], arguments=header.get("arguments"))
+        elif op == "bind":
+            transport.bind_queue(header["queue"], header["exchange"], header["routing_key"])
+        elif op == "prefetch":
+            transport.set_prefetch(header["count"])
+        elif op == "consume":
+            queue_name = header["queue"]
+            transport.consume(queue_name, lambda delivery: self.deliver(queue_name, delivery))
+        elif op == "get":
+            return transport.get(header["queue"])
+        elif op == "purge":
+            return transport.purge(header["queue"])
+        else:
+            raise ValueError(f"Unknown operation: {op}")
+        return None
+
+
+class LocalBrokerServer:
+    """Broker for co-located servers, listening on a Unix domain socket.
+
+    Routing is done by an ``InMemoryBroker`` so semantics match the RabbitMQ and
+    in-memory transports; ``MessageLog`` keeps queued messages across restarts.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, log_path: Optional[str] = None,
+                 fsync: Optional[bool] = None):
+        self.socket_path = socket_path or settings.LOCAL_BROKER_SOCKET
+        log_path = log_path if log_path is not None else settings.LOCAL_BROKER_LOG
+        fsync = settings.LOCAL_BROKER_FSYNC if fsync is None else fsync
+        self.log = MessageLog(log_path, fsync) if log_path else None
+        self.broker = InMemoryBroker(journal=self.log)
+        self._stop = threading.Event()
+        self._listener = None
+
+    def start(self) -> None:
+        """Restore the journal, bind the socket and serve in background threads"""
+        if self.log:
+            # Replay before attaching the journal so restored entries are not re-logged
+            self.broker.journal = None
+            restored = self.log.replay(self.broker)
+            self.broker.journal = self.log
+            logger.info(f"Restored {restored} queued message(s) from {self.log.path}")
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        self._listener.listen(64)
+
+        threading.Thread(target=self.broker.dispatch_forever, args=(self._stop,), daemon=True).start()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        logger.info(f"Local broker listening on {self.socket_path}")
+
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=_Session(self, sock).serve, daemon=True).start()
+
+    def serve_forever(self) -> None:
+        self.start()
+        self._stop.wait()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.broker.wake()
+        if self._listener:
+            self._listener.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self.log:
+            self.log.close()
+
+
+class UnixSocketTransport(Transport):
+    """Client for ``LocalBrokerServer``.
+
+    Publishes, acks and nacks are fire-and-forget unless ``confirm_delivery`` was
+    called; deliveries arrive on a reader thread and are dispatched to callbacks
+    from ``start_consuming`` on the caller's thread, like pika's blocking channel.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None):
+        self.socket_path = socket_path or settings.LOCAL_BROKER_SOCKET
+        self.sock = None
+        self.confirm = False
+        self._rids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._callbacks: Dict[str, DeliveryCallback] = {}
+        self._deliveries: "queue_module.Queue" = queue_module.Queue()
+        self._send_lock = threading.Lock()
+        self._consuming = False
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def close(self) -> None:
+        self.stop_consuming()
+        sock, self.sock = self.sock, None
+        if sock:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+
+    @property
+    def is_open(self) -> bool:
+        return self.sock is not None
+
+    def _read_loop(self) -> None:
+        sock = self.sock
+        while True:
+            try:
+                frame = recv_frame(sock)
+            except OSError:
+                frame = None
+            if frame is None:
+                break
+            header, body = frame
+            if header["op"] == "deliver":
+                self._deliveries.put((header["queue"], self._delivery(header, body)))
+            else:
+                future = self._pending.pop(header["rid"], None)
+                if future is not None:
+                    future.set_result((header, body))
+        for future in list(self._pending.values()):
+            future.set_exception(ConnectionError("Local broker connection closed"))
+        self._pending.clear()
+        if self.sock is sock:
+            self.sock = None
+
+    @staticmethod
+    def _delivery(header: Dict[str, Any], body: bytes) -> Delivery:
+        return Delivery(
+            body=body,
+            routing_key=header["routing_key"],
+            delivery_tag=header["tag"],
+            headers=header.get("headers") or {},
+            content_type=header.get("content_type"),
+            redelivered=header.get("redelivered", False)
+        )
+
+    def _send(self, header: Dict[str, Any], body: bytes = b"") -> None:
+        if self.sock is None:
+            raise ConnectionError("Not connected to the local broker")
+        with self._send_lock:
+            send_frame(self.sock, header, body)
+
+    def _call(self, header: Dict[str, Any], body: bytes = b""):
+        rid = next(self._rids)
+        future = Future()
+        self._pending[rid] = future
+        self._send(dict(header, rid=rid), body)
+        reply, reply_body = future.result(timeout=30)
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply.get("result"), reply_body
+
+    def declare_exchange(self, exchange: str, exchange_type: str = "topic", durable: bool = True) -> None:
+        self._call({"op": "declare_exchange", "exchange": exchange, "type": exchange_type})
+
+    def declare_queue(self, queue: str, durable: bool = True,
+                      arguments: Optional[Dict[str, Any]] = None) -> int:
+        result, _ = self._call({"op": "declare_queue", "queue": queue, "arguments": arguments})
+        return result
+
+    def bind_queue(self, queue: str, exchange: str, routing_key: str) -> None:
+        self._call({"op": "bind", "queue": queue, "exchange": exchange, "routing_key": routing_key})
+
+    def publish(self, exchange: str, routing_key: str, body: bytes,
+                headers: Optional[Dict[str, Any]] = None,
+                content_type: Optional[str] = None) -> None:
+        header = {"op": "publish", "exchange": exchange, "routing_key": routing_key,
+                  "headers": headers, "content_type": content_type}
+        if self.confirm:
+            self._call(header, body)
+        else:
+            self._send(header, body)
+
+    def confirm_delivery(self) -> None:
+        self.confirm = True
+
+    def set_prefetch(self, count: int) -> None:
+        self._send({"op": "prefetch", "count": count})
+
+    def consume(self, queue: str, callback: DeliveryCallback) -> None:
+        self._callbacks[queue] = callback
+        self._call({"op": "consume", "queue": queue})
+
+    def ack(self, delivery_tag: int) -> None:
+        self._send({"op": "ack", "tag": delivery_tag})
+
+    def nack(self, delivery_tag: int, requeue: bool = False) -> None:
+        self._send({"op": "nack", "tag": delivery_tag, "requeue": requeue})
+
+    def get(self, queue: str) -> Optional[Delivery]:
+        result, body = self._call({"op": "get", "queue": queue})
+        if result is None:
+            return None
+        return self._delivery(result, body)
+
+    def purge(self, queue: str) -> int:
+        result, _ = self._call({"op": "purge", "queue": queue})
+        return result
+
+    def start_consuming(self) -> None:
+        self._consuming = True
+        while self._consuming and self.sock is not None:
+            try:
+                queue_name, delivery = self._deliveries.get(timeout=0.5)
+            except queue_module.Empty:
+                continue
+            self._callbacks[queue_name](delivery)
+
+    def stop_consuming(self) -> None:
+        self._consuming = False
+
+
+class _SidecarClient:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.send_lock = threading.Lock()
+
+    def reply(self, rid: int, error: Optional[str] = None) -> None:
+        header = {"op": "reply", "rid": rid}
+        if error is not None:
+            header["error"] = error
+        try:
+            with self.send_lock:
+                send_frame(self.sock, header)
+        except OSError:
+            pass
+
+
+class PublisherSidecar:
+    """Single broker publisher shared by every API worker of one server.
+
+    Workers connect with ``UnixSocketTransport`` and send publish frames; frames
+    go onto one local queue that a single thread drains into ``connection`` (a
+    regular ``RabbitMQConnection``), so N workers cost one broker connection and
+    one topology declaration. ``stop`` stops accepting, waits for the workers to
+    disconnect and publishes everything still queued before closing upstream.
+    """
+
+    def __init__(self, connection, socket_path: str):
+        self.connection = connection
+        self.socket_path = socket_path
+        self.outbox: "queue_module.Queue" = queue_module.Queue()
+        self.clients = set()
+        self._listener = None
+        self._publisher = None
+
+    def start(self) -> bool:
+        if not self.connection.connect():
+            return False
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        self._listener.listen(64)
+        self._publisher = threading.Thread(target=self._publish_loop, daemon=True)
+        self._publisher.start()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        logger.info(f"Publisher sidecar for server {self.connection.server_id} listening on {self.socket_path}")
+        return True
+
+    def _accept_loop(self) -> None:
+        while True:
+            try:
+                sock, _ = self._listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve_client, args=(_SidecarClient(sock),), daemon=True).start()
+
+    def _serve_client(self, client: _SidecarClient) -> None:
+        self.clients.add(client)
+        try:
+            while True:
+                frame = recv_frame(client.sock)
+                if frame is None:
+                    break
+                header, body = frame
+                if header["op"] == "publish":
+                    self.outbox.put((client, header, body))
+                elif header.get("rid") is not None:
+                    # The sidecar owns the topology; anything else from a worker is a no-op
+                    client.reply(header["rid"])
+        except OSError:
+            pass
+        finally:
+            self.clients.discard(client)
+            client.sock.close()
+
+    def _publish_loop(self) -> None:
+        while True:
+            item = self.outbox.get()
+            if item is None:
+                break
+            client, header, body = item
+            error = None
+            try:
+                self._publish(header, body)
+            except Exception as e:
+                error = str(e)
+                logger.error(f"Sidecar failed to publish event: {e}")
+            if header.get("rid") is not None:
+                client.reply(header["rid"], error)
+
+    def _publish(self, header: Dict[str, Any], body: bytes) -> None:
+        args = (header["exchange"], header["routing_key"], body, header.get("headers"), header.get("content_type"))
+        try:
+            self.connection.transport.publish(*args)
+        except Exception as e:
+            # Broker connection dropped (e.g. missed heartbeats while idle): reconnect once
+            logger.warning(f"Publish failed ({e}), reconnecting")
+            self.connection.disconnect()
+            if not self.connection.connect():
+                raise
+            self.connection.transport.publish(*args)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        if self._listener:
+            self._listener.close()
+            self._listener = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        # Workers publish until their last in-flight request finishes
+        deadline = time.monotonic() + timeout
+        while self.clients and time.monotonic() < deadline:
+            time.sleep(0.1)
+        if self._publisher:
+            self.outbox.put(None)
+            self._publisher.join(timeout=max(1.0, deadline - time.monotonic()))
+            self._publisher = None
+            logger.info(f"Publisher sidecar drained ({self.outbox.qsize()} event(s) left unpublished)")
+        self.connection.disconnect()
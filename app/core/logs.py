@@ -0,0 +1,116 @@
+import sys
+import json
+import queue
+import atexit
+import logging
+import itertools
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed in ``extra``
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class Sampler:
+    """Keeps one in every ``1 / rate`` records of each category in ``rates``
+    (0 drops them all); categories without a rate are always kept"""
+
+    def __init__(self, rates: Dict[str, float]):
+        self.every = {category: max(1, round(1 / rate)) if rate > 0 else 0 for category, rate in rates.items()}
+        self.counters = {category: itertools.count() for category in rates}
+
+    def keep(self, category: str) -> bool:
+        every = self.every.get(category)
+        if every is None:
+            return True
+        return every > 0 and next(self.counters[category]) % every == 0
+
+
+sampler = Sampler(settings.LOG_SAMPLE_RATES)
+
+
+def log_event(logger: logging.Logger, category: str, msg: str, *args: Any, **values: Any) -> None:
+    """INFO record on a hot path (publish, consume, apply): sampled per category
+    before the record is even built, with ``values`` as structured fields.
+    Arguments are only formatted if the record is kept, by the writer thread."""
+    if sampler.keep(category) and logger.isEnabledFor(logging.INFO):
+        values["category"] = category
+        logger.info(msg, *args, extra=values)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and the extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Samples INFO/DEBUG records of loggers that log on every request (e.g.
+    ``uvicorn.access``) by logger name; warnings and errors always pass"""
+
+    def __init__(self, sampler: Sampler):
+        super().__init__()
+        self.sampler = sampler
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.sampler.keep(record.name)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Queues records untouched: the message is only formatted (``msg % args``)
+    by the writer thread, so callers pay for neither formatting nor I/O. Log
+    arguments must therefore not be mutated after the call."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """Route every record through a queue to one background writer thread,
+    sampled per category (LOG_SAMPLE_RATES) and written as text or JSON lines
+    (LOG_FORMAT). Safe to call more than once."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        handler = DeferredQueueHandler(records)
+        handler.addFilter(SamplingFilter(sampler))
+
+        root = logging.getLogger()
+        for existing in root.handlers[:]:
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level or settings.LOG_LEVEL)
+        # uvicorn writes its access log (a line per request) through its own handler
+        access = logging.getLogger("uvicorn.access")
+        if access.handlers:
+            access.handlers = [handler]
+
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+        # Flush what is still queued when the process exits
+        atexit.register(_listener.stop)
@@ -1,9 +1,24 @@
+import time
+import asyncio
+from typing import Callable, Dict
 from fastapi import Request, Response
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
 from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.consistency import TOKEN_HEADER, collecting_positions, format_token, parse_token
+from app.core.partitioning import FORWARDED_HEADER
+from app.db.session import SessionLocal
+from app.services.consistency import ConsistencyService
+from app.core.logs import log_event
+from app.core.tracing import TRACEPARENT, format_traceparent, tracer
 import logging
 
 logger = logging.getLogger(__name__)
 
+WRITE_METHODS = ("POST", "PUT", "DELETE")
+
 class ReplicationMiddleware(BaseHTTPMiddleware):
     """Middleware to handle replicated requests and prevent infinite loops"""
     
@@ -12,13 +27,96 @@ class ReplicationMiddleware(BaseHTTPMiddleware):
         replicated_from = request.headers.get("X-Replicated-From")
         
         if replicated_from:
-            logger.info(f"Processing replicated request from server {replicated_from}")
+            log_event(logger, "replication.request", "Processing replicated request from server %s",
+                      replicated_from, source_server=replicated_from)
             # Add flag to request state to prevent further event publishing
             request.state.is_replicated = True
             request.state.source_server = replicated_from
+            # Origin's HLC stamp, used for per-field last-writer-wins
+            request.state.hlc = request.headers.get("X-Replicated-HLC")
+            # Tracking number of the target row, since ids differ across servers
+            request.state.resource_key = request.headers.get("X-Replicated-Key")
         else:
             request.state.is_replicated = False
             request.state.source_server = None
+            request.state.hlc = None
+            request.state.resource_key = None
         
         response = await call_next(request)
-        return response
\ No newline at end of file
+        
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            metrics.increment("writes.replicated" if replicated_from else "writes.local")
+        return response
+
+
+class TracingMiddleware(BaseHTTPMiddleware):
+    """Opens the request's span: a new trace at API entry, or the continuation of
+    the caller's (e.g. a consumer applying an event) when it sends a traceparent.
+    The response carries the span's traceparent so clients can look the trace up."""
+    
+    async def dispatch(self, request: Request, call_next):
+        if not tracer.enabled:
+            return await call_next(request)
+        
+        with tracer.span(f"{request.method} {request.url.path}", parent=tracer.extract(request.headers),
+                         operation_name=request.headers.get("operation-name"),
+                         replicated_from=request.headers.get("X-Replicated-From")) as span:
+            response = await call_next(request)
+            span.attributes["status_code"] = response.status_code
+        response.headers[TRACEPARENT] = format_traceparent(span.context)
+        return response
+
+
+class ConsistencyMiddleware(BaseHTTPMiddleware):
+    """Read-your-writes across servers.
+
+    A client write's response carries an X-Consistency-Token naming the
+    events it published (origin server, then the sequence per lane). A GET
+    sent to another server with that token is held until those events have
+    been applied there, polling for up to CONSISTENCY_WAIT_MS, and otherwise
+    redirected (307) to the origin, which has the write. Replicated and
+    forwarded requests pass straight through.
+    """
+    
+    def __init__(self, app, session_factory: Callable[[], Session] = SessionLocal):
+        super().__init__(app)
+        self.session_factory = session_factory
+    
+    async def dispatch(self, request: Request, call_next):
+        if request.headers.get("X-Replicated-From") or request.headers.get(FORWARDED_HEADER):
+            return await call_next(request)
+        
+        if request.method in WRITE_METHODS:
+            with collecting_positions() as positions:
+                response = await call_next(request)
+            if positions:
+                response.headers[TOKEN_HEADER] = format_token(settings.SERVER_ID, positions)
+            return response
+        
+        token = parse_token(request.headers.get(TOKEN_HEADER, "")) if request.method == "GET" else None
+        if token is not None and token[0] != settings.SERVER_ID and token[0] in settings.SERVER_ENDPOINTS:
+            source_server, positions = token
+            if not await self.wait_until_applied(source_server, positions):
+                metrics.increment("consistency.redirects")
+                url = settings.SERVER_ENDPOINTS[source_server] + request.url.path
+                if request.url.query:
+                    url += f"?{request.url.query}"
+                return RedirectResponse(url, status_code=307)
+        return await call_next(request)
+    
+    async def wait_until_applied(self, source_server: str, positions: Dict[str, str]) -> bool:
+        deadline = time.monotonic() + settings.CONSISTENCY_WAIT_MS / 1000
+        while True:
+            if await asyncio.to_thread(self.caught_up, source_server, positions):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            metrics.increment("consistency.waits")
+            await asyncio.sleep(0.005)
+    
+    def caught_up(self, source_server: str, positions: Dict[str, str]) -> bool:
+        db = self.session_factory()
+        try:
+            return ConsistencyService.caught_up(db, source_server, positions)
+        finally:
+            db.close()
@@ -0,0 +1,160 @@
+import bisect
+import hashlib
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import httpx
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FORWARDED_HEADER = "X-Forwarded-From"
+VIRTUAL_NODES = 64
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class PartitionMap:
+    """Which servers hold which warehouses.
+
+    A warehouse belongs to partition ``warehouse_id % partition_count``. Each
+    partition is held by ``replication_factor`` servers picked clockwise on a
+    consistent-hash ring (so adding a server only moves the partitions next to
+    it), unless ``placement`` lists its servers explicitly.
+    """
+
+    def __init__(self, servers: List[str], partition_count: int, replication_factor: int,
+                 placement: Optional[Dict[str, List[str]]] = None):
+        self.servers = sorted(servers)
+        self.partition_count = partition_count
+        self.replication_factor = min(replication_factor, len(self.servers))
+        self.placement = {int(partition): owners for partition, owners in (placement or {}).items()}
+        self.ring = sorted(
+            (_ring_hash(f"{server}#{i}"), server)
+            for server in self.servers for i in range(VIRTUAL_NODES)
+        )
+
+    def partition_for(self, warehouse_id: int) -> int:
+        return warehouse_id % self.partition_count
+
+    @lru_cache(maxsize=None)
+    def owners(self, partition: int) -> List[str]:
+        if partition in self.placement:
+            return self.placement[partition]
+        owners = []
+        start = bisect.bisect(self.ring, (_ring_hash(f"partition-{partition}"),))
+        for offset in range(len(self.ring)):
+            server = self.ring[(start + offset) % len(self.ring)][1]
+            if server not in owners:
+                owners.append(server)
+                if len(owners) == self.replication_factor:
+                    break
+        return owners
+
+    def partitions_held_by(self, server_id: str) -> List[int]:
+        return [p for p in range(self.partition_count) if server_id in self.owners(p)]
+
+    def holds(self, server_id: str, warehouse_id: int) -> bool:
+        return server_id in self.owners(self.partition_for(warehouse_id))
+
+
+def partition_routing_key(source_server: str, partition: int) -> str:
+    return f"{source_server}.p{partition}"
+
+
+# Cluster placement: this server plus every server it replicates with
+partition_map = PartitionMap(
+    sorted(set(settings.ALLOWED_SERVERS) | {settings.SERVER_ID}),
+    settings.PARTITION_COUNT,
+    settings.REPLICATION_FACTOR,
+    settings.PARTITION_PLACEMENT
+)
+
+
+def holds_locally(warehouse_id: Optional[int]) -> bool:
+    """Whether this server stores (and receives events for) this warehouse's shipments"""
+    if not settings.PARTITIONING or warehouse_id is None:
+        return True
+    return partition_map.holds(settings.SERVER_ID, warehouse_id)
+
+
+def held_rows_filter(warehouse_column):
+    """SQL condition keeping rows of the partitions this server holds, or None
+    when not partitioning"""
+    if not settings.PARTITIONING:
+        return None
+    held = partition_map.partitions_held_by(settings.SERVER_ID)
+    return (warehouse_column % partition_map.partition_count).in_(held)
+
+
+def forward_read(request: Request, servers: List[str], path: Optional[str] = None) -> Optional[JSONResponse]:
+    """Serve a read for a partition this server does not hold by repeating the
+    GET (on ``path``, default the request's) on the servers that may have it;
+    returns the first 200, else None.
+
+    Forwarded requests are marked so the receiving server answers from its own
+    database instead of forwarding again.
+    """
+    if request.headers.get(FORWARDED_HEADER):
+        return None
+    headers = {
+        "operation-name": request.headers.get("operation-name", ""),
+        FORWARDED_HEADER: settings.SERVER_ID
+    }
+    for server_id in servers:
+        if server_id == settings.SERVER_ID:
+            continue
+        base_url = settings.SERVER_ENDPOINTS.get(server_id)
+        if base_url is None:
+            continue
+        try:
+            response = httpx.get(f"{base_url}{path or request.url.path}", params=request.query_params,
+                                 headers=headers, timeout=5.0)
+        except httpx.HTTPError as e:
+            logger.warning(f"Forwarding {request.url.path} to server {server_id} failed: {e}")
+            continue
+        if response.status_code == 200:
+            return JSONResponse(response.json(), headers={"X-Served-By": server_id})
+    return None
+
+
+def forward_write(request: Request, warehouse_id: int, body: Dict[str, Any]) -> Optional[JSONResponse]:
+    """Hand a client write for a warehouse this server does not hold to one of
+    the partition's holders, which stores it and replicates it to the others.
+
+    None means write locally. Otherwise the holder's response is passed on with
+    ``X-Served-By`` (its ids are the ones the client should use from then on),
+    or a 503 when no holder is reachable; the row is never stored here, since
+    this server would not receive the partition's later events.
+    """
+    if (holds_locally(warehouse_id) or getattr(request.state, 'is_replicated', False)
+            or request.headers.get(FORWARDED_HEADER)):
+        return None
+    headers = {
+        "operation-name": request.headers.get("operation-name", ""),
+        FORWARDED_HEADER: settings.SERVER_ID
+    }
+    for server_id in partition_map.owners(partition_map.partition_for(warehouse_id)):
+        base_url = settings.SERVER_ENDPOINTS.get(server_id)
+        if base_url is None:
+            continue
+        try:
+            response = httpx.request(request.method, f"{base_url}{request.url.path}", json=body,
+                                     headers=headers, timeout=10.0)
+        except httpx.HTTPError as e:
+            logger.warning(f"Forwarding {request.method} {request.url.path} to server {server_id} failed: {e}")
+            continue
+        return JSONResponse(response.json(), status_code=response.status_code, headers={"X-Served-By": server_id})
+    return JSONResponse({"detail": f"No server holding warehouse {warehouse_id} is reachable"}, status_code=503)
+
+
+def forward_if_not_held(request: Request, warehouse_id: int) -> Optional[JSONResponse]:
+    """Forward a warehouse-scoped read when partitioning and this server does not
+    hold the warehouse's partition; None means answer locally"""
+    if not settings.PARTITIONING or partition_map.holds(settings.SERVER_ID, warehouse_id):
+        return None
+    return forward_read(request, partition_map.owners(partition_map.partition_for(warehouse_id)))
@@ -0,0 +1,110 @@
+import sys
+import time
+import threading
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Locals that name the work a thread is doing, with the label they are filed
+# under: the consumers unpack each event's ``event_type`` before applying it,
+# and every endpoint takes the operation-name header as ``operation_name``
+LABEL_LOCALS = (("event_type", "event_type"), ("operation_name", "operation-name"))
+
+# Innermost functions of threads parked waiting for work (pool workers, the
+# event loop, the consumer's connection), left out of the samples
+IDLE_FUNCTIONS = frozenset(("wait", "select", "poll", "_wait_for_tstate_lock"))
+
+MAX_DEPTH = 128
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+def _frame_name(code) -> str:
+    return f"{code.co_qualname} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})"
+
+
+def _label(frames) -> str:
+    """First ``event_type``/``operation_name`` local from the outermost frame in"""
+    for frame in frames:
+        names = frame.f_code.co_varnames
+        for local, label in LABEL_LOCALS:
+            if local in names:
+                value = frame.f_locals.get(local)
+                if value:
+                    return f"{label}={value}"
+    return "unlabeled"
+
+
+class SamplingProfiler:
+    """Samples every thread's stack from a background thread.
+
+    Nothing is hooked into the code being profiled: while no profile runs there
+    is no sampler thread and no per-call cost. Each sample is filed under the
+    operation-name (API requests) or event_type (consumers) found in the
+    sampled thread's frames, so hot paths show up per operation. Stacks are
+    returned in collapsed form, ``label;outer;...;inner count`` per line, which
+    flamegraph.pl, speedscope and inferno read directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, seconds: float, interval: float = 0.005) -> Counter:
+        """Sample for ``seconds`` (blocking the caller) and return stack counts"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            stacks: Counter = Counter()
+            me = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                self._sample(stacks, me)
+                time.sleep(interval)
+            return stacks
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _sample(stacks: Counter, skip_thread: int) -> None:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            frames = []
+            while frame is not None and len(frames) < MAX_DEPTH:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            if frames and frames[-1].f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            stacks[";".join([_label(frames)] + [_frame_name(f.f_code) for f in frames])] += 1
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def profile_to_file(seconds: float, path: str, interval: float = 0.005) -> None:
+    """Profile in a background thread and write the collapsed stacks to ``path``
+    (used by the consumer's SIGUSR1 handler, which must return immediately)"""
+    def run():
+        try:
+            stacks = profiler.profile(seconds, interval)
+        except ProfilerBusy as e:
+            logger.warning(str(e))
+            return
+        with open(path, "w") as f:
+            f.write(collapsed(stacks))
+        logger.info(f"Wrote {sum(stacks.values())} samples to {path}")
+
+    threading.Thread(target=run, name="profiler", daemon=True).start()
+
+
+# Global profiler
+profiler = SamplingProfiler()
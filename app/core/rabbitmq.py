@@ -1,140 +1,293 @@
-import pika
 import json
 import logging
+import threading
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from app.core.config import settings
+from app.core.transport import Delivery, Transport, create_transport
+from app.core.partitioning import PartitionMap, partition_map, partition_routing_key
+from app.core.tracing import tracer
+from app.core.logs import log_event
+from app.core.hlc import hlc as clock
+from app.core.consistency import note_published
+from app.core.lanes import (
+    DEFAULT_LANE, lane_for, lane_names, lane_queue_name, lane_routing_key, lane_stats, lane_weight
+)
 
 logger = logging.getLogger(__name__)
 
+EXCHANGE_NAME = 'distributed_events'
+RETRY_COUNT_HEADER = 'x-retry-count'
+LAST_ERROR_HEADER = 'x-last-error'
+
+
+def events_queue_name(server_id: str) -> str:
+    return f"server_{server_id}_events"
+
+
+def retry_queue_name(queue_name: str, delay_ms: int) -> str:
+    return f"{queue_name}.retry.{delay_ms}ms"
+
+
+def dead_letter_queue_name(queue_name: str) -> str:
+    return f"{queue_name}.dead"
+
+
+def decode_event(body: bytes) -> Dict[str, Any]:
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise EventProcessingError(f"Malformed event body: {e}", retryable=False)
+
+
+def retry_route(queue_name: str, headers: Dict[str, Any], error: str,
+                retryable: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """Pick where a failed event goes next: the next delay tier, or the
+    dead-letter queue once every tier has been used (or the failure is not
+    retryable). Returns the target queue and the headers to republish with."""
+    headers = dict(headers)
+    attempt = int(headers.get(RETRY_COUNT_HEADER, 0))
+    delays = settings.EVENT_RETRY_DELAYS_MS
+    
+    headers[RETRY_COUNT_HEADER] = attempt + 1
+    headers[LAST_ERROR_HEADER] = error[:500]
+    
+    if retryable and attempt < len(delays):
+        logger.warning(f"Retrying event in {delays[attempt]}ms (attempt {attempt + 1}/{len(delays)})")
+        return retry_queue_name(queue_name, delays[attempt]), headers
+    logger.error(f"Dead-lettering event after {attempt} retries: {error}")
+    return dead_letter_queue_name(queue_name), headers
+
+
+class EventProcessingError(Exception):
+    """Raised when a distributed event could not be applied on this server.
+
+    ``retryable`` is False for failures that will never succeed on redelivery
+    (malformed payloads, validation errors), which go straight to the dead-letter queue.
+    """
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
 class RabbitMQConnection:
-    def __init__(self, host='localhost', port=5672, username='guest', password='guest'):
+    def __init__(self, host='localhost', port=5672, username='guest', password='guest',
+                 server_id: Optional[str] = None,
+                 allowed_servers: Optional[List[str]] = None,
+                 transport: Optional[Transport] = None,
+                 declare_topology: bool = True,
+                 partitions: Optional[PartitionMap] = None):
         self.host = host
         self.port = port
         self.username = username
         self.password = password
-        self.connection = None
-        self.channel = None
+        # Defaults come from settings; explicit values let several servers share one process
+        self.server_id = server_id or settings.SERVER_ID
+        self.allowed_servers = allowed_servers if allowed_servers is not None else settings.ALLOWED_SERVERS
+        self.transport = transport
+        self.declare_topology = declare_topology
+        self.queue_name = events_queue_name(self.server_id)
+        # Placement of shipment events; None replicates everything to every server
+        self.partitions = partitions if partitions is not None else (partition_map if settings.PARTITIONING else None)
+        # Publishes take their sequence and go out under one lock, so receivers
+        # see each lane's events from this process in sequence order
+        self._publish_lock = threading.Lock()
         
     def connect(self):
-        """Establish connection to RabbitMQ with authentication"""
+        """Establish connection to the broker and declare this server's topology"""
         try:
-            # Create connection parameters with authentication
-            credentials = pika.PlainCredentials(
-                username=settings.RABBITMQ_USERNAME,
-                password=settings.RABBITMQ_PASSWORD
-            )
-            
-            parameters = pika.ConnectionParameters(
-                host=settings.RABBITMQ_HOST,
-                port=settings.RABBITMQ_PORT,
-                virtual_host=settings.RABBITMQ_VIRTUAL_HOST,
-                credentials=credentials,
-                heartbeat=600,
-                blocked_connection_timeout=300
-            )
-            
-            self.connection = pika.BlockingConnection(parameters)
-            self.channel = self.connection.channel()
+            if self.transport is None:
+                self.transport = create_transport()
+            self.transport.connect()
+            if not self.declare_topology:
+                logger.info(f"Connected to publisher sidecar as server {self.server_id}")
+                return True
             
             # Declare the exchange for distributed events
-            self.channel.exchange_declare(
-                exchange='distributed_events',
-                exchange_type='topic',
-                durable=True
-            )
+            self.transport.declare_exchange(EXCHANGE_NAME, exchange_type='topic', durable=True)
             
             # Declare queue for this server
-            queue_name = f"server_{settings.SERVER_ID}_events"
-            self.channel.queue_declare(queue=queue_name, durable=True)
+            self.transport.declare_queue(self.queue_name, durable=True)
+            self.declare_retry_queues(self.queue_name)
             
             # Bind queue to exchange with routing patterns
-            for source_server in settings.ALLOWED_SERVERS:
-                routing_key = f"{source_server}.{settings.SERVER_ID}"
-                self.channel.queue_bind(
-                    exchange='distributed_events',
-                    queue=queue_name,
-                    routing_key=routing_key
-                )
+            for routing_key in self.binding_keys():
+                self.transport.bind_queue(self.queue_name, EXCHANGE_NAME, routing_key)
+            self.declare_lanes()
             
-            logger.info(f"Connected to RabbitMQ at {settings.RABBITMQ_HOST}:{settings.RABBITMQ_PORT}")
+            logger.info(f"Connected to {settings.EVENT_TRANSPORT} transport as server {self.server_id}")
             return True
             
         except Exception as e:
             logger.error(f"Failed to connect to RabbitMQ: {e}")
+            if self.transport is not None:
+                self.transport.close()
             return False
     
+    def binding_keys(self) -> List[str]:
+        """Routing keys this server's queue receives: events addressed to it and,
+        when partitioning, events for every partition it holds"""
+        keys = [f"{source_server}.{self.server_id}" for source_server in self.allowed_servers]
+        if self.partitions is not None:
+            for partition in self.partitions.partitions_held_by(self.server_id):
+                keys.extend(partition_routing_key(source_server, partition) for source_server in self.allowed_servers)
+        return keys
+    
+    def lane_queues(self) -> List[Tuple[str, str]]:
+        """(lane, queue) pairs this server consumes"""
+        return [(lane, lane_queue_name(self.queue_name, lane)) for lane in lane_names()]
+    
+    def declare_lanes(self):
+        """Declare and bind a queue per priority lane (PRIORITY_LANES).
+        
+        Without lanes the main queue also takes lane-suffixed routing keys, so
+        events from peers that publish into lanes are not lost.
+        """
+        lanes = lane_names()
+        if lanes == [DEFAULT_LANE]:
+            for routing_key in self.binding_keys():
+                self.transport.bind_queue(self.queue_name, EXCHANGE_NAME, f"{routing_key}.*")
+            return
+        for lane in lanes:
+            if lane == DEFAULT_LANE:
+                continue
+            queue_name = lane_queue_name(self.queue_name, lane)
+            self.transport.declare_queue(queue_name, durable=True)
+            for routing_key in self.binding_keys():
+                self.transport.bind_queue(queue_name, EXCHANGE_NAME, lane_routing_key(routing_key, lane))
+    
+    def partition_for(self, warehouse_id: Optional[int]) -> Optional[int]:
+        if self.partitions is None or warehouse_id is None:
+            return None
+        return self.partitions.partition_for(warehouse_id)
+    
+    def holds_partition(self, partition: int) -> bool:
+        return self.partitions is not None and self.server_id in self.partitions.owners(partition)
+    
+    @property
+    def is_connected(self) -> bool:
+        return self.transport is not None and self.transport.is_open
+    
+    def declare_retry_queues(self, queue_name: str):
+        """Declare the delayed retry tiers and the dead-letter queue for ``queue_name``.
+
+        Each retry queue has no consumers: messages sit there until their TTL
+        expires and the broker dead-letters them back onto the main queue through
+        the default exchange, so waiting retries never block fresh events.
+        """
+        for delay_ms in settings.EVENT_RETRY_DELAYS_MS:
+            self.transport.declare_queue(
+                retry_queue_name(queue_name, delay_ms),
+                durable=True,
+                arguments={
+                    "x-message-ttl": delay_ms,
+                    "x-dead-letter-exchange": "",
+                    "x-dead-letter-routing-key": queue_name
+                }
+            )
+        self.transport.declare_queue(dead_letter_queue_name(queue_name), durable=True)
+    
     def disconnect(self):
-        if self.connection and not self.connection.is_closed:
-            self.connection.close()
+        if self.is_connected:
+            self.transport.close()
             logger.info("Disconnected from RabbitMQ")
     
     def publish_distributed_event(self, event_type: str, url: str, method: str, 
                                  inputs: Optional[Dict[str, Any]] = None, 
                                  resource_id: Optional[int] = None,
-                                 operation_name: str = ""):
-        """Publish event to all other servers in the distributed system"""
-        self.channel.basic_publish(
-            exchange='distributed_events',
-            routing_key="",
-            body=json.dumps(inputs),
-            properties=pika.BasicProperties(
-                delivery_mode=2,
-                headers={
-                    "operation-name": operation_name,
-                    "source-server": settings.SERVER_ID,
-                    "target-server": target_server
-                }
-            )
-        )
-        if not self.channel:
+                                 operation_name: str = "",
+                                 hlc: Optional[str] = None,
+                                 partition: Optional[int] = None,
+                                 resource_key: Optional[str] = None):
+        """Publish event to all other servers in the distributed system.
+        
+        With PRIORITY_LANES the event goes to its lane's queue on each receiver
+        (routing key suffixed with the lane). ``hlc`` is the write's hybrid logical clock stamp; receivers use it to
+        resolve concurrent updates per field (last writer wins). With a
+        ``partition`` the event is published once, routed to the servers holding
+        that partition. ``resource_key`` identifies the row independently of
+        local ids (the tracking number for shipments). Each event carries a
+        ``seq``, this server's publish sequence, which consistency tokens refer to.
+        """
+        if not self.is_connected:
             if not self.connect():
                 logger.error("Cannot publish event: No RabbitMQ connection")
                 return False
         
         try:
-            # Get target servers (all allowed servers except this one)
-            target_servers = [s for s in settings.ALLOWED_SERVERS if s != settings.SERVER_ID]
+            if partition is not None and self.partitions is not None:
+                routes = [(partition_routing_key(self.server_id, partition), None)]
+            else:
+                # Get target servers (all allowed servers except this one)
+                target_servers = [s for s in self.allowed_servers if s != self.server_id]
+                routes = [(f"{self.server_id}.{target_server}", target_server) for target_server in target_servers]
+            lane = lane_for(event_type, operation_name)
             
-            for target_server in target_servers:
-                routing_key = f"{settings.SERVER_ID}.{target_server}"  
-                
-                message = {
-                    "source_server": settings.SERVER_ID,
-                    "target_server": target_server,
-                    "event_type": event_type,  
-                    "operation_name": operation_name,
-                    "url": url,
-                    "method": method,  
-                    "inputs": inputs or {},
-                    "resource_id": resource_id,
-                    "timestamp": datetime.now().isoformat(),
-                    "routing_key": routing_key
-                }
-                
-                self.channel.basic_publish(
-                    exchange='distributed_events',
-                    routing_key=routing_key,
-                    body=json.dumps(message),
-                    properties=pika.BasicProperties(
-                        delivery_mode=2,  
-                        headers={
-                            "operation-name": operation_name,
-                            "source-server": settings.SERVER_ID,
-                            "target-server": target_server
+            with self._publish_lock:
+                seq = clock.now()
+                for routing_key, target_server in routes:
+                    routing_key = lane_routing_key(routing_key, lane)
+                    with tracer.span("publish", event_type=event_type, routing_key=routing_key):
+                        message = {
+                            "source_server": self.server_id,
+                            "target_server": target_server,
+                            "event_type": event_type,  
+                            "operation_name": operation_name,
+                            "url": url,
+                            "method": method,  
+                            "inputs": inputs or {},
+                            "resource_id": resource_id,
+                            "resource_key": resource_key,
+                            "partition": partition if target_server is None else None,
+                            "hlc": hlc,
+                            "timestamp": datetime.now().isoformat(),
+                            "routing_key": routing_key,
+                            "lane": lane,
+                            "seq": seq
                         }
-                    )
-                )
-                logger.info(f"Published event to {target_server}: {event_type} - {operation_name}")
+                
+                        self.transport.publish(
+                            EXCHANGE_NAME,
+                            routing_key,
+                            json.dumps(message).encode(),
+                            headers=tracer.inject({
+                                "operation-name": operation_name,
+                                "source-server": self.server_id,
+                                "target-server": target_server or routing_key
+                            }),
+                            content_type="application/json"
+                        )
+                        log_event(logger, "event.publish", "Published event to %s: %s - %s",
+                                  target_server or routing_key, event_type, operation_name, event_type=event_type, lane=lane)
+            note_published(lane, seq)
             
             return True
         except Exception as e:
             logger.error(f"Failed to publish distributed event: {e}")
             return False
 
+def publisher_socket_path() -> str:
+    return settings.PUBLISHER_SOCKET or f"/tmp/logistic_publisher_{settings.SERVER_ID}.sock"
+
+
+def create_publisher_connection() -> RabbitMQConnection:
+    """Connection the API uses to publish events.
+
+    With PUBLISHER_MODE=sidecar, workers hand events to the server's publisher
+    sidecar over a Unix socket instead of opening their own broker connection;
+    the sidecar owns the queue topology, so workers declare nothing.
+    """
+    if settings.PUBLISHER_MODE == "sidecar":
+        from app.core.local_transport import UnixSocketTransport
+        return RabbitMQConnection(transport=UnixSocketTransport(publisher_socket_path()),
+                                  declare_topology=False)
+    return RabbitMQConnection()
+
+
 # Global RabbitMQ connection instance
-rabbitmq = RabbitMQConnection()
+rabbitmq = create_publisher_connection()
 
 
 class DistributedEventProducer:
@@ -146,7 +299,8 @@ class DistributedEventProducer:
             "location": warehouse_data.get("location")
         }
         return rabbitmq.publish_distributed_event(
-            "warehouse.created", url, "POST", inputs, None, operation_name
+            "warehouse.created", url, "POST", inputs, None, operation_name,
+            warehouse_data.get("hlc")
         )
     
     @staticmethod
@@ -156,7 +310,8 @@ class DistributedEventProducer:
         inputs = {k: v for k, v in warehouse_data.items() 
                  if k in warehouse_data.get("updated_fields", [])}
         return rabbitmq.publish_distributed_event(
-            "warehouse.updated", url, "PUT", inputs, warehouse_id, operation_name
+            "warehouse.updated", url, "PUT", inputs, warehouse_id, operation_name,
+            warehouse_data.get("hlc")
         )
     
     @staticmethod
@@ -164,9 +319,16 @@ class DistributedEventProducer:
         warehouse_id = warehouse_data.get("id")
         url = f"{settings.API_V1_STR}/warehouses/{warehouse_id}"
         return rabbitmq.publish_distributed_event(
-            "warehouse.deleted", url, "DELETE", None, warehouse_id, operation_name
+            "warehouse.deleted", url, "DELETE", None, warehouse_id, operation_name,
+            warehouse_data.get("hlc")
         )
     
+    @staticmethod
+    def shipment_route(shipment_data: Dict[str, Any]) -> Tuple[Optional[int], Optional[str]]:
+        """Partition of the shipment's warehouse (None when not partitioning) and
+        the tracking number replicas use to find the row"""
+        return rabbitmq.partition_for(shipment_data.get("warehouse_id")), shipment_data.get("tracking_number")
+    
     @staticmethod
     def shipment_created(shipment_data: Dict[str, Any], operation_name: str):
         url = f"{settings.API_V1_STR}/shipments/"
@@ -178,7 +340,8 @@ class DistributedEventProducer:
             "warehouse_id": shipment_data.get("warehouse_id")
         }
         return rabbitmq.publish_distributed_event(
-            "shipment.created", url, "POST", inputs, None, operation_name
+            "shipment.created", url, "POST", inputs, None, operation_name,
+            shipment_data.get("hlc"), *DistributedEventProducer.shipment_route(shipment_data)
         )
     
     @staticmethod
@@ -188,7 +351,8 @@ class DistributedEventProducer:
         inputs = {k: v for k, v in shipment_data.items() 
                  if k in shipment_data.get("updated_fields", [])}
         return rabbitmq.publish_distributed_event(
-            "shipment.updated", url, "PUT", inputs, shipment_id, operation_name
+            "shipment.updated", url, "PUT", inputs, shipment_id, operation_name,
+            shipment_data.get("hlc"), *DistributedEventProducer.shipment_route(shipment_data)
         )
     
     @staticmethod
@@ -196,74 +360,167 @@ class DistributedEventProducer:
         shipment_id = shipment_data.get("id")
         url = f"{settings.API_V1_STR}/shipments/{shipment_id}"
         return rabbitmq.publish_distributed_event(
-            "shipment.deleted", url, "DELETE", None, shipment_id, operation_name
+            "shipment.deleted", url, "DELETE", None, shipment_id, operation_name,
+            shipment_data.get("hlc"), *DistributedEventProducer.shipment_route(shipment_data)
         )
+    
+    @staticmethod
+    def changes_partition(old_warehouse_id: Optional[int], new_warehouse_id: Optional[int]) -> bool:
+        return rabbitmq.partition_for(old_warehouse_id) != rabbitmq.partition_for(new_warehouse_id)
+    
+    @staticmethod
+    def shipment_moved(old_data: Dict[str, Any], new_data: Dict[str, Any], status_hlc: str, operation_name: str):
+        """Shipment moved to a warehouse in another partition: delete it from the
+        old partition and recreate it in the new one. Creates do not carry the
+        status, so a non-default status follows as an update with a later stamp."""
+        published = DistributedEventProducer.shipment_deleted(old_data, operation_name)
+        published = DistributedEventProducer.shipment_created(new_data, operation_name) and published
+        if new_data.get("status") != "pending":
+            status_update = dict(new_data, updated_fields=["status"], hlc=status_hlc)
+            published = DistributedEventProducer.shipment_updated(status_update, operation_name) and published
+        return published
 
 
 class DistributedEventConsumer:
-    def __init__(self):
-        self.connection = RabbitMQConnection()
-        self.http_client = httpx.Client(timeout=30.0)
+    def __init__(self, connection: Optional[RabbitMQConnection] = None,
+                 http_client: Optional[httpx.Client] = None,
+                 positions=None):
+        self.connection = connection or RabbitMQConnection()
+        self._http_client = http_client
+        # PositionTracker (app/services/consistency.py) recording applied events
+        # for consistency tokens; None when CONSISTENCY_TOKENS is off
+        self.positions = positions
+    
+    @property
+    def server_id(self) -> str:
+        return self.connection.server_id
+    
+    @property
+    def http_client(self) -> httpx.Client:
+        # Created on first use; consumers that apply events in-process never need one
+        if self._http_client is None:
+            self._http_client = httpx.Client(timeout=30.0)
+        return self._http_client
     
     def start_consuming(self):
         """Start consuming events for this server"""
-        if not self.connection.connect():
-            logger.error("Cannot start consuming: No RabbitMQ connection")
+        if not self.subscribe():
             return
+        logger.info(f"Started consuming distributed events for server {self.server_id}")
+        self.connection.transport.start_consuming()
+    
+    def subscribe(self) -> bool:
+        """Connect and register the delivery callback without blocking.
+
+        ``start_consuming`` calls this before entering the transport loop; with the
+        in-memory transport, tests call it directly and drive the shared broker.
+        """
+        if not self.connection.is_connected and not self.connection.connect():
+            logger.error("Cannot start consuming: No RabbitMQ connection")
+            return False
         
-        queue_name = f"server_{settings.SERVER_ID}_events"
-        
-        def callback(ch, method, properties, body):
-            try:
-                message = json.loads(body)
+        transport = self.connection.transport
+        # Confirms make the retry/dead-letter republish durable before the original is acked
+        transport.confirm_delivery()
+        for lane, queue_name in self.connection.lane_queues():
+            # Prefetch is per consumer: each lane holds deliveries in proportion to its
+            # weight, so the broker interleaves lanes at that ratio and an urgent event
+            # waits behind at most the bulk lane's prefetch, not its backlog
+            transport.set_prefetch(settings.CONSUMER_PREFETCH_COUNT * lane_weight(lane))
+            transport.consume(queue_name, lambda delivery, lane=lane: self.handle_delivery(delivery, lane))
+        return True
+    
+    def handle_delivery(self, delivery: Delivery, lane: str = DEFAULT_LANE):
+        """Apply one delivered event, rerouting it to a retry tier on failure, then ack"""
+        try:
+            message = decode_event(delivery.body)
+            lane_stats.record(lane, message)
+            with tracer.consuming(delivery.headers, message):
                 self.process_distributed_event(message)
-                ch.basic_ack(delivery_tag=method.delivery_tag)
-                
-            except Exception as e:
-                logger.error(f"Error processing distributed event: {e}")
-                ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            
+        except Exception as e:
+            logger.error(f"Error processing distributed event: {e}")
+            retryable = getattr(e, "retryable", True)
+            self.schedule_retry(delivery, str(e), retryable)
         
-        self.connection.channel.basic_consume(queue=queue_name, on_message_callback=callback)
-        logger.info(f"Started consuming distributed events for server {settings.SERVER_ID}")
-        self.connection.channel.start_consuming()
+        self.connection.transport.ack(delivery.delivery_tag)
+    
+    def schedule_retry(self, delivery: Delivery, error: str, retryable: bool = True):
+        """Move a failed event to the next delay tier, or to the dead-letter queue
+        once every tier has been used (or the failure is not retryable)"""
+        target_queue, headers = retry_route(self.connection.queue_name, delivery.headers, error, retryable)
+        self.connection.transport.publish(
+            '', target_queue, delivery.body,
+            headers=headers,
+            content_type=delivery.content_type
+        )
     
     def process_distributed_event(self, message: Dict[str, Any]):
-        """Process received distributed event"""
+        """Process received distributed event, recording its position as applied
+        (or, if it failed and will be retried, as held) for consistency tokens"""
+        try:
+            self.route_event(message)
+        except Exception:
+            if self.positions is not None:
+                self.positions.held(message)
+            raise
+        if self.positions is not None:
+            self.positions.applied(message)
+    
+    def route_event(self, message: Dict[str, Any]):
+        """Apply the event if it is meant for this server"""
         source_server = message.get("source_server")
         target_server = message.get("target_server")
         event_type = message.get("event_type")
         operation_name = message.get("operation_name")
-        url = message.get("url")
-        method = message.get("method")
-        inputs = message.get("inputs", {})
-        resource_id = message.get("resource_id")
         
-        logger.info(f"Processing event from {source_server}: {event_type} - {operation_name}")
+        log_event(logger, "event.consume", "Processing event from %s: %s - %s", source_server, event_type, operation_name,
+                  event_type=event_type, source_server=source_server)
         
         # Check if this server should process events from the source server
-        if source_server not in settings.ALLOWED_SERVERS:
+        if source_server not in self.connection.allowed_servers:
             logger.warning(f"Ignoring event from non-allowed server: {source_server}")
             return
         
+        partition = message.get("partition")
+        if partition is not None:
+            # Partitioned event: only apply partitions this server (still) holds
+            if not self.connection.holds_partition(partition):
+                logger.warning(f"Ignoring event for partition {partition} not held by {self.server_id}")
+                return
         # Check if this event is targeted to this server
-        if target_server != settings.SERVER_ID:
-            logger.warning(f"Event not targeted to this server ({settings.SERVER_ID})")
+        elif target_server != self.server_id:
+            logger.warning(f"Event not targeted to this server ({self.server_id})")
             return
         
-        # Execute the API call to replicate the action
-        success = self.execute_api_call(source_server, url, method, inputs, operation_name)
-        
-        if success:
-            logger.info(f"Successfully replicated {event_type} from {source_server}")
-        else:
-            logger.error(f"Failed to replicate {event_type} from {source_server}")
+        # Replicate the action on this server
+        self.apply_event(message)
+        log_event(logger, "event.apply", "Successfully replicated %s from %s", event_type, source_server,
+                  event_type=event_type, source_server=source_server)
+    
+    def apply_event(self, message: Dict[str, Any]):
+        """Replicate the action by calling this server's own API.
+
+        Subclasses override this to apply events without the HTTP round trip
+        (see app/services/replication.py).
+        """
+        self.execute_api_call(
+            message.get("source_server"), message.get("url"), message.get("method"),
+            message.get("inputs", {}), message.get("operation_name"), message.get("hlc"),
+            message.get("resource_key")
+        )
     
     def execute_api_call(self, source_server: str, url: str, method: str, 
-                        inputs: Dict[str, Any], operation_name: str) -> bool:
-        """Execute API call to replicate the action from another server"""
+                        inputs: Dict[str, Any], operation_name: str,
+                        hlc: Optional[str] = None, resource_key: Optional[str] = None) -> bool:
+        """Execute API call to replicate the action from another server.
+        
+        Raises EventProcessingError when the call fails; 4xx responses other than
+        404/409 are treated as permanent since redelivering them cannot succeed.
+        """
         try:
             # Get the base URL for this server
-            base_url = settings.SERVER_ENDPOINTS.get(settings.SERVER_ID, "http://localhost:8000")
+            base_url = settings.SERVER_ENDPOINTS.get(self.server_id, "http://localhost:8000")
             full_url = f"{base_url}{url}"
             
             headers = {
@@ -271,8 +528,12 @@ class DistributedEventConsumer:
                 "Content-Type": "application/json",
                 "X-Replicated-From": source_server
             }
-            
-            logger.info(f"Executing {method} {full_url} with inputs: {inputs}")
+            if hlc:
+                headers["X-Replicated-HLC"] = hlc
+            if resource_key:
+                headers["X-Replicated-Key"] = resource_key
+            # Continues the trace in the API request that applies the event
+            tracer.inject(headers)
             
             if method == "POST":
                 response = self.http_client.post(full_url, json=inputs, headers=headers)
@@ -283,23 +544,30 @@ class DistributedEventConsumer:
             elif method == "GET":
                 response = self.http_client.get(full_url, headers=headers)
             else:
-                logger.error(f"Unsupported HTTP method: {method}")
-                return False
+                raise EventProcessingError(f"Unsupported HTTP method: {method}", retryable=False)
             
             if response.status_code in [200, 201]:
-                logger.info(f"API call successful: {response.status_code}")
+                log_event(logger, "event.apply", "Applied %s %s: %s", method, url, response.status_code,
+                          status_code=response.status_code)
                 return True
-            else:
-                logger.error(f"API call failed: {response.status_code} - {response.text}")
-                return False
+            if response.status_code == 410:
+                # The row was deleted by a write that wins over this one: nothing left to do
+                logger.info(f"Replicated {method} {url} superseded by a delete")
+                return True
+            
+            retryable = response.status_code >= 500 or response.status_code in (404, 409)
+            raise EventProcessingError(
+                f"API call failed: {response.status_code} - {response.text}",
+                retryable=retryable
+            )
                 
-        except Exception as e:
-            logger.error(f"Error executing API call: {e}")
-            return False
+        except httpx.HTTPError as e:
+            # Local API restarting or unreachable - worth retrying later
+            raise EventProcessingError(f"Error executing API call: {e}")
     
     def __del__(self):
-        if hasattr(self, 'http_client'):
-            self.http_client.close()
+        if getattr(self, '_http_client', None) is not None:
+            self._http_client.close()
 
 
 # Legacy classes for backward compatibility
@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# W3C trace context header, used on both HTTP requests and AMQP messages
+TRACEPARENT = "traceparent"
+
+# (trace_id, span_id) of the span running in this context
+SpanContext = Tuple[str, str]
+_current: ContextVar[Optional[SpanContext]] = ContextVar("trace_context", default=None)
+
+
+def format_traceparent(context: SpanContext) -> str:
+    return f"00-{context[0]}-{context[1]}-01"
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[SpanContext]:
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "end", "attributes")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    @property
+    def context(self) -> SpanContext:
+        return self.trace_id, self.span_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "server": settings.SERVER_ID,
+            "start": self.start,
+            "duration_ms": round((self.end - self.start) * 1000, 3),
+            "attributes": self.attributes
+        }
+
+
+class InMemoryExporter:
+    """Keeps the most recent spans in memory (served at GET /traces/{trace_id})"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+
+    def export(self, span: Dict[str, Any]) -> None:
+        self.spans.append(span)
+
+    def find(self, trace_id: str) -> List[Dict[str, Any]]:
+        return [span for span in list(self.spans) if span["trace_id"] == trace_id]
+
+
+class JsonlExporter:
+    """Appends one JSON line per finished span to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, span: Dict[str, Any]) -> None:
+        line = json.dumps(span) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", buffering=1)
+            self._file.write(line)
+
+    def find(self, trace_id: str) -> List[Dict[str, Any]]:
+        return [span for span in read_spans(self.path) if span["trace_id"] == trace_id]
+
+
+def read_spans(path: str) -> Iterator[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Tracer:
+    """Creates spans and carries their context across threads, HTTP and AMQP.
+
+    With no exporter every method is a no-op, so tracing costs nothing when off.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[SpanContext] = None, **attributes) -> Iterator[Optional[Span]]:
+        """Child of ``parent`` (default: the current span), or a new trace's root"""
+        if self.exporter is None:
+            yield None
+            return
+        parent = parent or _current.get()
+        trace_id = parent[0] if parent else os.urandom(16).hex()
+        span = Span(name, trace_id, parent[1] if parent else None, attributes)
+        token = _current.set(span.context)
+        try:
+            yield span
+        except Exception as e:
+            span.attributes["error"] = str(e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end = time.time()
+            self.exporter.export(span.to_dict())
+
+    def record(self, name: str, parent: SpanContext, start: float, end: float, **attributes) -> None:
+        """Export a span whose start and end are already known"""
+        if self.exporter is None:
+            return
+        span = Span(name, parent[0], parent[1], attributes)
+        span.start, span.end = start, end
+        self.exporter.export(span.to_dict())
+
+    def inject(self, headers: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the current span's traceparent to outgoing HTTP or AMQP headers"""
+        context = _current.get()
+        if context is not None:
+            headers[TRACEPARENT] = format_traceparent(context)
+        return headers
+
+    def extract(self, headers: Dict[str, Any]) -> Optional[SpanContext]:
+        if self.exporter is None:
+            return None
+        return parse_traceparent(headers.get(TRACEPARENT))
+
+    @contextmanager
+    def consuming(self, headers: Dict[str, Any], message: Dict[str, Any]) -> Iterator[None]:
+        """Continue the publisher's trace for one delivered event: a ``queue.wait``
+        span from publish to delivery, then an ``apply`` span around the body"""
+        parent = self.extract(headers)
+        if parent is None:
+            yield
+            return
+        event_type = message.get("event_type")
+        received = time.time()
+        try:
+            published = datetime.fromisoformat(message["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            published = received
+        self.record("queue.wait", parent, min(published, received), received, event_type=event_type)
+        with self.span("apply", parent=parent, event_type=event_type,
+                       source_server=message.get("source_server")):
+            yield
+
+
+def create_exporter():
+    if settings.TRACE_EXPORTER == "memory":
+        return InMemoryExporter()
+    if settings.TRACE_EXPORTER == "jsonl":
+        return JsonlExporter(settings.TRACE_FILE or f"./traces_{settings.SERVER_ID}.jsonl")
+    return None
+
+
+# Global tracer (TRACE_EXPORTER=memory|jsonl turns it on)
+tracer = Tracer(create_exporter())
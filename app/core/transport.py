@@ -0,0 +1,566 @@
+import time
+import threading
+import itertools
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+import pika
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Delivery:
+    """A message handed to a consumer callback, independent of the broker client"""
+    body: bytes
+    routing_key: str
+    delivery_tag: int
+    headers: Dict[str, Any] = field(default_factory=dict)
+    content_type: Optional[str] = None
+    redelivered: bool = False
+
+
+DeliveryCallback = Callable[[Delivery], None]
+
+
+class Transport(ABC):
+    """Minimal broker interface used by the distributed event producer/consumer.
+
+    Semantics follow AMQP 0-9-1: topic/direct exchanges, durable queues with
+    ``x-message-ttl``/``x-dead-letter-*`` arguments, the default exchange ``''``
+    routing straight to a queue by name, explicit ack/nack and publisher confirms.
+    """
+
+    @abstractmethod
+    def connect(self) -> None:
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        ...
+
+    @property
+    @abstractmethod
+    def is_open(self) -> bool:
+        ...
+
+    @abstractmethod
+    def declare_exchange(self, exchange: str, exchange_type: str = "topic", durable: bool = True) -> None:
+        ...
+
+    @abstractmethod
+    def declare_queue(self, queue: str, durable: bool = True,
+                      arguments: Optional[Dict[str, Any]] = None) -> int:
+        """Declare ``queue`` and return the number of messages ready in it"""
+
+    @abstractmethod
+    def bind_queue(self, queue: str, exchange: str, routing_key: str) -> None:
+        ...
+
+    @abstractmethod
+    def publish(self, exchange: str, routing_key: str, body: bytes,
+                headers: Optional[Dict[str, Any]] = None,
+                content_type: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    def confirm_delivery(self) -> None:
+        """Make ``publish`` return only once the broker has taken the message"""
+
+    @abstractmethod
+    def set_prefetch(self, count: int) -> None:
+        ...
+
+    @abstractmethod
+    def consume(self, queue: str, callback: DeliveryCallback) -> None:
+        ...
+
+    @abstractmethod
+    def ack(self, delivery_tag: int) -> None:
+        ...
+
+    @abstractmethod
+    def nack(self, delivery_tag: int, requeue: bool = False) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, queue: str) -> Optional[Delivery]:
+        """Fetch a single message without a consumer (unacked until ack/nack)"""
+
+    @abstractmethod
+    def purge(self, queue: str) -> int:
+        ...
+
+    @abstractmethod
+    def start_consuming(self) -> None:
+        """Block dispatching deliveries to registered consumers until stopped"""
+
+    @abstractmethod
+    def stop_consuming(self) -> None:
+        ...
+
+
+class PikaTransport(Transport):
+    """RabbitMQ transport over a pika BlockingConnection"""
+
+    def __init__(self):
+        self.connection = None
+        self.channel = None
+
+    def connect(self) -> None:
+        credentials = pika.PlainCredentials(
+            username=settings.RABBITMQ_USERNAME,
+            password=settings.RABBITMQ_PASSWORD
+        )
+        parameters = pika.ConnectionParameters(
+            host=settings.RABBITMQ_HOST,
+            port=settings.RABBITMQ_PORT,
+            virtual_host=settings.RABBITMQ_VIRTUAL_HOST,
+            credentials=credentials,
+            heartbeat=600,
+            blocked_connection_timeout=300
+        )
+        self.connection = pika.BlockingConnection(parameters)
+        self.channel = self.connection.channel()
+
+    def close(self) -> None:
+        if self.connection and not self.connection.is_closed:
+            self.connection.close()
+        self.connection = None
+        self.channel = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.channel is not None and self.channel.is_open
+
+    def declare_exchange(self, exchange: str, exchange_type: str = "topic", durable: bool = True) -> None:
+        self.channel.exchange_declare(exchange=exchange, exchange_type=exchange_type, durable=durable)
+
+    def declare_queue(self, queue: str, durable: bool = True,
+                      arguments: Optional[Dict[str, Any]] = None) -> int:
+        result = self.channel.queue_declare(queue=queue, durable=durable, arguments=arguments)
+        return result.method.message_count
+
+    def bind_queue(self, queue: str, exchange: str, routing_key: str) -> None:
+        self.channel.queue_bind(exchange=exchange, queue=queue, routing_key=routing_key)
+
+    def publish(self, exchange: str, routing_key: str, body: bytes,
+                headers: Optional[Dict[str, Any]] = None,
+                content_type: Optional[str] = None) -> None:
+        self.channel.basic_publish(
+            exchange=exchange,
+            routing_key=routing_key,
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type=content_type,
+                headers=headers
+            )
+        )
+
+    def confirm_delivery(self) -> None:
+        self.channel.confirm_delivery()
+
+    def set_prefetch(self, count: int) -> None:
+        self.channel.basic_qos(prefetch_count=count)
+
+    def consume(self, queue: str, callback: DeliveryCallback) -> None:
+        def on_message(ch, method, properties, body):
+            callback(self._delivery(method, properties, body))
+
+        self.channel.basic_consume(queue=queue, on_message_callback=on_message)
+
+    def ack(self, delivery_tag: int) -> None:
+        self.channel.basic_ack(delivery_tag=delivery_tag)
+
+    def nack(self, delivery_tag: int, requeue: bool = False) -> None:
+        self.channel.basic_nack(delivery_tag=delivery_tag, requeue=requeue)
+
+    def get(self, queue: str) -> Optional[Delivery]:
+        method, properties, body = self.channel.basic_get(queue=queue, auto_ack=False)
+        if method is None:
+            return None
+        return self._delivery(method, properties, body)
+
+    def purge(self, queue: str) -> int:
+        return self.channel.queue_purge(queue=queue).method.message_count
+
+    def start_consuming(self) -> None:
+        self.channel.start_consuming()
+
+    def stop_consuming(self) -> None:
+        self.channel.stop_consuming()
+
+    @staticmethod
+    def _delivery(method, properties, body) -> Delivery:
+        return Delivery(
+            body=body,
+            routing_key=method.routing_key,
+            delivery_tag=method.delivery_tag,
+            headers=dict(properties.headers or {}),
+            content_type=properties.content_type,
+            redelivered=getattr(method, "redelivered", False)
+        )
+
+
+@lru_cache(maxsize=4096)
+def topic_matches(pattern: str, routing_key: str) -> bool:
+    """AMQP topic matching: ``*`` is exactly one word, ``#`` is zero or more words"""
+    return _match_words(tuple(pattern.split(".")), tuple(routing_key.split(".")))
+
+
+def _match_words(pattern: Tuple[str, ...], words: Tuple[str, ...]) -> bool:
+    if not pattern:
+        return not words
+    head = pattern[0]
+    if head == "#":
+        return any(_match_words(pattern[1:], words[i:]) for i in range(len(words) + 1))
+    if not words:
+        return False
+    if head == "*" or head == words[0]:
+        return _match_words(pattern[1:], words[1:])
+    return False
+
+
+@dataclass
+class _Message:
+    body: bytes
+    routing_key: str
+    headers: Dict[str, Any]
+    content_type: Optional[str]
+    expires_at: Optional[float] = None
+    redelivered: bool = False
+    id: int = 0
+
+
+@dataclass
+class _Queue:
+    name: str
+    arguments: Dict[str, Any]
+    messages: Deque[_Message] = field(default_factory=deque)
+    consumers: List[Tuple["InMemoryTransport", DeliveryCallback]] = field(default_factory=list)
+    next_consumer: int = 0
+
+
+class InMemoryBroker:
+    """In-process stand-in for RabbitMQ with the same routing semantics.
+
+    Several ``InMemoryTransport`` instances (one per simulated server) share a
+    broker, so a whole cluster can run in one process. Deliveries only happen
+    inside ``run_until_idle``/``start_consuming``, which keeps tests
+    deterministic; TTL expiry uses the injectable ``clock``.
+
+    An optional ``journal`` (see ``app.core.local_transport.MessageLog``) is told
+    about every declaration, enqueue and removal so the broker state can be
+    rebuilt after a restart.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, journal=None):
+        self.clock = clock
+        self.journal = journal
+        self.exchanges: Dict[str, str] = {}
+        self.bindings: Dict[str, List[Tuple[str, str]]] = {}
+        self.queues: Dict[str, _Queue] = {}
+        self._ids = itertools.count(1)
+        self._next_queue = 0
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+
+    def declare_exchange(self, exchange: str, exchange_type: str) -> None:
+        with self._lock:
+            if exchange not in self.exchanges and self.journal:
+                self.journal.declared_exchange(exchange, exchange_type)
+            self.exchanges.setdefault(exchange, exchange_type)
+            self.bindings.setdefault(exchange, [])
+
+    def declare_queue(self, queue: str, arguments: Optional[Dict[str, Any]] = None) -> int:
+        with self._lock:
+            if queue not in self.queues:
+                self.queues[queue] = _Queue(name=queue, arguments=dict(arguments or {}))
+                if self.journal:
+                    self.journal.declared_queue(queue, self.queues[queue].arguments)
+            return len(self.queues[queue].messages)
+
+    def bind_queue(self, queue: str, exchange: str, routing_key: str) -> None:
+        with self._lock:
+            binding = (routing_key, queue)
+            if binding not in self.bindings[exchange]:
+                self.bindings[exchange].append(binding)
+                if self.journal:
+                    self.journal.bound(queue, exchange, routing_key)
+
+    def publish(self, exchange: str, routing_key: str, body: bytes,
+                headers: Optional[Dict[str, Any]] = None,
+                content_type: Optional[str] = None) -> int:
+        """Route a message and return the number of queues it landed in"""
+        with self._lock:
+            routed = 0
+            for queue in self._route(exchange, routing_key):
+                self._enqueue(queue, _Message(body, routing_key, dict(headers or {}), content_type))
+                routed += 1
+            if routed:
+                self._changed.notify_all()
+            return routed
+
+    def purge(self, queue: str) -> int:
+        with self._lock:
+            messages = self.queues[queue].messages
+            count = len(messages)
+            for message in messages:
+                self._discard(message)
+            messages.clear()
+            return count
+
+    def restore(self, queue: str, message_id: int, routing_key: str, body: bytes,
+                headers: Dict[str, Any], content_type: Optional[str]) -> None:
+        """Re-enqueue a journaled message after a restart, keeping its id"""
+        with self._lock:
+            message = _Message(body, routing_key, headers, content_type, id=message_id, redelivered=True)
+            self._enqueue(self.queues[queue], message, log=False)
+            self._ids = itertools.count(max(message_id + 1, next(self._ids)))
+
+    def depth(self, queue: str) -> int:
+        with self._lock:
+            self._expire()
+            return len(self.queues[queue].messages)
+
+    def _route(self, exchange: str, routing_key: str) -> List[_Queue]:
+        if exchange == "":
+            queue = self.queues.get(routing_key)
+            return [queue] if queue else []
+        exchange_type = self.exchanges[exchange]
+        matched = []
+        for pattern, queue_name in self.bindings.get(exchange, []):
+            if exchange_type == "topic":
+                hit = topic_matches(pattern, routing_key)
+            else:
+                hit = pattern == routing_key
+            if hit and self.queues[queue_name] not in matched:
+                matched.append(self.queues[queue_name])
+        return matched
+
+    def _enqueue(self, queue: _Queue, message: _Message, log: bool = True) -> None:
+        ttl = queue.arguments.get("x-message-ttl")
+        message.expires_at = self.clock() + ttl / 1000.0 if ttl is not None else None
+        if not message.id:
+            message.id = next(self._ids)
+        if log and self.journal:
+            self.journal.enqueued(queue.name, message)
+        queue.messages.append(message)
+
+    def _discard(self, message: _Message) -> None:
+        """Forget a message for good (acked, rejected, purged or expired)"""
+        if self.journal:
+            self.journal.removed(message.id)
+
+    def _expire(self) -> None:
+        """Dead-letter messages whose TTL has elapsed (checked at queue heads, like RabbitMQ)"""
+        now = self.clock()
+        for queue in list(self.queues.values()):
+            while queue.messages and queue.messages[0].expires_at is not None \
+                    and queue.messages[0].expires_at <= now:
+                message = queue.messages.popleft()
+                self._discard(message)
+                dlx = queue.arguments.get("x-dead-letter-exchange")
+                if dlx is None:
+                    continue
+                dl_key = queue.arguments.get("x-dead-letter-routing-key", message.routing_key)
+                for target in self._route(dlx, dl_key):
+                    self._enqueue(target, _Message(message.body, dl_key, message.headers, message.content_type))
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            expiries = [q.messages[0].expires_at for q in self.queues.values()
+                        if q.messages and q.messages[0].expires_at is not None]
+            return min(expiries) if expiries else None
+
+    def _next_delivery(self) -> Optional[Tuple["InMemoryTransport", DeliveryCallback, Delivery]]:
+        with self._lock:
+            self._expire()
+            # Start after the queue served last, so one busy queue cannot starve the others
+            queues = list(self.queues.values())
+            start = self._next_queue % len(queues) if queues else 0
+            for position in range(len(queues)):
+                queue = queues[(start + position) % len(queues)]
+                if not queue.messages or not queue.consumers:
+                    continue
+                for offset in range(len(queue.consumers)):
+                    index = (queue.next_consumer + offset) % len(queue.consumers)
+                    transport, callback = queue.consumers[index]
+                    if not transport.can_accept(queue.name):
+                        continue
+                    queue.next_consumer = index + 1
+                    self._next_queue = start + position + 1
+                    message = queue.messages.popleft()
+                    return transport, callback, transport.track(queue.name, message)
+            return None
+
+    def run_until_idle(self, max_deliveries: Optional[int] = None) -> int:
+        """Deliver ready messages to consumers until none are left; returns the count"""
+        delivered = 0
+        while max_deliveries is None or delivered < max_deliveries:
+            pending = self._next_delivery()
+            if pending is None:
+                break
+            transport, callback, delivery = pending
+            callback(delivery)
+            delivered += 1
+        return delivered
+
+    def wait_for_work(self, timeout: float = 1.0) -> None:
+        """Sleep until something is published/acked or the next TTL expires"""
+        next_expiry = self.next_expiry()
+        if next_expiry is not None:
+            timeout = max(0.0, min(timeout, next_expiry - self.clock()))
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def dispatch_forever(self, stop: threading.Event) -> None:
+        """Deliver to every registered consumer until ``stop`` is set"""
+        while not stop.is_set():
+            if not self.run_until_idle():
+                self.wait_for_work()
+
+    def wake(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+
+class InMemoryTransport(Transport):
+    """Transport connected to an ``InMemoryBroker`` (the process-wide one by default)"""
+
+    def __init__(self, broker: Optional[InMemoryBroker] = None):
+        self.broker = broker or default_broker
+        self.prefetch = 0
+        # Like basic.qos without global, a consumer keeps the prefetch set before it started
+        self.consumer_prefetch: Dict[str, int] = {}
+        self.unacked: Dict[int, Tuple[str, _Message]] = {}
+        self.unacked_per_queue: Dict[str, int] = defaultdict(int)
+        self._tags = itertools.count(1)
+        self._open = False
+        self._consuming = False
+
+    def connect(self) -> None:
+        self._open = True
+
+    def close(self) -> None:
+        self.stop_consuming()
+        with self.broker._lock:
+            for queue in self.broker.queues.values():
+                queue.consumers = [c for c in queue.consumers if c[0] is not self]
+            # Like a closed AMQP channel, unacked deliveries go back to their queues
+            for queue_name, message in self.unacked.values():
+                message.redelivered = True
+                self.broker.queues[queue_name].messages.appendleft(message)
+            self.unacked.clear()
+            self.unacked_per_queue.clear()
+        self._open = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._open
+
+    def declare_exchange(self, exchange: str, exchange_type: str = "topic", durable: bool = True) -> None:
+        self.broker.declare_exchange(exchange, exchange_type)
+
+    def declare_queue(self, queue: str, durable: bool = True,
+                      arguments: Optional[Dict[str, Any]] = None) -> int:
+        return self.broker.declare_queue(queue, arguments)
+
+    def bind_queue(self, queue: str, exchange: str, routing_key: str) -> None:
+        self.broker.bind_queue(queue, exchange, routing_key)
+
+    def publish(self, exchange: str, routing_key: str, body: bytes,
+                headers: Optional[Dict[str, Any]] = None,
+                content_type: Optional[str] = None) -> None:
+        self.broker.publish(exchange, routing_key, body, headers, content_type)
+
+    def confirm_delivery(self) -> None:
+        # Publishing is synchronous, so every publish is already confirmed
+        pass
+
+    def set_prefetch(self, count: int) -> None:
+        self.prefetch = count
+
+    def consume(self, queue: str, callback: DeliveryCallback) -> None:
+        with self.broker._lock:
+            self.consumer_prefetch[queue] = self.prefetch
+            self.broker.queues[queue].consumers.append((self, callback))
+            self.broker._changed.notify_all()
+
+    def can_accept(self, queue_name: str) -> bool:
+        prefetch = self.consumer_prefetch.get(queue_name, self.prefetch)
+        return self._open and (not prefetch or self.unacked_per_queue[queue_name] < prefetch)
+
+    def track(self, queue_name: str, message: _Message) -> Delivery:
+        tag = next(self._tags)
+        self.unacked[tag] = (queue_name, message)
+        self.unacked_per_queue[queue_name] += 1
+        return Delivery(
+            body=message.body,
+            routing_key=message.routing_key,
+            delivery_tag=tag,
+            headers=dict(message.headers),
+            content_type=message.content_type,
+            redelivered=message.redelivered
+        )
+
+    def ack(self, delivery_tag: int) -> None:
+        with self.broker._lock:
+            queue_name, message = self.unacked.pop(delivery_tag)
+            self.unacked_per_queue[queue_name] -= 1
+            self.broker._discard(message)
+            # A freed prefetch slot may unblock a waiting dispatcher
+            self.broker._changed.notify_all()
+
+    def nack(self, delivery_tag: int, requeue: bool = False) -> None:
+        with self.broker._lock:
+            queue_name, message = self.unacked.pop(delivery_tag)
+            self.unacked_per_queue[queue_name] -= 1
+            if requeue:
+                message.redelivered = True
+                self.broker.queues[queue_name].messages.appendleft(message)
+            else:
+                self.broker._discard(message)
+            self.broker._changed.notify_all()
+
+    def get(self, queue: str) -> Optional[Delivery]:
+        with self.broker._lock:
+            self.broker._expire()
+            messages = self.broker.queues[queue].messages
+            if not messages:
+                return None
+            return self.track(queue, messages.popleft())
+
+    def purge(self, queue: str) -> int:
+        return self.broker.purge(queue)
+
+    def start_consuming(self) -> None:
+        self._consuming = True
+        while self._consuming:
+            if not self.broker.run_until_idle():
+                self.broker.wait_for_work()
+
+    def stop_consuming(self) -> None:
+        self._consuming = False
+        self.broker.wake()
+
+
+# Shared broker for transports created in this process
+default_broker = InMemoryBroker()
+
+
+def create_transport() -> Transport:
+    """Build the transport selected by ``settings.EVENT_TRANSPORT``"""
+    if settings.EVENT_TRANSPORT == "memory":
+        return InMemoryTransport()
+    if settings.EVENT_TRANSPORT == "rabbitmq":
+        return PikaTransport()
+    if settings.EVENT_TRANSPORT == "unix":
+        from app.core.local_transport import UnixSocketTransport
+        return UnixSocketTransport()
+    raise ValueError(f"Unknown EVENT_TRANSPORT: {settings.EVENT_TRANSPORT}")
@@ -0,0 +1,181 @@
+import json
+import zlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import Column, DateTime, Float, Integer, LargeBinary, String, create_engine, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import declarative_base, sessionmaker
+from app.core.config import settings
+
+# The archive is its own SQLite file with its own tables, never created in the main database
+ArchiveBase = declarative_base()
+
+# Shipment columns kept for every archived row
+ROW_FIELDS = ("id", "tracking_number", "origin", "destination", "weight", "status",
+              "warehouse_id", "created_at", "updated_at", "field_versions")
+DATETIME_FIELDS = ("created_at", "updated_at")
+
+
+class ArchiveSegment(ArchiveBase):
+    """One archived batch: the rows as a zlib-compressed JSON array. Segments
+    are only ever appended, never rewritten."""
+    __tablename__ = "archive_segments"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    row_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+
+class ArchiveEntry(ArchiveBase):
+    """Index of the archive: where each shipment's row is, plus the fields the
+    warehouse stats need so they can be counted without decompressing"""
+    __tablename__ = "archive_entries"
+
+    tracking_number = Column(String, primary_key=True)
+    shipment_id = Column(Integer, nullable=False, index=True)
+    segment_id = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+    warehouse_id = Column(Integer)
+    status = Column(String)
+    weight = Column(Float)
+
+
+def encode_segment(rows: List[Dict[str, Any]]) -> bytes:
+    rows = [
+        {field: value.isoformat() if field in DATETIME_FIELDS and value is not None else value
+         for field, value in row.items()}
+        for row in rows
+    ]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), settings.ARCHIVE_COMPRESSION_LEVEL)
+
+
+def decode_segment(data: bytes) -> Tuple[Dict[str, Any], ...]:
+    return tuple(json.loads(zlib.decompress(data)))
+
+
+def decode_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    row = dict(row)
+    for field in DATETIME_FIELDS:
+        if row.get(field) is not None:
+            row[field] = datetime.fromisoformat(row[field])
+    return row
+
+
+class ShipmentArchive:
+    """Cold tier for shipments, in a separate SQLite file.
+
+    ``append`` writes a batch of rows as one compressed segment and indexes
+    them by tracking number (and id); ``get`` finds a row through the index and
+    decompresses its segment. Segments never change once written, so recently
+    read ones are kept decoded in memory. ``forget`` only drops the index
+    entry, for rows that went back to the hot table or were deleted.
+    """
+
+    def __init__(self, url: str, cached_segments: int = 32):
+        self.engine = create_engine(url, connect_args={"check_same_thread": False})
+        ArchiveBase.metadata.create_all(bind=self.engine)
+        self.Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=self.engine)
+        self._segment = lru_cache(maxsize=cached_segments)(self._load_segment)
+
+    def append(self, rows: List[Dict[str, Any]]) -> int:
+        """Archive ``rows`` (dicts with ROW_FIELDS) as one segment; returns its id.
+        A row archived again (e.g. after a restore) is re-pointed to the new copy."""
+        db = self.Session()
+        try:
+            segment = ArchiveSegment(row_count=len(rows), data=encode_segment(rows))
+            db.add(segment)
+            db.flush()
+            db.execute(insert(ArchiveEntry).prefix_with("OR REPLACE"), [
+                {
+                    "tracking_number": row["tracking_number"],
+                    "shipment_id": row["id"],
+                    "segment_id": segment.id,
+                    "position": position,
+                    "warehouse_id": row["warehouse_id"],
+                    "status": row["status"],
+                    "weight": row["weight"]
+                }
+                for position, row in enumerate(rows)
+            ])
+            db.commit()
+            return segment.id
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def get(self, tracking_number: str) -> Optional[Dict[str, Any]]:
+        db = self.Session()
+        try:
+            entry = db.get(ArchiveEntry, tracking_number)
+        finally:
+            db.close()
+        return self._row(entry)
+
+    def get_by_id(self, shipment_id: int) -> Optional[Dict[str, Any]]:
+        db = self.Session()
+        try:
+            entry = db.query(ArchiveEntry).filter(ArchiveEntry.shipment_id == shipment_id).first()
+        finally:
+            db.close()
+        return self._row(entry)
+
+    def forget(self, tracking_number: str) -> bool:
+        db = self.Session()
+        try:
+            forgotten = db.query(ArchiveEntry).filter(ArchiveEntry.tracking_number == tracking_number).delete()
+            db.commit()
+            return forgotten > 0
+        finally:
+            db.close()
+
+    def aggregate(self) -> Dict[tuple, tuple]:
+        """Archived shipment count and weight keyed by (warehouse_id, status)"""
+        db = self.Session()
+        try:
+            rows = db.query(
+                ArchiveEntry.warehouse_id, ArchiveEntry.status, func.count(), func.sum(ArchiveEntry.weight)
+            ).group_by(ArchiveEntry.warehouse_id, ArchiveEntry.status).all()
+        finally:
+            db.close()
+        return {(warehouse_id, status): (count, weight) for warehouse_id, status, count, weight in rows}
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        """Every archived row still indexed, undecoded (datetimes as strings),
+        one segment at a time"""
+        db = self.Session()
+        try:
+            entries = db.query(ArchiveEntry.segment_id, ArchiveEntry.position).order_by(
+                ArchiveEntry.segment_id, ArchiveEntry.position
+            ).all()
+            segment_id, rows = None, ()
+            for entry_segment, position in entries:
+                if entry_segment != segment_id:
+                    segment_id = entry_segment
+                    rows = decode_segment(db.get(ArchiveSegment, segment_id).data)
+                    # Segments are read once here; keep the cache for lookups
+                    db.expunge_all()
+                yield rows[position]
+        finally:
+            db.close()
+
+    def _row(self, entry: Optional[ArchiveEntry]) -> Optional[Dict[str, Any]]:
+        if entry is None:
+            return None
+        return decode_row(self._segment(entry.segment_id)[entry.position])
+
+    def _load_segment(self, segment_id: int) -> Tuple[Dict[str, Any], ...]:
+        db = self.Session()
+        try:
+            return decode_segment(db.get(ArchiveSegment, segment_id).data)
+        finally:
+            db.close()
+
+
+# This server's archive; None unless ARCHIVE_AFTER_HOURS is set
+shipment_archive: Optional[ShipmentArchive] = (
+    ShipmentArchive(settings.ARCHIVE_DATABASE_URL) if settings.ARCHIVE_AFTER_HOURS > 0 else None
+)
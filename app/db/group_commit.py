@@ -0,0 +1,152 @@
+import queue
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Write:
+    __slots__ = ("work", "done", "result", "error")
+
+    def __init__(self, work: Callable[[Session], Any]):
+        self.work = work
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class GroupCommitCoordinator:
+    """Commits concurrent writes together.
+
+    Callers hand over a ``work(session)`` function and block. One writer thread
+    takes the first queued write, waits up to ``window`` seconds for more (at
+    most ``max_batch``), runs them one after another on a single session and
+    commits once, so N concurrent writes cost one transaction and one fsync
+    instead of N. The wait is skipped while writes arrive one at a time, so a
+    lone writer pays no extra latency. If a batch fails it is rolled back and
+    its writes are retried one transaction each, so a bad write only fails its
+    own caller.
+
+    ``work`` must not commit, and may run twice when its batch is retried.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], window: float, max_batch: int):
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[_Write]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._last_batch_size = 1
+
+    def submit(self, work: Callable[[Session], T]) -> T:
+        self._ensure_started()
+        write = _Write(work)
+        self._queue.put(write)
+        write.done.wait()
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            try:
+                self._commit(batch)
+            except BaseException as e:
+                logger.error(f"Group commit writer failed: {e}")
+                for write in batch:
+                    write.error = write.error or e
+            finally:
+                for write in batch:
+                    write.done.set()
+
+    def _collect(self) -> List[_Write]:
+        batch = [self._queue.get()]
+        window = self.window if self._last_batch_size > 1 else 0
+        deadline = time.monotonic() + window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                # Past the window, still take whatever queued up meanwhile
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        self._last_batch_size = len(batch)
+        return batch
+
+    def _commit(self, batch: List[_Write]) -> None:
+        try:
+            self._execute(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0].error = e
+                return
+            logger.warning(f"Group commit of {len(batch)} writes failed ({e}); retrying them one by one")
+            for write in batch:
+                self._commit([write])
+
+    def _execute(self, batch: List[_Write]) -> None:
+        session = self.session_factory()
+        try:
+            for write in batch:
+                write.result = write.work(session)
+                session.flush()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        metrics.increment("group_commit.batches")
+        metrics.increment("group_commit.writes", len(batch))
+
+
+_coordinators: Dict[Any, GroupCommitCoordinator] = {}
+_coordinators_lock = threading.Lock()
+
+
+def coordinator_for(bind) -> GroupCommitCoordinator:
+    """One coordinator (and writer thread) per engine"""
+    with _coordinators_lock:
+        if bind not in _coordinators:
+            # Rows are handed back to other threads after commit, so keep them loaded
+            session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=bind)
+            _coordinators[bind] = GroupCommitCoordinator(
+                session_factory, settings.GROUP_COMMIT_WINDOW_MS / 1000, settings.GROUP_COMMIT_MAX_BATCH
+            )
+        return _coordinators[bind]
+
+
+def commit_write(db: Session, work: Callable[[Session], T]) -> T:
+    """Run ``work`` and commit it: batched with concurrent writes when
+    GROUP_COMMIT is on, otherwise alone on ``db``. Returns what ``work`` returned."""
+    with tracer.span("db.commit", group_commit=settings.GROUP_COMMIT):
+        if settings.GROUP_COMMIT:
+            # Hand back any connection ``db`` holds before blocking: the writer takes
+            # its own from the same pool, which blocked callers could otherwise drain
+            db.rollback()
+            return coordinator_for(db.get_bind()).submit(work)
+        try:
+            result = work(db)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return result
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Dead-letter Queue Inspector
+Inspect and replay events that exhausted every retry tier on this server
+
+Usage: SERVER_ID=A python -m app.dlq list [--limit N]
+       SERVER_ID=A python -m app.dlq replay [--limit N]
+       SERVER_ID=A python -m app.dlq purge
+"""
+
+import sys
+import json
+import argparse
+import logging
+from app.core.rabbitmq import (
+    RabbitMQConnection, dead_letter_queue_name,
+    RETRY_COUNT_HEADER, LAST_ERROR_HEADER
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def list_events(transport, dead_queue: str, limit: int):
+    """Print dead-lettered events without removing them from the queue"""
+    delivery_tags = []
+    for _ in range(limit):
+        delivery = transport.get(dead_queue)
+        if delivery is None:
+            break
+        delivery_tags.append(delivery.delivery_tag)
+        headers = delivery.headers
+        try:
+            message = json.loads(delivery.body)
+        except ValueError:
+            message = {"raw": delivery.body.decode(errors="replace")}
+        print(json.dumps({
+            "retries": headers.get(RETRY_COUNT_HEADER, 0),
+            "last_error": headers.get(LAST_ERROR_HEADER),
+            "operation_name": headers.get("operation-name"),
+            "source_server": message.get("source_server"),
+            "event_type": message.get("event_type"),
+            "url": message.get("url"),
+            "method": message.get("method"),
+            "timestamp": message.get("timestamp"),
+        }))
+
+    # Put everything back untouched
+    for delivery_tag in delivery_tags:
+        transport.nack(delivery_tag, requeue=True)
+    return len(delivery_tags)
+
+
+def replay_events(transport, queue_name: str, dead_queue: str, limit: int):
+    """Move dead-lettered events back onto the main queue with a fresh retry budget"""
+    replayed = 0
+    for _ in range(limit):
+        delivery = transport.get(dead_queue)
+        if delivery is None:
+            break
+        headers = dict(delivery.headers)
+        headers.pop(RETRY_COUNT_HEADER, None)
+        headers.pop(LAST_ERROR_HEADER, None)
+        transport.publish('', queue_name, delivery.body,
+                          headers=headers, content_type=delivery.content_type)
+        transport.ack(delivery.delivery_tag)
+        replayed += 1
+    return replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and replay dead-lettered events")
+    parser.add_argument("command", choices=["list", "replay", "purge"])
+    parser.add_argument("--limit", type=int, default=100, help="Maximum number of events to handle")
+    args = parser.parse_args()
+
+    connection = RabbitMQConnection()
+    if not connection.connect():
+        logger.error("Cannot inspect dead-letter queue: No RabbitMQ connection")
+        sys.exit(1)
+
+    queue_name = connection.queue_name
+    dead_queue = dead_letter_queue_name(queue_name)
+    transport = connection.transport
+
+    try:
+        if args.command == "list":
+            count = list_events(transport, dead_queue, args.limit)
+            logger.info(f"{count} dead-lettered event(s) in {dead_queue}")
+        elif args.command == "replay":
+            transport.confirm_delivery()
+            count = replay_events(transport, queue_name, dead_queue, args.limit)
+            logger.info(f"Replayed {count} event(s) from {dead_queue} to {queue_name}")
+        else:
+            count = transport.purge(dead_queue)
+            logger.info(f"Purged {count} event(s) from {dead_queue}")
+    finally:
+        connection.disconnect()
+
+
+if __name__ == "__main__":
+    main()
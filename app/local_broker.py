@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Local Event Broker
+Run this script once per host to let co-located servers exchange events over a
+Unix domain socket instead of RabbitMQ (servers and consumers use EVENT_TRANSPORT=unix)
+"""
+
+import signal
+import logging
+from app.core.local_transport import LocalBrokerServer
+from app.core.config import settings
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    server = LocalBrokerServer()
+    logger.info(f"Starting local broker on {settings.LOCAL_BROKER_SOCKET} (log: {settings.LOCAL_BROKER_LOG or 'disabled'})")
+    
+    signal.signal(signal.SIGTERM, lambda *_: server.stop())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Local broker stopped by user")
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,17 @@ from app.core.config import settings
 from app.api.api_v1.api import api_router
 from app.db.session import init_db
 from app.core.rabbitmq import rabbitmq
-from app.core.middleware import ReplicationMiddleware
+from app.core.middleware import ConsistencyMiddleware, ReplicationMiddleware, TracingMiddleware
+from app.core.async_consumer import AsyncEventConsumer
+from app.services.replication import DirectEventConsumer
+from app.services.consistency import PositionTracker
+from app.services.archiver import Archiver
+from app.db.archive import shipment_archive
+from app.core.logs import configure_logging
 import logging
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 @asynccontextmanager
@@ -24,10 +30,28 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("Could not connect to RabbitMQ - events will not be published")
     
+    app.state.event_consumer = None
+    app.state.archiver = None
+    if settings.EMBEDDED_CONSUMER:
+        if settings.PUBLISHER_MODE == "sidecar":
+            # Every worker would compete for the same queue and apply events out of order
+            logger.warning("EMBEDDED_CONSUMER is ignored with multiple workers - run app/consumer.py instead")
+        else:
+            positions = PositionTracker() if settings.CONSISTENCY_TOKENS else None
+            app.state.event_consumer = AsyncEventConsumer(DirectEventConsumer(positions=positions))
+            app.state.event_consumer.start()
+            if shipment_archive is not None:
+                app.state.archiver = Archiver(shipment_archive)
+                app.state.archiver.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    if app.state.event_consumer is not None:
+        await app.state.event_consumer.stop(settings.CONSUMER_DRAIN_TIMEOUT)
+    if app.state.archiver is not None:
+        app.state.archiver.stop()
     rabbitmq.disconnect()
 
 app = FastAPI(
@@ -40,6 +64,9 @@ app = FastAPI(
 
 # Add middleware
 app.add_middleware(ReplicationMiddleware)
+if settings.CONSISTENCY_TOKENS:
+    app.add_middleware(ConsistencyMiddleware)
+app.add_middleware(TracingMiddleware)
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
@@ -11,6 +11,8 @@ class Warehouse(Base):
     name = Column(String, nullable=False)
     location = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # HLC stamp of the last write to each field, for last-writer-wins replication
+    field_versions = Column(JSON)
     
     # Relationship
     shipments = relationship("Shipment", back_populates="warehouse")
@@ -28,6 +30,48 @@ class Shipment(Base):
     warehouse_id = Column(Integer, ForeignKey("warehouses.id"))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    field_versions = Column(JSON)
     
     # Relationship
-    warehouse = relationship("Warehouse", back_populates="shipments")
\ No newline at end of file
+    warehouse = relationship("Warehouse", back_populates="shipments")
+
+
+class WarehouseStats(Base):
+    """Shipment count and weight per warehouse and status, kept current by
+    ShipmentService in the same transaction as each shipment write"""
+    __tablename__ = "warehouse_stats"
+    
+    warehouse_id = Column(Integer, primary_key=True)
+    status = Column(String, primary_key=True)
+    shipment_count = Column(Integer, nullable=False, default=0)
+    total_weight = Column(Float, nullable=False, default=0.0)
+
+
+class Tombstone(Base):
+    """Key and HLC stamp of every deleted row, so a replicated write that lost
+    to the delete can be told apart from one whose create has not arrived yet"""
+    __tablename__ = "tombstones"
+    
+    resource_type = Column(String, primary_key=True)  # warehouse, shipment
+    resource_key = Column(String, primary_key=True)   # warehouse id, tracking number
+    hlc = Column(String, nullable=False)
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+class ReplicationPosition(Base):
+    """Newest event of each origin server and lane applied here, for
+    read-your-writes consistency tokens"""
+    __tablename__ = "replication_positions"
+    
+    source_server = Column(String, primary_key=True)
+    lane = Column(String, primary_key=True)
+    seq = Column(String, nullable=False)  # origin's publish sequence (an HLC stamp)
+
+
+class ReplicationHold(Base):
+    """Event that failed here and waits in a retry tier or the dead-letter
+    queue: positions at or past it do not count as applied until it is"""
+    __tablename__ = "replication_holds"
+    
+    source_server = Column(String, primary_key=True)
+    lane = Column(String, primary_key=True)
+    seq = Column(String, primary_key=True)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Publisher Sidecar
+Holds the single broker connection for one server and publishes the events its API
+workers hand over on a local Unix socket. Started by `start_server.py --prod`.
+"""
+
+import sys
+import signal
+import logging
+import threading
+from app.core.config import settings
+from app.core.rabbitmq import RabbitMQConnection, publisher_socket_path
+from app.core.local_transport import PublisherSidecar
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    sidecar = PublisherSidecar(RabbitMQConnection(), publisher_socket_path())
+    if not sidecar.start():
+        logger.error("Cannot start publisher sidecar: No broker connection")
+        sys.exit(1)
+    
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    try:
+        stopping.wait()
+    except KeyboardInterrupt:
+        pass
+    logger.info(f"Draining publisher sidecar for server {settings.SERVER_ID}")
+    sidecar.stop(timeout=settings.SHUTDOWN_TIMEOUT)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 
 class WarehouseBase(BaseModel):
@@ -49,15 +49,29 @@ class Shipment(ShipmentBase):
     id: int
     status: str
     created_at: datetime
-    updated_at: datetime
+    # The column is nullable; rows loaded in bulk may never have been stamped
+    updated_at: Optional[datetime] = None
     
     class Config:
         from_attributes = True
 
 
 class ShipmentWithWarehouse(Shipment):
-    warehouse: Warehouse
+    # None once the warehouse has been deleted
+    warehouse: Optional[Warehouse] = None
 
 
 class WarehouseWithShipments(Warehouse):
-    shipments: List[Shipment] = []
\ No newline at end of file
+    shipments: List[Shipment] = []
+
+
+class StatusStats(BaseModel):
+    shipment_count: int
+    total_weight: float
+
+
+class WarehouseStats(BaseModel):
+    warehouse_id: int
+    shipment_count: int
+    total_weight: float
+    by_status: Dict[str, StatusStats] = {}
\ No newline at end of file
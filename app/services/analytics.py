@@ -0,0 +1,287 @@
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.partitioning import held_rows_filter
+from app.db import archive
+from app.db.session import SessionLocal
+from app.models.logistic import Shipment
+
+logger = logging.getLogger(__name__)
+
+# Columns of the snapshot, in the order rows are given to ShipmentSnapshot.from_rows
+COLUMNS = ("tracking_number", "origin", "destination", "weight", "status", "warehouse_id")
+NO_WAREHOUSE = -1
+
+
+class StringDictionary:
+    """Dictionary encoding: each distinct string gets a small integer code, so a
+    column of strings is stored (and grouped on) as an integer array"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ShipmentSnapshot:
+    """Columnar copy of the shipments: one NumPy array per column, with origin,
+    destination and status dictionary-encoded.
+
+    Rows are addressed by tracking number. ``upsert`` overwrites a row in place
+    (or appends one, growing the arrays by doubling) and ``remove`` only clears
+    its ``alive`` flag; the arrays are compacted once a quarter of the rows are
+    dead. Aggregates are computed over the live rows with bincount/histogram,
+    never row by row in Python.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        # Origins and destinations share one dictionary so the flow matrix is square
+        self.places = StringDictionary()
+        self.statuses = StringDictionary()
+        self.rows: Dict[str, int] = {}
+        self.size = 0
+        self.dead = 0
+        self.origin = np.zeros(capacity, dtype=np.int32)
+        self.destination = np.zeros(capacity, dtype=np.int32)
+        self.status = np.zeros(capacity, dtype=np.int32)
+        self.warehouse_id = np.zeros(capacity, dtype=np.int64)
+        self.weight = np.zeros(capacity, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple]) -> "ShipmentSnapshot":
+        """Build from (tracking_number, origin, destination, weight, status, warehouse_id) tuples"""
+        rows = list(rows)
+        snapshot = cls(capacity=max(1024, len(rows)))
+        count = 0
+        for tracking_number, origin, destination, weight, status, warehouse_id in rows:
+            index = snapshot.rows.get(tracking_number)
+            if index is None:
+                index = snapshot.rows[tracking_number] = count
+                count += 1
+            snapshot.origin[index] = snapshot.places.encode(origin)
+            snapshot.destination[index] = snapshot.places.encode(destination)
+            snapshot.status[index] = snapshot.statuses.encode(status)
+            snapshot.warehouse_id[index] = NO_WAREHOUSE if warehouse_id is None else warehouse_id
+            snapshot.weight[index] = weight
+        snapshot.size = count
+        snapshot.alive[:count] = True
+        return snapshot
+
+    def __len__(self) -> int:
+        return self.size - self.dead
+
+    def upsert(self, values: Dict[str, Any]) -> None:
+        index = self.rows.get(values["tracking_number"])
+        if index is None:
+            if self.size == len(self.alive):
+                self._resize(2 * len(self.alive))
+            index = self.rows[values["tracking_number"]] = self.size
+            self.size += 1
+        self.origin[index] = self.places.encode(values["origin"])
+        self.destination[index] = self.places.encode(values["destination"])
+        self.status[index] = self.statuses.encode(values["status"])
+        warehouse_id = values.get("warehouse_id")
+        self.warehouse_id[index] = NO_WAREHOUSE if warehouse_id is None else warehouse_id
+        self.weight[index] = values["weight"]
+        self.alive[index] = True
+
+    def remove(self, tracking_number: str) -> None:
+        index = self.rows.pop(tracking_number, None)
+        if index is None:
+            return
+        self.alive[index] = False
+        self.dead += 1
+        if self.dead > 1024 and self.dead * 4 > self.size:
+            self._compact()
+
+    def _resize(self, capacity: int) -> None:
+        for column in ("origin", "destination", "status", "warehouse_id", "weight", "alive"):
+            array = getattr(self, column)
+            grown = np.zeros(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            setattr(self, column, grown)
+
+    def _compact(self) -> None:
+        keep = np.flatnonzero(self.alive[:self.size])
+        # Old index -> new index for the rows that stay
+        moved = np.full(self.size, -1, dtype=np.int64)
+        moved[keep] = np.arange(len(keep))
+        self.rows = {tracking_number: int(moved[index]) for tracking_number, index in self.rows.items()}
+        for column in ("origin", "destination", "status", "warehouse_id", "weight"):
+            array = getattr(self, column)
+            array[:len(keep)] = array[keep]
+        self.alive[:] = False
+        self.alive[:len(keep)] = True
+        self.size = len(keep)
+        self.dead = 0
+
+    def _mask(self, status: Optional[str] = None, warehouse_id: Optional[int] = None) -> np.ndarray:
+        mask = self.alive[:self.size].copy()
+        if status is not None:
+            code = self.statuses.codes.get(status)
+            if code is None:
+                return np.zeros(self.size, dtype=bool)
+            mask &= self.status[:self.size] == code
+        if warehouse_id is not None:
+            mask &= self.warehouse_id[:self.size] == warehouse_id
+        return mask
+
+    def status_breakdown(self, warehouse_id: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+        mask = self._mask(warehouse_id=warehouse_id)
+        codes = self.status[:self.size][mask]
+        counts = np.bincount(codes, minlength=len(self.statuses))
+        weights = np.bincount(codes, weights=self.weight[:self.size][mask], minlength=len(self.statuses))
+        return {
+            status: {"shipment_count": int(counts[code]), "total_weight": float(weights[code])}
+            for code, status in enumerate(self.statuses.values) if counts[code]
+        }
+
+    def weight_distribution(self, bins: int = 20, status: Optional[str] = None,
+                            warehouse_id: Optional[int] = None) -> Dict[str, Any]:
+        weights = self.weight[:self.size][self._mask(status, warehouse_id)]
+        if not len(weights):
+            return {"shipment_count": 0, "total_weight": 0.0, "histogram": {"counts": [], "edges": []}}
+        counts, edges = np.histogram(weights, bins=bins)
+        p50, p90, p99 = np.percentile(weights, [50, 90, 99])
+        return {
+            "shipment_count": int(len(weights)),
+            "total_weight": float(weights.sum()),
+            "mean": float(weights.mean()),
+            "min": float(weights.min()),
+            "max": float(weights.max()),
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()}
+        }
+
+    def flow_matrix(self, top: int = 20, status: Optional[str] = None,
+                    warehouse_id: Optional[int] = None) -> Dict[str, Any]:
+        """Shipment counts and weights from each origin (rows) to each destination
+        (columns), over the ``top`` places with the most traffic"""
+        mask = self._mask(status, warehouse_id)
+        places = len(self.places)
+        pairs = self.origin[:self.size][mask].astype(np.int64) * places + self.destination[:self.size][mask]
+        counts = np.bincount(pairs, minlength=places * places).reshape(places, places)
+        weights = np.bincount(pairs, weights=self.weight[:self.size][mask],
+                              minlength=places * places).reshape(places, places)
+        traffic = counts.sum(axis=0) + counts.sum(axis=1)
+        busiest = np.argsort(-traffic, kind="stable")[:top]
+        busiest = busiest[traffic[busiest] > 0]
+        return {
+            "places": [self.places.values[code] for code in busiest],
+            "counts": counts[np.ix_(busiest, busiest)].tolist(),
+            "weights": weights[np.ix_(busiest, busiest)].tolist()
+        }
+
+
+class ShipmentAnalytics:
+    """This process's shipment snapshot, kept current by the shipment writes.
+
+    Loaded on the first query (from the shipments table and the archive), then
+    updated by ShipmentService after every committed create, update and delete,
+    local or replicated, so queries never touch the database. Writes that
+    commit while a load runs are queued and applied on top of it. With several
+    API workers each only sees its own writes; ANALYTICS_RELOAD_SECONDS then
+    reloads the snapshot in the background once it is that old.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 reload_seconds: float = settings.ANALYTICS_RELOAD_SECONDS):
+        self.session_factory = session_factory
+        self.reload_seconds = reload_seconds
+        self._snapshot: Optional[ShipmentSnapshot] = None
+        self._loaded_at = 0.0
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def written(self, shipment: Shipment) -> None:
+        self._apply("upsert", {column: getattr(shipment, column) for column in COLUMNS})
+
+    def removed(self, tracking_number: str) -> None:
+        self._apply("remove", tracking_number)
+
+    def _apply(self, kind: str, value: Any) -> None:
+        if self._snapshot is None and self._pending is None:
+            # Nothing loaded yet: the first load reads this write from the database
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((kind, value))
+            if self._snapshot is not None:
+                self._change(self._snapshot, kind, value)
+
+    @staticmethod
+    def _change(snapshot: ShipmentSnapshot, kind: str, value: Any) -> None:
+        if kind == "upsert":
+            snapshot.upsert(value)
+        else:
+            snapshot.remove(value)
+
+    def load(self) -> None:
+        """(Re)build the snapshot from the database while the current one, if
+        any, keeps serving queries"""
+        with self._load_lock:
+            started = time.perf_counter()
+            with self._lock:
+                self._pending = []
+            try:
+                snapshot = ShipmentSnapshot.from_rows(self._read_rows())
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                raise
+            with self._lock:
+                for kind, value in self._pending:
+                    self._change(snapshot, kind, value)
+                self._pending = None
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+            metrics.increment("analytics.loads")
+            logger.info(f"Loaded analytics snapshot of {len(snapshot)} shipments "
+                        f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def _read_rows(self) -> Iterable[Tuple]:
+        # Archived rows come first: a row restored to the hot table overrides its archived copy
+        if archive.shipment_archive is not None:
+            for row in archive.shipment_archive.iter_rows():
+                yield tuple(row[column] for column in COLUMNS)
+        db = self.session_factory()
+        try:
+            query = db.query(*(getattr(Shipment, column) for column in COLUMNS))
+            # Rows left over from partitions held elsewhere get no events (PARTITIONING)
+            condition = held_rows_filter(Shipment.warehouse_id)
+            if condition is not None:
+                query = query.filter(condition)
+            yield from query.yield_per(10000)
+        finally:
+            db.close()
+
+    def query(self, aggregate: Callable[[ShipmentSnapshot], Any]) -> Any:
+        if self._snapshot is None:
+            self.load()
+        elif self.reload_seconds > 0 and time.monotonic() - self._loaded_at > self.reload_seconds:
+            self._loaded_at = time.monotonic()
+            threading.Thread(target=self.load, name="analytics-reload", daemon=True).start()
+        with self._lock:
+            return aggregate(self._snapshot)
+
+
+# Snapshot of this process, shared by the analytics endpoints
+shipment_analytics = ShipmentAnalytics()
@@ -0,0 +1,65 @@
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db.archive import ShipmentArchive
+from app.db.session import SessionLocal
+from app.services.logistic_service import ArchiveService
+
+logger = logging.getLogger(__name__)
+
+
+class Archiver:
+    """Moves delivered shipments older than ``after_hours`` to the archive in a
+    background thread: a pass every ``interval`` seconds, one batch (one short
+    transaction) at a time so foreground writes are never held up for long.
+    Runs where the server's consumer runs, so one per server."""
+
+    def __init__(self, shipment_archive: ShipmentArchive,
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 after_hours: float = settings.ARCHIVE_AFTER_HOURS,
+                 batch_size: int = settings.ARCHIVE_BATCH_SIZE,
+                 interval: float = settings.ARCHIVE_INTERVAL_SECONDS):
+        self.archive = shipment_archive
+        self.session_factory = session_factory
+        self.after_hours = after_hours
+        self.batch_size = batch_size
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_pass(self) -> int:
+        """Archive every shipment that is due; returns how many were moved"""
+        delivered_before = datetime.utcnow() - timedelta(hours=self.after_hours)
+        total = 0
+        while not self._stop.is_set():
+            db = self.session_factory()
+            try:
+                moved = ArchiveService.archive_batch(db, self.archive, delivered_before, self.batch_size)
+            finally:
+                db.close()
+            total += moved
+            if moved < self.batch_size:
+                break
+        if total:
+            logger.info(f"Archived {total} delivered shipments")
+        return total
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_pass()
+            except Exception as e:
+                logger.error(f"Archive pass failed: {e}")
+            self._stop.wait(self.interval)
@@ -0,0 +1,122 @@
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.lanes import DEFAULT_LANE
+from app.db.session import SessionLocal
+from app.models.logistic import ReplicationPosition, ReplicationHold
+
+logger = logging.getLogger(__name__)
+
+
+class PositionTracker:
+    """Records which events from each origin have been applied here.
+
+    ``applied`` raises the (origin, lane) position to the event's ``seq`` and
+    clears its hold; ``held`` marks an event that failed and went to a retry
+    tier or the dead-letter queue. Records are buffered and written in one
+    transaction every ``flush_interval`` seconds by a background thread, so
+    the consumer pays no extra commit per event (an interval of 0 writes on
+    every call). Events published without a ``seq`` are not tracked.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 flush_interval: float = settings.CONSISTENCY_FLUSH_MS / 1000):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self._pending: List[Tuple[str, str, str, str]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def applied(self, message: Dict[str, Any]) -> None:
+        self._record("applied", message)
+
+    def held(self, message: Dict[str, Any]) -> None:
+        self._record("held", message)
+
+    def _record(self, kind: str, message: Dict[str, Any]) -> None:
+        seq = message.get("seq")
+        if not seq or not message.get("source_server"):
+            return
+        with self._lock:
+            self._pending.append((kind, message["source_server"], message.get("lane") or DEFAULT_LANE, seq))
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._ensure_started()
+        self._wakeup.set()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="position-tracker", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # Positions are only an optimisation for readers: they wait or redirect
+                logger.error(f"Failed to record replication positions: {e}")
+            # Records made meanwhile go out together in the next flush
+            time.sleep(self.flush_interval)
+
+    def flush(self) -> None:
+        """Write the buffered records, in the order they were made"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        db = self.session_factory()
+        try:
+            for kind, source_server, lane, seq in pending:
+                if kind == "held":
+                    db.execute(insert(ReplicationHold).values(
+                        source_server=source_server, lane=lane, seq=seq
+                    ).on_conflict_do_nothing())
+                    continue
+                statement = insert(ReplicationPosition).values(source_server=source_server, lane=lane, seq=seq)
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=[ReplicationPosition.source_server, ReplicationPosition.lane],
+                    set_={"seq": func.max(ReplicationPosition.seq, statement.excluded.seq)}
+                ))
+                db.query(ReplicationHold).filter(
+                    ReplicationHold.source_server == source_server,
+                    ReplicationHold.lane == lane,
+                    ReplicationHold.seq == seq
+                ).delete(synchronize_session=False)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+class ConsistencyService:
+    @staticmethod
+    def caught_up(db: Session, source_server: str, positions: Dict[str, str]) -> bool:
+        """Whether every event of ``source_server`` up to ``positions`` (lane ->
+        seq) has been applied here: each lane's position has reached its seq and
+        no earlier event of that lane is still waiting for a retry"""
+        for lane, seq in positions.items():
+            position = db.get(ReplicationPosition, (source_server, lane))
+            if position is None or position.seq < seq:
+                return False
+            if db.query(ReplicationHold.seq).filter(
+                ReplicationHold.source_server == source_server,
+                ReplicationHold.lane == lane,
+                ReplicationHold.seq <= seq
+            ).first() is not None:
+                return False
+        return True
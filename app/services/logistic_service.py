@@ -1,24 +1,74 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Any, Dict, List, Optional
 from fastapi import Request
-from app.models.logistic import Warehouse, Shipment
+from app.models.logistic import Warehouse, Shipment, WarehouseStats, Tombstone
 from app.schemas.logistic import (
     WarehouseCreate, WarehouseUpdate, 
     ShipmentCreate, ShipmentUpdate
 )
 from app.core.rabbitmq import DistributedEventProducer
+from app.core.hlc import hlc
+from app.core.logs import log_event
+from app.core.metrics import metrics
+from app.core.partitioning import held_rows_filter, holds_locally
+from app.db.group_commit import commit_write
+from app.db import archive
+from app.services.analytics import shipment_analytics
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def write_stamp(request: Request, db_obj=None) -> str:
+    """HLC stamp for a write: the origin's stamp when replicating, a new one otherwise"""
+    if getattr(request.state, 'is_replicated', False) and getattr(request.state, 'hlc', None):
+        hlc.update(request.state.hlc)
+        return request.state.hlc
+    if db_obj is not None and db_obj.field_versions:
+        # The row may carry stamps from another worker's clock; stay ahead of them
+        hlc.update(max(db_obj.field_versions.values()))
+    return hlc.now()
+
+
+def apply_fields(db_obj, update_data: Dict[str, Any], stamp: str) -> Dict[str, Any]:
+    """Per-field last-writer-wins: a field only changes if its last write is
+    older than ``stamp``, so replicas converge whatever order updates arrive in.
+    Returns the fields that were applied."""
+    versions = dict(db_obj.field_versions or {})
+    applied = {}
+    for field, value in update_data.items():
+        if versions.get(field, "") >= stamp:
+            continue
+        setattr(db_obj, field, value)
+        versions[field] = stamp
+        applied[field] = value
+    db_obj.field_versions = versions
+    return applied
+
+
+def insert_row(db: Session, model, values: Dict[str, Any]):
+    """INSERT ... RETURNING: the new row comes back from the INSERT itself, no refresh SELECT"""
+    return db.scalar(insert(model).values(**values).returning(model))
+
+
+def archived_shipment(values: Optional[Dict[str, Any]]) -> Optional[Shipment]:
+    """Shipment rebuilt from its archived row; not attached to any session"""
+    return Shipment(**values) if values is not None else None
+
+
 class WarehouseService:
     @staticmethod
     def create_warehouse(db: Session, warehouse: WarehouseCreate, operation_name: str, request: Request) -> Warehouse:
-        db_warehouse = Warehouse(**warehouse.dict())
-        db.add(db_warehouse)
-        db.commit()
-        db.refresh(db_warehouse)
+        stamp = write_stamp(request)
+        data = warehouse.dict()
+        db_warehouse = commit_write(db, lambda session: insert_row(
+            session, Warehouse, dict(data, field_versions=dict.fromkeys(data, stamp))
+        ))
         
         # Only publish event if this is not a replicated request
         if not getattr(request.state, 'is_replicated', False):
@@ -27,12 +77,14 @@ class WarehouseService:
                     "id": db_warehouse.id,
                     "name": db_warehouse.name,
                     "location": db_warehouse.location,
-                    "created_at": db_warehouse.created_at.isoformat()
+                    "created_at": db_warehouse.created_at.isoformat(),
+                    "hlc": stamp
                 },
                 operation_name
             )
         else:
-            logger.info(f"Skipping event publishing for replicated warehouse creation from {request.state.source_server}")
+            log_event(logger, "replication.request", "Skipping event publishing for replicated warehouse creation from %s",
+                      request.state.source_server)
         
         return db_warehouse
     
@@ -45,17 +97,51 @@ class WarehouseService:
         return db.query(Warehouse).offset(skip).limit(limit).all()
     
     @staticmethod
-    def update_warehouse(db: Session, warehouse_id: int, warehouse_update: WarehouseUpdate, operation_name: str, request: Request) -> Optional[Warehouse]:
-        db_warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
-        if not db_warehouse:
-            return None
+    def get_warehouses_with_shipments(db: Session, skip: int = 0, limit: int = 100,
+                                      shipment_skip: int = 0, shipment_limit: int = 20) -> List[Warehouse]:
+        """Warehouses with a page of their shipments each, in two SELECTs in total"""
+        warehouses = WarehouseService.get_warehouses(db, skip=skip, limit=limit)
+        WarehouseService.load_shipment_pages(db, warehouses, shipment_skip, shipment_limit)
+        return warehouses
+    
+    @staticmethod
+    def load_shipment_pages(db: Session, warehouses: List[Warehouse], skip: int, limit: int) -> None:
+        """Fill ``warehouse.shipments`` for every warehouse with one SELECT.
         
-        update_data = warehouse_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_warehouse, field, value)
+        Works like selectinload (one IN query for all parents), but numbers each
+        warehouse's shipments with a window function so the inner list can be
+        paginated per warehouse, which selectinload cannot do.
+        """
+        if not warehouses:
+            return
+        position = func.row_number().over(partition_by=Shipment.warehouse_id, order_by=Shipment.id)
+        ranked = select(Shipment.id, position.label("position")).where(
+            Shipment.warehouse_id.in_([warehouse.id for warehouse in warehouses])
+        ).subquery()
+        shipments = db.query(Shipment).join(ranked, Shipment.id == ranked.c.id).filter(
+            ranked.c.position > skip,
+            ranked.c.position <= skip + limit
+        ).order_by(Shipment.id).all()
         
-        db.commit()
-        db.refresh(db_warehouse)
+        pages = defaultdict(list)
+        for shipment in shipments:
+            pages[shipment.warehouse_id].append(shipment)
+        for warehouse in warehouses:
+            set_committed_value(warehouse, "shipments", pages[warehouse.id])
+    
+    @staticmethod
+    def update_warehouse(db: Session, warehouse_id: int, warehouse_update: WarehouseUpdate, operation_name: str, request: Request) -> Optional[Warehouse]:
+        def write(session):
+            db_warehouse = session.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+            if not db_warehouse:
+                return None
+            stamp = write_stamp(request, db_warehouse)
+            return db_warehouse, stamp, apply_fields(db_warehouse, warehouse_update.dict(exclude_unset=True), stamp)
+        
+        written = commit_write(db, write)
+        if written is None:
+            return None
+        db_warehouse, stamp, update_data = written
         
         # Only publish event if this is not a replicated request
         if not getattr(request.state, 'is_replicated', False):
@@ -64,35 +150,43 @@ class WarehouseService:
                     "id": db_warehouse.id,
                     "name": db_warehouse.name,
                     "location": db_warehouse.location,
-                    "updated_fields": list(update_data.keys())
+                    "updated_fields": list(update_data.keys()),
+                    "hlc": stamp
                 },
                 operation_name
             )
         else:
-            logger.info(f"Skipping event publishing for replicated warehouse update from {request.state.source_server}")
+            log_event(logger, "replication.request", "Skipping event publishing for replicated warehouse update from %s",
+                      request.state.source_server)
         
         return db_warehouse
     
     @staticmethod
     def delete_warehouse(db: Session, warehouse_id: int, operation_name: str, request: Request) -> bool:
-        db_warehouse = db.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
-        if not db_warehouse:
-            return False
-        
-        warehouse_data = {
-            "id": db_warehouse.id,
-            "name": db_warehouse.name,
-            "location": db_warehouse.location
-        }
+        def write(session):
+            db_warehouse = session.query(Warehouse).filter(Warehouse.id == warehouse_id).first()
+            if not db_warehouse:
+                return None
+            stamp = write_stamp(request, db_warehouse)
+            session.delete(db_warehouse)
+            TombstoneService.record(session, "warehouse", db_warehouse.id, stamp)
+            return {
+                "id": db_warehouse.id,
+                "name": db_warehouse.name,
+                "location": db_warehouse.location,
+                "hlc": stamp
+            }
         
-        db.delete(db_warehouse)
-        db.commit()
+        warehouse_data = commit_write(db, write)
+        if warehouse_data is None:
+            return False
         
         # Only publish event if this is not a replicated request
         if not getattr(request.state, 'is_replicated', False):
             DistributedEventProducer.warehouse_deleted(warehouse_data, operation_name)
         else:
-            logger.info(f"Skipping event publishing for replicated warehouse deletion from {request.state.source_server}")
+            log_event(logger, "replication.request", "Skipping event publishing for replicated warehouse deletion from %s",
+                      request.state.source_server)
         
         return True
 
@@ -100,10 +194,21 @@ class WarehouseService:
 class ShipmentService:
     @staticmethod
     def create_shipment(db: Session, shipment: ShipmentCreate, operation_name: str, request: Request) -> Shipment:
-        db_shipment = Shipment(**shipment.model_dump())
-        db.add(db_shipment)
-        db.commit()
-        db.refresh(db_shipment)
+        stamp = write_stamp(request)
+        data = dict(shipment.model_dump(), status="pending")
+        
+        def write(session):
+            if getattr(request.state, 'is_replicated', False):
+                # Redelivered create: the row is already here
+                existing = ShipmentService.get_shipment_by_tracking(session, shipment.tracking_number)
+                if existing:
+                    return existing
+            db_shipment = insert_row(session, Shipment, dict(data, field_versions=dict.fromkeys(data, stamp)))
+            WarehouseStatsService.adjust(session, db_shipment.warehouse_id, db_shipment.status, 1, db_shipment.weight)
+            return db_shipment
+        
+        db_shipment = commit_write(db, write)
+        shipment_analytics.written(db_shipment)
         
         # Only publish event if this is not a replicated request
         if not getattr(request.state, 'is_replicated', False):
@@ -116,83 +221,355 @@ class ShipmentService:
                     "weight": db_shipment.weight,
                     "status": db_shipment.status,
                     "warehouse_id": db_shipment.warehouse_id,
-                    "created_at": db_shipment.created_at.isoformat()
+                    "created_at": db_shipment.created_at.isoformat(),
+                    "hlc": stamp
                 },
                 operation_name
             )
         else:
-            logger.info(f"Skipping event publishing for replicated shipment creation from {request.state.source_server}")
+            log_event(logger, "replication.request", "Skipping event publishing for replicated shipment creation from %s",
+                      request.state.source_server)
         
         return db_shipment
     
     @staticmethod
     def get_shipment(db: Session, shipment_id: int) -> Optional[Shipment]:
-        return db.query(Shipment).filter(Shipment.id == shipment_id).first()
+        shipment = db.query(Shipment).filter(Shipment.id == shipment_id).first()
+        if shipment is None and archive.shipment_archive is not None:
+            return archived_shipment(archive.shipment_archive.get_by_id(shipment_id))
+        return shipment
+    
+    @staticmethod
+    def held(query):
+        """Leave out rows of partitions this server does not hold (PARTITIONING):
+        it receives no events for them, so they may be stale"""
+        condition = held_rows_filter(Shipment.warehouse_id)
+        return query if condition is None else query.filter(condition)
     
     @staticmethod
     def get_shipments(db: Session, skip: int = 0, limit: int = 100) -> List[Shipment]:
-        return db.query(Shipment).offset(skip).limit(limit).all()
+        return ShipmentService.held(db.query(Shipment)).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def get_shipment_rows(db: Session, fields: List[str], skip: int = 0, limit: int = 100) -> List[tuple]:
+        """Same page as get_shipments, as plain column tuples in ``fields`` order"""
+        query = db.query(*(getattr(Shipment, field) for field in fields))
+        return ShipmentService.held(query).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def get_shipments_with_warehouse(db: Session, skip: int = 0, limit: int = 100) -> List[Shipment]:
+        # One SELECT with a LEFT OUTER JOIN instead of a lazy load per shipment
+        query = db.query(Shipment).options(joinedload(Shipment.warehouse))
+        return ShipmentService.held(query).order_by(Shipment.id).offset(skip).limit(limit).all()
+    
+    @staticmethod
+    def get_shipment_with_warehouse(db: Session, shipment_id: int) -> Optional[Shipment]:
+        return db.query(Shipment).options(joinedload(Shipment.warehouse)).filter(Shipment.id == shipment_id).first()
     
     @staticmethod
     def get_shipment_by_tracking(db: Session, tracking_number: str) -> Optional[Shipment]:
+        """Hot table first, then the archive (ARCHIVE_AFTER_HOURS) through its
+        tracking number index; archived shipments come back detached"""
+        shipment = ShipmentService.get_hot_shipment_by_tracking(db, tracking_number)
+        if shipment is None and archive.shipment_archive is not None:
+            return archived_shipment(archive.shipment_archive.get(tracking_number))
+        return shipment
+    
+    @staticmethod
+    def get_hot_shipment_by_tracking(db: Session, tracking_number: str) -> Optional[Shipment]:
         return db.query(Shipment).filter(Shipment.tracking_number == tracking_number).first()
     
+    @staticmethod
+    def find_for_write(db: Session, shipment_id: int, request: Request) -> Optional[Shipment]:
+        """Row a write targets. Replicated writes carry the tracking number, since
+        local ids differ between servers (always so when partitioning)."""
+        resource_key = getattr(request.state, 'resource_key', None)
+        if getattr(request.state, 'is_replicated', False) and resource_key:
+            return ShipmentService.get_hot_shipment_by_tracking(db, resource_key)
+        return db.query(Shipment).filter(Shipment.id == shipment_id).first()
+    
+    @staticmethod
+    def restore_archived(db: Session, shipment_id: int, request: Request) -> None:
+        """Move the shipment a write targets back to the hot table if it has been
+        archived, so updates and deletes of cold rows work as before"""
+        if archive.shipment_archive is None or ShipmentService.find_for_write(db, shipment_id, request):
+            return
+        resource_key = getattr(request.state, 'resource_key', None)
+        if getattr(request.state, 'is_replicated', False) and resource_key:
+            values = archive.shipment_archive.get(resource_key)
+        else:
+            values = archive.shipment_archive.get_by_id(shipment_id)
+        if values is None:
+            return
+        
+        def write(session):
+            if session.get(Shipment, values["id"]) is not None:
+                # The id was taken again after the row left; the tracking number identifies it
+                del values["id"]
+            # Archived rows are still counted in warehouse_stats, so the stats stay as they are
+            insert_row(session, Shipment, values)
+        
+        commit_write(db, write)
+        archive.shipment_archive.forget(values["tracking_number"])
+        metrics.increment("archive.restored")
+    
     @staticmethod
     def update_shipment(db: Session, shipment_id: int, shipment_update: ShipmentUpdate, operation_name: str, request: Request) -> Optional[Shipment]:
-        db_shipment = db.query(Shipment).filter(Shipment.id == shipment_id).first()
-        if not db_shipment:
-            return None
+        ShipmentService.restore_archived(db, shipment_id, request)
         
-        update_data = shipment_update.dict(exclude_unset=True)
-        for field, value in update_data.items():
-            setattr(db_shipment, field, value)
+        def write(session):
+            db_shipment = ShipmentService.find_for_write(session, shipment_id, request)
+            if not db_shipment:
+                return None
+            stamp = write_stamp(request, db_shipment)
+            before = (db_shipment.warehouse_id, db_shipment.status, db_shipment.weight)
+            update_data = apply_fields(db_shipment, shipment_update.dict(exclude_unset=True), stamp)
+            after = (db_shipment.warehouse_id, db_shipment.status, db_shipment.weight)
+            if after != before:
+                WarehouseStatsService.adjust(session, before[0], before[1], -1, -before[2])
+                WarehouseStatsService.adjust(session, after[0], after[1], 1, after[2])
+            return db_shipment, stamp, update_data, before, after
         
-        db.commit()
-        db.refresh(db_shipment)
+        written = commit_write(db, write)
+        if written is None:
+            return None
+        db_shipment, stamp, update_data, before, after = written
+        shipment_analytics.written(db_shipment)
         
         # Only publish event if this is not a replicated request
         if not getattr(request.state, 'is_replicated', False):
-            DistributedEventProducer.shipment_updated(
-                {
-                    "id": db_shipment.id,
-                    "tracking_number": db_shipment.tracking_number,
-                    "origin": db_shipment.origin,
-                    "destination": db_shipment.destination,
-                    "weight": db_shipment.weight,
-                    "status": db_shipment.status,
-                    "warehouse_id": db_shipment.warehouse_id,
-                    "updated_fields": list(update_data.keys())
-                },
-                operation_name
-            )
+            shipment_data = {
+                "id": db_shipment.id,
+                "tracking_number": db_shipment.tracking_number,
+                "origin": db_shipment.origin,
+                "destination": db_shipment.destination,
+                "weight": db_shipment.weight,
+                "status": db_shipment.status,
+                "warehouse_id": db_shipment.warehouse_id,
+                "updated_fields": list(update_data.keys()),
+                "hlc": stamp
+            }
+            if DistributedEventProducer.changes_partition(before[0], after[0]):
+                # Holders of the old partition drop the row, holders of the new one get all of it
+                DistributedEventProducer.shipment_moved(
+                    dict(shipment_data, warehouse_id=before[0]), shipment_data, hlc.now(), operation_name
+                )
+                if not holds_locally(after[0]):
+                    # Moved out of this server's partitions: it would get no more events for the row
+                    ShipmentService.drop_local(db, db_shipment.tracking_number)
+            else:
+                DistributedEventProducer.shipment_updated(shipment_data, operation_name)
         else:
-            logger.info(f"Skipping event publishing for replicated shipment update from {request.state.source_server}")
+            log_event(logger, "replication.request", "Skipping event publishing for replicated shipment update from %s",
+                      request.state.source_server)
         
         return db_shipment
     
+    @staticmethod
+    def drop_local(db: Session, tracking_number: str) -> None:
+        """Remove this server's copy of a shipment without publishing or leaving a
+        tombstone; the shipment itself lives on in the servers holding its partition"""
+        def write(session):
+            db_shipment = ShipmentService.get_hot_shipment_by_tracking(session, tracking_number)
+            if db_shipment:
+                session.delete(db_shipment)
+                WarehouseStatsService.adjust(session, db_shipment.warehouse_id, db_shipment.status, -1, -db_shipment.weight)
+        
+        commit_write(db, write)
+        shipment_analytics.removed(tracking_number)
+        ShipmentService.forget_archived(tracking_number)
+    
+    @staticmethod
+    def forget_archived(tracking_number: str) -> None:
+        """Drop a removed shipment's archive entry, if any, so reads do not fall
+        back to the old copy (a row changed while being archived keeps one)"""
+        if archive.shipment_archive is not None and archive.shipment_archive.forget(tracking_number):
+            logger.info(f"Dropped archived copy of {tracking_number}")
+    
     @staticmethod
     def delete_shipment(db: Session, shipment_id: int, operation_name: str, request: Request) -> bool:
-        db_shipment = db.query(Shipment).filter(Shipment.id == shipment_id).first()
-        if not db_shipment:
-            return False
+        ShipmentService.restore_archived(db, shipment_id, request)
         
-        shipment_data = {
-            "id": db_shipment.id,
-            "tracking_number": db_shipment.tracking_number,
-            "origin": db_shipment.origin,
-            "destination": db_shipment.destination,
-            "weight": db_shipment.weight,
-            "status": db_shipment.status,
-            "warehouse_id": db_shipment.warehouse_id
-        }
+        def write(session):
+            db_shipment = ShipmentService.find_for_write(session, shipment_id, request)
+            if not db_shipment:
+                return None
+            stamp = write_stamp(request, db_shipment)
+            session.delete(db_shipment)
+            WarehouseStatsService.adjust(session, db_shipment.warehouse_id, db_shipment.status, -1, -db_shipment.weight)
+            TombstoneService.record(session, "shipment", db_shipment.tracking_number, stamp)
+            return {
+                "id": db_shipment.id,
+                "tracking_number": db_shipment.tracking_number,
+                "origin": db_shipment.origin,
+                "destination": db_shipment.destination,
+                "weight": db_shipment.weight,
+                "status": db_shipment.status,
+                "warehouse_id": db_shipment.warehouse_id,
+                "hlc": stamp
+            }
         
-        db.delete(db_shipment)
-        db.commit()
+        shipment_data = commit_write(db, write)
+        if shipment_data is None:
+            return False
+        shipment_analytics.removed(shipment_data["tracking_number"])
+        ShipmentService.forget_archived(shipment_data["tracking_number"])
         
         # Only publish event if this is not a replicated request
         if not getattr(request.state, 'is_replicated', False):
             DistributedEventProducer.shipment_deleted(shipment_data, operation_name)
         else:
-            logger.info(f"Skipping event publishing for replicated shipment deletion from {request.state.source_server}")
+            log_event(logger, "replication.request", "Skipping event publishing for replicated shipment deletion from %s",
+                      request.state.source_server)
         
         return True
+
+
+class TombstoneService:
+    @staticmethod
+    def record(db: Session, resource_type: str, resource_key, stamp: str) -> None:
+        """Remember a delete in the caller's transaction, keeping the newest stamp"""
+        statement = insert(Tombstone).values(resource_type=resource_type, resource_key=str(resource_key), hlc=stamp)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[Tombstone.resource_type, Tombstone.resource_key],
+            set_={"hlc": func.max(Tombstone.hlc, statement.excluded.hlc)}
+        ))
+    
+    @staticmethod
+    def superseded(db: Session, resource_type: str, request: Request, resource_id=None, is_delete: bool = False) -> bool:
+        """Whether a replicated write that found no row lost to a delete.
+        
+        True for updates stamped no later than the delete (deletes win over
+        concurrent updates) and for repeated deletes; such writes are done, not
+        waiting on a create, so they must not be retried.
+        """
+        if not getattr(request.state, 'is_replicated', False):
+            return False
+        resource_key = getattr(request.state, 'resource_key', None) if resource_type == "shipment" else resource_id
+        if resource_key is None:
+            return False
+        tombstone = db.get(Tombstone, (resource_type, str(resource_key)))
+        if tombstone is None:
+            return False
+        stamp = getattr(request.state, 'hlc', None)
+        return is_delete or stamp is None or stamp <= tombstone.hlc
+
+
+class WarehouseStatsService:
+    @staticmethod
+    def adjust(db: Session, warehouse_id: int, status: str, count: int, weight: float) -> None:
+        """Add ``count`` shipments and ``weight`` to a warehouse/status bucket.
+        Runs in the caller's transaction so stats commit together with the shipment."""
+        statement = insert(WarehouseStats).values(
+            warehouse_id=warehouse_id, status=status, shipment_count=count, total_weight=weight
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[WarehouseStats.warehouse_id, WarehouseStats.status],
+            set_={
+                "shipment_count": WarehouseStats.shipment_count + statement.excluded.shipment_count,
+                "total_weight": WarehouseStats.total_weight + statement.excluded.total_weight
+            }
+        ))
+    
+    @staticmethod
+    def get_stats(db: Session, warehouse_id: int) -> dict:
+        """Read one warehouse's stats: a primary-key lookup, one row per status"""
+        rows = db.query(WarehouseStats).filter(
+            WarehouseStats.warehouse_id == warehouse_id,
+            WarehouseStats.shipment_count > 0
+        ).all()
+        return {
+            "warehouse_id": warehouse_id,
+            "shipment_count": sum(row.shipment_count for row in rows),
+            "total_weight": sum(row.total_weight for row in rows),
+            "by_status": {
+                row.status: {"shipment_count": row.shipment_count, "total_weight": row.total_weight}
+                for row in rows
+            }
+        }
+    
+    @staticmethod
+    def aggregate(db: Session) -> Dict[tuple, tuple]:
+        """Stats recomputed from the shipments table and the archive, keyed by (warehouse_id, status)"""
+        rows = db.query(
+            Shipment.warehouse_id, Shipment.status, func.count(Shipment.id), func.sum(Shipment.weight)
+        ).group_by(Shipment.warehouse_id, Shipment.status).all()
+        buckets = {(warehouse_id, status): (count, weight) for warehouse_id, status, count, weight in rows}
+        if archive.shipment_archive is not None:
+            for key, (count, weight) in archive.shipment_archive.aggregate().items():
+                hot_count, hot_weight = buckets.get(key, (0, 0.0))
+                buckets[key] = (hot_count + count, hot_weight + weight)
+        return buckets
+    
+    @staticmethod
+    def find_drift(db: Session, tolerance: float = 1e-6) -> List[dict]:
+        """Buckets where the maintained stats disagree with the shipments table"""
+        expected = WarehouseStatsService.aggregate(db)
+        stored = {
+            (row.warehouse_id, row.status): (row.shipment_count, row.total_weight)
+            for row in db.query(WarehouseStats).filter(WarehouseStats.shipment_count != 0)
+        }
+        drift = []
+        for key in sorted(set(expected) | set(stored), key=str):
+            expected_count, expected_weight = expected.get(key, (0, 0.0))
+            stored_count, stored_weight = stored.get(key, (0, 0.0))
+            if expected_count != stored_count or abs(expected_weight - stored_weight) > tolerance * max(1.0, abs(expected_weight)):
+                drift.append({
+                    "warehouse_id": key[0],
+                    "status": key[1],
+                    "expected": {"shipment_count": expected_count, "total_weight": expected_weight},
+                    "stored": {"shipment_count": stored_count, "total_weight": stored_weight}
+                })
+        return drift
+    
+    @staticmethod
+    def rebuild(db: Session) -> int:
+        """Recompute every bucket from the shipments table; returns the bucket count"""
+        expected = WarehouseStatsService.aggregate(db)
+        db.query(WarehouseStats).delete()
+        db.add_all(
+            WarehouseStats(warehouse_id=warehouse_id, status=status, shipment_count=count, total_weight=weight)
+            for (warehouse_id, status), (count, weight) in expected.items()
+        )
+        db.commit()
+        return len(expected)
+
+
+class ArchiveService:
+    @staticmethod
+    def archive_batch(db: Session, shipment_archive: "archive.ShipmentArchive", delivered_before: datetime,
+                      batch_size: int = 500) -> int:
+        """Move up to ``batch_size`` shipments delivered, and unchanged since,
+        before ``delivered_before`` from the hot table to the archive.
+        
+        The rows are archived first and only then deleted, each only if it has
+        not been written meanwhile, so a crash or a concurrent update leaves a
+        row hot rather than losing it. warehouse_stats keeps counting archived
+        rows. Returns the number of rows moved.
+        """
+        rows = db.query(Shipment).filter(
+            Shipment.status == "delivered",
+            func.coalesce(Shipment.updated_at, Shipment.created_at) < delivered_before
+        ).order_by(Shipment.id).limit(batch_size).all()
+        if not rows:
+            return 0
+        values = [{field: getattr(row, field) for field in archive.ROW_FIELDS} for row in rows]
+        shipment_archive.append(values)
+        
+        def write(session):
+            moved = set()
+            for row in values:
+                unchanged = Shipment.updated_at.is_(None) if row["updated_at"] is None else Shipment.updated_at == row["updated_at"]
+                if session.query(Shipment).filter(
+                    Shipment.id == row["id"], Shipment.status == "delivered", unchanged
+                ).delete(synchronize_session=False):
+                    moved.add(row["tracking_number"])
+            return moved
+        
+        moved = commit_write(db, write)
+        for row in values:
+            if row["tracking_number"] not in moved:
+                # Written while being archived: it stays hot, its archived copy is stale
+                shipment_archive.forget(row["tracking_number"])
+        metrics.increment("archive.shipments", len(moved))
+        return len(moved)
@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.core.metrics import metrics
+from app.core.rabbitmq import DistributedEventConsumer, EventProcessingError, RabbitMQConnection
+from app.schemas.logistic import (
+    WarehouseCreate, WarehouseUpdate,
+    ShipmentCreate, ShipmentUpdate
+)
+from app.services.logistic_service import WarehouseService, ShipmentService, TombstoneService
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ReplicatedRequest:
+    """Stands in for the FastAPI request the services take, flagged the same way
+    ReplicationMiddleware flags an X-Replicated-From request"""
+
+    def __init__(self, source_server: str, hlc: Optional[str] = None, resource_key: Optional[str] = None):
+        self.state = SimpleNamespace(is_replicated=True, source_server=source_server,
+                                     hlc=hlc, resource_key=resource_key)
+
+
+class EventApplier:
+    """Applies replicated events by calling the services directly on a local session"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self.handlers = {
+            "warehouse.created": self.warehouse_created,
+            "warehouse.updated": self.warehouse_updated,
+            "warehouse.deleted": self.warehouse_deleted,
+            "shipment.created": self.shipment_created,
+            "shipment.updated": self.shipment_updated,
+            "shipment.deleted": self.shipment_deleted,
+        }
+
+    def apply(self, message: Dict[str, Any]) -> None:
+        """Apply one event, raising EventProcessingError with the same retry
+        semantics as the HTTP path (missing rows are retried, bad input is not)"""
+        event_type = message.get("event_type")
+        handler = self.handlers.get(event_type)
+        if handler is None:
+            raise EventProcessingError(f"Unsupported event type: {event_type}", retryable=False)
+
+        source_server = message.get("source_server")
+        operation_name = f"replicated-from-{source_server}-{message.get('operation_name')}"
+        request = ReplicatedRequest(source_server, message.get("hlc"), message.get("resource_key"))
+        db = self.session_factory()
+        try:
+            found = handler(db, message.get("inputs") or {}, message.get("resource_id"), operation_name, request)
+            if not found and event_type.endswith((".updated", ".deleted")):
+                resource_type = event_type.split(".")[0]
+                if TombstoneService.superseded(db, resource_type, request, message.get("resource_id"),
+                                               is_delete=event_type.endswith(".deleted")):
+                    logger.info(f"{event_type} for {message.get('resource_key') or message.get('resource_id')} superseded by a delete")
+                    metrics.increment("writes.superseded")
+                    return
+        except ValidationError as e:
+            raise EventProcessingError(f"Invalid event inputs: {e}", retryable=False)
+        except EventProcessingError:
+            raise
+        except Exception as e:
+            db.rollback()
+            raise EventProcessingError(f"Error applying {event_type}: {e}")
+        finally:
+            db.close()
+
+        if not found:
+            # Usually the create this event depends on has not been applied yet
+            raise EventProcessingError(f"{event_type} target {message.get('resource_id')} not found")
+        metrics.increment("writes.replicated")
+
+    @staticmethod
+    def warehouse_created(db, inputs, resource_id, operation_name, request):
+        return WarehouseService.create_warehouse(db, WarehouseCreate(**inputs), operation_name, request)
+
+    @staticmethod
+    def warehouse_updated(db, inputs, resource_id, operation_name, request):
+        return WarehouseService.update_warehouse(db, resource_id, WarehouseUpdate(**inputs), operation_name, request)
+
+    @staticmethod
+    def warehouse_deleted(db, inputs, resource_id, operation_name, request):
+        return WarehouseService.delete_warehouse(db, resource_id, operation_name, request)
+
+    @staticmethod
+    def shipment_created(db, inputs, resource_id, operation_name, request):
+        return ShipmentService.create_shipment(db, ShipmentCreate(**inputs), operation_name, request)
+
+    @staticmethod
+    def shipment_updated(db, inputs, resource_id, operation_name, request):
+        return ShipmentService.update_shipment(db, resource_id, ShipmentUpdate(**inputs), operation_name, request)
+
+    @staticmethod
+    def shipment_deleted(db, inputs, resource_id, operation_name, request):
+        return ShipmentService.delete_shipment(db, resource_id, operation_name, request)
+
+
+class DirectEventConsumer(DistributedEventConsumer):
+    """Consumer that applies events through EventApplier instead of an HTTP
+    call to its own server; used when the consumer runs inside the API process"""
+
+    def __init__(self, connection: Optional[RabbitMQConnection] = None,
+                 applier: Optional[EventApplier] = None,
+                 positions=None):
+        super().__init__(connection, positions=positions)
+        self.applier = applier or EventApplier()
+
+    def apply_event(self, message: Dict[str, Any]):
+        self.applier.apply(message)
@@ -0,0 +1,78 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.api_v1.endpoints import analytics as analytics_endpoints
+from app.schemas.logistic import ShipmentUpdate
+from app.services import logistic_service
+from app.services.analytics import ShipmentAnalytics, ShipmentSnapshot
+from app.services.logistic_service import ShipmentService
+from app.services.replication import ReplicatedRequest
+from app.tests.test_archive import make_session_factory
+from app.tests.test_warehouse_stats import create
+
+HEADERS = {"operation-name": "test"}
+
+
+def test_snapshot_aggregates_match_the_rows():
+    rng = np.random.default_rng(7)
+    places = ["Oslo", "Bergen", "Tromsø", "Bodø"]
+    rows = {
+        f"T-{n}": (f"T-{n}", places[n % 4], places[(n * 3) % 4], float(rng.uniform(1, 50)),
+                   ["pending", "delivered"][n % 2], n % 3)
+        for n in range(3000)
+    }
+    snapshot = ShipmentSnapshot.from_rows(rows.values())
+    for n in range(0, 3000, 2):
+        snapshot.remove(f"T-{n}")
+        del rows[f"T-{n}"]
+    snapshot.upsert(dict(zip(("tracking_number", "origin", "destination", "weight", "status", "warehouse_id"),
+                             ("T-9999", "Oslo", "Alta", 2.0, "in_transit", 1))))
+    rows["T-9999"] = ("T-9999", "Oslo", "Alta", 2.0, "in_transit", 1)
+    # Removing more than a quarter of the rows compacted the arrays
+    assert snapshot.size < 3000 and len(snapshot) == len(rows) == 1501
+
+    assert snapshot.status_breakdown()["in_transit"] == {"shipment_count": 1, "total_weight": 2.0}
+    assert snapshot.status_breakdown()["delivered"]["shipment_count"] == 1500
+    weights = snapshot.weight_distribution(bins=5, warehouse_id=1)
+    expected = [row[3] for row in rows.values() if row[5] == 1]
+    assert weights["shipment_count"] == len(expected) and sum(weights["histogram"]["counts"]) == len(expected)
+    assert np.isclose(weights["total_weight"], sum(expected))
+    assert np.isclose(weights["p50"], np.median(expected))
+
+    flows = snapshot.flow_matrix(top=3)
+    assert len(flows["places"]) == 3 and flows["places"][0] == "Bergen"
+    oslo, bergen = flows["places"].index("Oslo"), flows["places"].index("Bergen")
+    assert flows["counts"][bergen][oslo] == sum(1 for row in rows.values() if row[1:3] == ("Bergen", "Oslo"))
+
+
+def test_writes_refresh_the_snapshot_incrementally(monkeypatch):
+    Session = make_session_factory()
+    shipment_analytics = ShipmentAnalytics(Session)
+    monkeypatch.setattr(logistic_service, "shipment_analytics", shipment_analytics)
+    monkeypatch.setattr(analytics_endpoints, "shipment_analytics", shipment_analytics)
+    db = Session()
+    first = create(db, "T-1", 2.0)
+    create(db, "T-2", 3.0)
+
+    client = TestClient(app)
+    assert client.get("/api/v1/analytics/status", headers=HEADERS).json() == {
+        "pending": {"shipment_count": 2, "total_weight": 5.0}
+    }
+    # Replicated writes update the loaded snapshot without reading the database again
+    create(db, "T-3", 4.0, warehouse_id=2)
+    ShipmentService.update_shipment(db, first.id, ShipmentUpdate(status="delivered"), "update", ReplicatedRequest("B"))
+    ShipmentService.delete_shipment(db, 0, "delete", ReplicatedRequest("B", resource_key="T-2"))
+
+    summary = client.get("/api/v1/analytics/?bins=2", headers=HEADERS).json()
+    assert summary["shipment_count"] == 2
+    assert summary["status"] == {"pending": {"shipment_count": 1, "total_weight": 4.0},
+                                 "delivered": {"shipment_count": 1, "total_weight": 2.0}}
+    assert summary["weights"]["histogram"] == {"counts": [1, 1], "edges": [2.0, 3.0, 4.0]}
+    assert summary["flows"] == {"places": ["Oslo", "Bergen"], "counts": [[0, 2], [0, 0]],
+                                "weights": [[0.0, 6.0], [0.0, 0.0]]}
+    assert client.get("/api/v1/analytics/weights?warehouse_id=2", headers=HEADERS).json()["total_weight"] == 4.0
+
+    # A fresh load from the database agrees with the incrementally kept snapshot
+    reloaded = ShipmentAnalytics(Session)
+    assert reloaded.query(lambda snapshot: snapshot.status_breakdown()) == summary["status"]
+    db.close()
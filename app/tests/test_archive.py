@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db import archive
+from app.db.archive import ShipmentArchive
+from app.models.base import Base
+from app.models.logistic import Shipment
+from app.schemas.logistic import ShipmentUpdate
+from app.services.archiver import Archiver
+from app.services.logistic_service import ShipmentService, WarehouseStatsService
+from app.services.replication import ReplicatedRequest
+from app.tests.test_warehouse_stats import create
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def deliver(db, tracking_number, days_ago):
+    shipment = ShipmentService.get_shipment_by_tracking(db, tracking_number)
+    ShipmentService.update_shipment(db, shipment.id, ShipmentUpdate(status="delivered"), "deliver", ReplicatedRequest("B"))
+    db.query(Shipment).filter(Shipment.id == shipment.id).update(
+        {"updated_at": datetime.utcnow() - timedelta(days=days_ago)}, synchronize_session=False
+    )
+    db.commit()
+
+
+def test_old_deliveries_move_to_archive_and_stay_readable(tmp_path, monkeypatch):
+    shipment_archive = ShipmentArchive(f"sqlite:///{tmp_path}/archive.db")
+    monkeypatch.setattr(archive, "shipment_archive", shipment_archive)
+    Session = make_session_factory()
+    db = Session()
+    for n, weight in enumerate([1.0, 2.0, 3.0, 4.0]):
+        create(db, f"T-{n}", weight)
+    deliver(db, "T-0", days_ago=40)
+    deliver(db, "T-1", days_ago=31)
+    deliver(db, "T-2", days_ago=2)
+    before = ShipmentService.get_shipment_by_tracking(db, "T-0")
+    before_id, before_updated_at = before.id, before.updated_at
+    stats = WarehouseStatsService.get_stats(db, 1)
+
+    assert Archiver(shipment_archive, Session, after_hours=30 * 24, batch_size=1).run_pass() == 2
+    assert sorted(row.tracking_number for row in db.query(Shipment)) == ["T-2", "T-3"]
+
+    archived = ShipmentService.get_shipment_by_tracking(db, "T-0")
+    assert (archived.id, archived.weight, archived.status, archived.updated_at) == \
+           (before_id, 1.0, "delivered", before_updated_at)
+    assert ShipmentService.get_shipment(db, archived.id).tracking_number == "T-0"
+    assert ShipmentService.get_shipment_by_tracking(db, "T-9") is None
+    # Archived rows still count towards the warehouse stats
+    assert WarehouseStatsService.get_stats(db, 1) == stats
+    assert WarehouseStatsService.find_drift(db) == []
+
+    # A write to an archived shipment brings it back to the hot table
+    ShipmentService.update_shipment(db, 0, ShipmentUpdate(weight=1.5), "update",
+                                    ReplicatedRequest("B", resource_key="T-1"))
+    restored = ShipmentService.get_hot_shipment_by_tracking(db, "T-1")
+    assert restored.weight == 1.5 and shipment_archive.get("T-1") is None
+    assert ShipmentService.delete_shipment(db, before_id, "delete", ReplicatedRequest("B"))
+    assert ShipmentService.get_shipment_by_tracking(db, "T-0") is None
+    assert WarehouseStatsService.find_drift(db) == []
+    db.close()
@@ -0,0 +1,87 @@
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.async_consumer import AsyncEventConsumer
+from app.core.rabbitmq import RabbitMQConnection, events_queue_name, retry_queue_name
+from app.core.transport import InMemoryBroker, InMemoryTransport
+from app.core.config import settings
+from app.models.base import Base
+from app.models.logistic import Shipment
+from app.services.replication import DirectEventConsumer, EventApplier
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def make_pair(broker, session_factory):
+    publisher = RabbitMQConnection(server_id="A", allowed_servers=["B"], transport=InMemoryTransport(broker))
+    connection = RabbitMQConnection(server_id="B", allowed_servers=["A"], transport=InMemoryTransport(broker))
+    assert publisher.connect() and connection.connect()
+    consumer = DirectEventConsumer(connection=connection, applier=EventApplier(session_factory))
+    return publisher, AsyncEventConsumer(consumer)
+
+
+async def wait_until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_embedded_consumer_applies_events_in_order():
+    Session = make_session_factory()
+    broker = InMemoryBroker()
+    publisher, event_consumer = make_pair(broker, Session)
+
+    publisher.publish_distributed_event(
+        "warehouse.created", "/api/v1/warehouses/", "POST", {"name": "North", "location": "Oslo"}, None, "op-1"
+    )
+    publisher.publish_distributed_event(
+        "shipment.created", "/api/v1/shipments/", "POST",
+        {"tracking_number": "T-1", "origin": "Oslo", "destination": "Bergen", "weight": 2.5, "warehouse_id": 1},
+        None, "op-2"
+    )
+    publisher.publish_distributed_event(
+        "shipment.updated", "/api/v1/shipments/1", "PUT", {"status": "in_transit"}, 1, "op-3"
+    )
+
+    async def scenario():
+        event_consumer.start()
+        await wait_until(lambda: event_consumer.processed == 3)
+        assert event_consumer.health()["running"]
+        await event_consumer.stop(timeout=5)
+        return event_consumer.health()
+
+    health = asyncio.run(scenario())
+    assert not health["running"]
+    assert health["failed"] == 0
+
+    db = Session()
+    shipment = db.query(Shipment).filter(Shipment.tracking_number == "T-1").one()
+    assert shipment.status == "in_transit"
+    db.close()
+    assert broker.depth(events_queue_name("B")) == 0
+
+
+def test_embedded_consumer_retries_missing_rows():
+    broker = InMemoryBroker()
+    publisher, event_consumer = make_pair(broker, make_session_factory())
+
+    # Update that arrives before the row it targets
+    publisher.publish_distributed_event(
+        "shipment.updated", "/api/v1/shipments/7", "PUT", {"status": "delivered"}, 7, "op-1"
+    )
+
+    async def scenario():
+        event_consumer.start()
+        await wait_until(lambda: event_consumer.failed == 1)
+        await event_consumer.stop(timeout=5)
+
+    asyncio.run(scenario())
+    first_tier = retry_queue_name(events_queue_name("B"), settings.EVENT_RETRY_DELAYS_MS[0])
+    assert broker.depth(first_tier) == 1
+    assert broker.depth(events_queue_name("B")) == 0
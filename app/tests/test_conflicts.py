@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.hlc import HybridLogicalClock, parse_stamp
+from app.models.base import Base
+from app.models.logistic import Shipment
+from app.schemas.logistic import ShipmentCreate, ShipmentUpdate
+from app.services.logistic_service import ShipmentService
+from app.core.rabbitmq import EventProcessingError
+from app.services.replication import EventApplier, ReplicatedRequest
+
+
+class FrozenClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def test_hlc_moves_past_remote_stamps():
+    wall = FrozenClock(100.0)
+    a, b = HybridLogicalClock("A", wall), HybridLogicalClock("B", FrozenClock(99.0))
+    first, second = a.now(), a.now()
+    assert first < second
+    assert parse_stamp(second) == (100000, 1, "A")
+
+    # B's wall clock is behind, but once it has seen A's stamp its writes still order after it
+    b.update(second)
+    assert b.now() > second
+
+
+def test_concurrent_updates_converge_per_field():
+    replicas = [make_session(), make_session()]
+    shipment = ShipmentCreate(tracking_number="T-1", origin="Oslo", destination="Bergen",
+                              weight=1.0, warehouse_id=1)
+    created = "0000000001000-000000-A"
+    for db in replicas:
+        ShipmentService.create_shipment(db, shipment, "create", ReplicatedRequest("A", created))
+
+    # Same millisecond on both servers: B wins the tie on weight, A's status is untouched by B
+    from_a = (ShipmentUpdate(weight=5.0, status="in_transit"), ReplicatedRequest("A", "0000000002000-000000-A"))
+    from_b = (ShipmentUpdate(weight=7.0), ReplicatedRequest("B", "0000000002000-000000-B"))
+    for db, order in zip(replicas, [(from_a, from_b), (from_b, from_a)]):
+        for update, request in order:
+            ShipmentService.update_shipment(db, 1, update, "update", request)
+
+    states = [db.query(Shipment).one() for db in replicas]
+    for state in states:
+        assert (state.weight, state.status) == (7.0, "in_transit")
+        assert state.field_versions["weight"].endswith("-B")
+
+
+def test_updates_that_lost_to_a_delete_are_not_retried():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    applier = EventApplier(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    inputs = {"tracking_number": "T-1", "origin": "Oslo", "destination": "Bergen", "weight": 1.0, "warehouse_id": 1}
+
+    def event(event_type, hlc, inputs=None):
+        return {"event_type": event_type, "source_server": "A", "operation_name": "op", "inputs": inputs or {},
+                "resource_id": 1, "resource_key": "T-1", "hlc": hlc}
+
+    applier.apply(event("shipment.created", "0000000000100-000000-A", inputs))
+    applier.apply(event("shipment.deleted", "0000000000300-000000-A"))
+
+    # Concurrent with (stamped before) the delete: the delete wins, nothing to retry
+    applier.apply(event("shipment.updated", "0000000000200-000000-B", {"status": "delivered"}))
+    applier.apply(event("shipment.deleted", "0000000000250-000000-B"))
+    # Stamped after the delete: may belong to a re-create that has not arrived yet
+    with pytest.raises(EventProcessingError) as error:
+        applier.apply(event("shipment.updated", "0000000000400-000000-B", {"status": "delivered"}))
+    assert error.value.retryable
@@ -0,0 +1,93 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.core.config import settings
+from app.core.consistency import TOKEN_HEADER, collecting_positions, format_token, note_published, parse_token
+from app.core.middleware import ConsistencyMiddleware
+from app.core.rabbitmq import RabbitMQConnection, DistributedEventConsumer
+from app.core.transport import InMemoryBroker, InMemoryTransport
+from app.models.base import Base
+from app.services.consistency import ConsistencyService, PositionTracker
+from app.tests.test_transport import FakeClock, RecordingClient
+
+
+def make_session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def test_token_round_trip():
+    token = format_token("A", {"urgent": "2", "default": "1"})
+    assert token == "A:default=1,urgent=2"
+    assert parse_token(token) == ("A", {"default": "1", "urgent": "2"})
+    assert parse_token("") is None
+    assert parse_token("A:default") is None
+
+
+def test_failed_event_holds_back_later_positions():
+    Session = make_session_factory()
+    clock = FakeClock()
+    broker = InMemoryBroker(clock=clock)
+    publisher = RabbitMQConnection(server_id="A", allowed_servers=["B"], transport=InMemoryTransport(broker))
+    assert publisher.connect()
+    connection = RabbitMQConnection(server_id="B", allowed_servers=["A"], transport=InMemoryTransport(broker))
+    tracker = PositionTracker(Session, flush_interval=0)
+    assert DistributedEventConsumer(connection=connection, http_client=RecordingClient(failures=1),
+                                    positions=tracker).subscribe()
+
+    seqs = []
+    with collecting_positions() as positions:
+        for n in range(2):
+            publisher.publish_distributed_event("shipment.updated", f"/api/v1/shipments/{n}", "PUT", {"n": n}, n, "update")
+            seqs.append(positions["default"])
+    broker.run_until_idle()
+
+    db = Session()
+    first, second = seqs
+    assert first < second
+    # The second event was applied, but the first waits in a retry tier
+    assert not ConsistencyService.caught_up(db, "A", {"default": first})
+    assert not ConsistencyService.caught_up(db, "A", {"default": second})
+
+    clock.now += settings.EVENT_RETRY_DELAYS_MS[0] / 1000.0 + 1
+    broker.run_until_idle()
+    assert ConsistencyService.caught_up(db, "A", {"default": second})
+    assert not ConsistencyService.caught_up(db, "A", {"urgent": second})
+    db.close()
+
+
+def test_write_returns_token_and_lagging_read_redirects(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_ID", "B")
+    monkeypatch.setattr(settings, "CONSISTENCY_WAIT_MS", 20.0)
+    Session = make_session_factory()
+    app = FastAPI()
+    app.add_middleware(ConsistencyMiddleware, session_factory=Session)
+
+    @app.post("/items")
+    def create_item():
+        # What RabbitMQConnection.publish_distributed_event records for the request
+        note_published("default", "0000000000002-000000-B")
+        return {}
+
+    @app.get("/items")
+    def list_items():
+        return []
+
+    client = TestClient(app)
+    assert client.post("/items").headers[TOKEN_HEADER] == "B:default=0000000000002-000000-B"
+
+    token = {TOKEN_HEADER: "A:default=0000000000005-000000-A"}
+    response = client.get("/items?limit=5", headers=token, follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"] == f"{settings.SERVER_ENDPOINTS['A']}/items?limit=5"
+
+    PositionTracker(Session, flush_interval=0).applied(
+        {"source_server": "A", "lane": "default", "seq": "0000000000005-000000-A"}
+    )
+    assert client.get("/items", headers=token).status_code == 200
+    # Tokens from this server, and malformed ones, are served without waiting
+    assert client.get("/items", headers={TOKEN_HEADER: "B:default=9"}).status_code == 200
+    assert client.get("/items", headers={TOKEN_HEADER: "garbage"}).status_code == 200
@@ -0,0 +1,50 @@
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.db.session import get_db
+from app.models.base import Base
+from app.models.logistic import Warehouse, Shipment
+
+HEADERS = {"operation-name": "test"}
+
+
+def test_fast_list_matches_default_response():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(Warehouse(name="W", location="Oslo"))
+    db.add_all([
+        Shipment(tracking_number="T-1", origin="Oslo", destination="Bergen", weight=1.25,
+                 status="delivered", warehouse_id=1, created_at=datetime(2024, 5, 1, 12, 30, 15, 123456)),
+        Shipment(tracking_number="T-2", origin="Oslo", destination="Tromsø", weight=3,
+                 warehouse_id=1, created_at=datetime(2024, 5, 2)),
+    ])
+    db.commit()
+    # Rows written before updated_at existed, or by bulk loads, have it NULL
+    db.query(Shipment).filter(Shipment.tracking_number == "T-2").update({"updated_at": None})
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        default = client.get("/api/v1/shipments/", headers=HEADERS)
+        fast = client.get("/api/v1/shipments/?fast=true", headers=HEADERS)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert default.status_code == fast.status_code == 200
+    assert fast.json() == default.json()
+    assert [row["updated_at"] for row in fast.json()][1] is None
+    assert fast.json()[0]["created_at"] == "2024-05-01T12:30:15.123456"
@@ -0,0 +1,83 @@
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.db.group_commit import GroupCommitCoordinator
+from app.models.base import Base
+from app.schemas.logistic import ShipmentCreate
+from app.services.logistic_service import ShipmentService
+from app.services.replication import ReplicatedRequest
+
+
+def make_engine(path):
+    # A file, not StaticPool: writers and readers need connections of their own
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def test_concurrent_creates_share_commits(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "GROUP_COMMIT", True)
+    monkeypatch.setattr(settings, "GROUP_COMMIT_WINDOW_MS", 20.0)
+    engine = make_engine(tmp_path / "test.db")
+    commits, selects = [], []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statement.startswith("SELECT") and selects.append(statement))
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    results = {}
+    pool_capacity = engine.pool.size() + engine.pool._max_overflow
+    writers = 2 * pool_capacity
+    # Callers write in groups that each hold every pooled connection at once
+    all_connected = threading.Barrier(pool_capacity)
+
+    def create(n):
+        db = Session()
+        shipment = ShipmentCreate(tracking_number=f"T-{n}", origin="Oslo", destination="Bergen",
+                                  weight=1.0, warehouse_id=1)
+        try:
+            # A request that reads before it writes holds a pooled connection
+            ShipmentService.get_shipment(db, 0)
+            all_connected.wait()
+            results[n] = ShipmentService.create_shipment(db, shipment, "create", ReplicatedRequest("B"))
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=create, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=20)
+        assert not thread.is_alive()
+
+    assert [results[n].tracking_number for n in range(writers)] == [f"T-{n}" for n in range(writers)]
+    assert len({shipment.id for shipment in results.values()}) == writers
+    assert len(commits) < writers
+    # The reads and the redelivery checks: rows come back via RETURNING, not a refresh
+    assert len(selects) == 2 * writers
+
+
+def test_failed_write_only_fails_its_caller(tmp_path):
+    engine = make_engine(tmp_path / "test.db")
+    coordinator = GroupCommitCoordinator(sessionmaker(bind=engine, expire_on_commit=False), window=0.05, max_batch=8)
+
+    def bad(session):
+        raise ValueError("bad write")
+
+    outcomes = []
+
+    def submit(work):
+        try:
+            outcomes.append(coordinator.submit(work))
+        except ValueError as e:
+            outcomes.append(str(e))
+
+    works = [lambda session: 1, bad, lambda session: 2]
+    threads = [threading.Thread(target=submit, args=(work,)) for work in works]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes, key=str) == [1, 2, "bad write"]
+
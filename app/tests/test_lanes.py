@@ -0,0 +1,45 @@
+from app.core.config import settings
+from app.core.lanes import LaneScheduler
+from app.core.rabbitmq import RabbitMQConnection, DistributedEventConsumer
+from app.core.transport import InMemoryBroker, InMemoryTransport
+from app.tests.test_transport import RecordingClient
+
+
+def test_scheduler_interleaves_lanes_by_weight(monkeypatch):
+    monkeypatch.setattr(settings, "LANE_WEIGHTS", {"urgent": 3, "default": 1})
+    scheduler = LaneScheduler(["urgent", "default"])
+    for n in range(6):
+        scheduler.put("urgent", f"u{n}")
+        scheduler.put("default", f"d{n}")
+
+    order = [scheduler.pop()[1] for _ in range(12)]
+    assert order[:8] == ["u0", "u1", "d0", "u2", "u3", "u4", "d1", "u5"]
+    # Once the fast lane is empty the bulk lane gets every turn
+    assert order[8:] == ["d2", "d3", "d4", "d5"]
+    assert scheduler.pop() is None
+
+
+def test_status_update_overtakes_a_bulk_backlog(monkeypatch):
+    monkeypatch.setattr(settings, "PRIORITY_LANES", True)
+    broker = InMemoryBroker()
+    publisher = RabbitMQConnection(server_id="A", allowed_servers=["B", "C"], transport=InMemoryTransport(broker))
+    assert publisher.connect()
+    clients = {}
+    for server_id, lanes in (("B", True), ("C", False)):
+        monkeypatch.setattr(settings, "PRIORITY_LANES", lanes)
+        clients[server_id] = RecordingClient()
+        connection = RabbitMQConnection(server_id=server_id, allowed_servers=["A"], transport=InMemoryTransport(broker))
+        assert DistributedEventConsumer(connection=connection, http_client=clients[server_id]).subscribe()
+    monkeypatch.setattr(settings, "PRIORITY_LANES", True)
+
+    for n in range(20):
+        publisher.publish_distributed_event("shipment.created", "/api/v1/shipments/", "POST", {"n": n}, None, "import")
+    publisher.publish_distributed_event("shipment.updated", "/api/v1/shipments/1", "PUT",
+                                        {"status": "delivered"}, 1, "deliver")
+    assert broker.depth("server_B_events.urgent") == 1
+    broker.run_until_idle()
+
+    methods = [method for method, _, _ in clients["B"].calls]
+    assert len(methods) == 21 and methods.index("PUT") < 3
+    # A server without lanes still gets the event, in arrival order
+    assert [method for method, _, _ in clients["C"].calls] == ["POST"] * 20 + ["PUT"]
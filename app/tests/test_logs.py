@@ -0,0 +1,69 @@
+import json
+import queue
+import logging
+import threading
+from logging.handlers import QueueListener
+from app.core import logs
+from app.core.logs import DeferredQueueHandler, JsonFormatter, Sampler, SamplingFilter, log_event
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class FormattedIn:
+    """Log argument that remembers which thread turned it into text"""
+
+    def __str__(self):
+        self.thread = threading.current_thread().name
+        return "arg"
+
+
+def make_logger(name, handler):
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_records_are_formatted_by_the_writer_thread():
+    records = queue.SimpleQueue()
+    output = Capture()
+    output.setFormatter(JsonFormatter())
+    listener = QueueListener(records, output)
+    listener.start()
+    logger = make_logger("test.deferred", DeferredQueueHandler(records))
+
+    argument = FormattedIn()
+    log_event(logger, "test.publish", "Published %s", argument, event_type="shipment.created")
+    listener.stop()
+
+    assert argument.thread != threading.current_thread().name
+    [line] = output.lines
+    entry = json.loads(line)
+    assert entry["message"] == "Published arg"
+    assert entry["category"] == "test.publish" and entry["event_type"] == "shipment.created"
+
+
+def test_sampling_is_per_category_and_keeps_warnings(monkeypatch):
+    sampler = Sampler({"event.publish": 0.1, "test.access": 0})
+    monkeypatch.setattr(logs, "sampler", sampler)
+    output = Capture()
+    logger = make_logger("test.sampling", output)
+
+    for n in range(100):
+        log_event(logger, "event.publish", "publish %d", n)
+    log_event(logger, "event.other", "other")
+    logger.warning("failed")
+    access = make_logger("test.access", output)
+    access.addFilter(SamplingFilter(sampler))
+    access.info("GET /")
+    access.warning("slow")
+
+    assert output.lines == [f"publish {n}" for n in range(0, 100, 10)] + ["other", "failed", "slow"]
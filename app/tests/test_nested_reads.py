@@ -0,0 +1,76 @@
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.main import app
+from app.db.session import get_db
+from app.models.base import Base
+from app.models.logistic import Warehouse, Shipment
+
+HEADERS = {"operation-name": "test"}
+
+
+class SelectCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.count += 1
+
+
+def make_client(warehouses, shipments_each):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    for w in range(warehouses):
+        warehouse = Warehouse(name=f"W{w}", location="Oslo")
+        db.add(warehouse)
+        db.flush()
+        for n in range(shipments_each):
+            db.add(Shipment(tracking_number=f"T-{w}-{n}", origin="Oslo", destination="Bergen",
+                            weight=1.0, warehouse_id=warehouse.id))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app), SelectCounter(engine)
+
+
+def count_selects(url, warehouses, shipments_each=5):
+    client, counter = make_client(warehouses, shipments_each)
+    try:
+        response = client.get(url, headers=HEADERS)
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    return response.json(), counter.count
+
+
+def test_warehouses_with_shipments_use_fixed_selects():
+    url = "/api/v1/warehouses/with-shipments?limit=100&shipment_skip=1&shipment_limit=2"
+    small, small_selects = count_selects(url, warehouses=2)
+    large, large_selects = count_selects(url, warehouses=40)
+
+    assert len(large) == 40
+    assert [s["tracking_number"] for s in large[-1]["shipments"]] == ["T-39-1", "T-39-2"]
+    assert small_selects == large_selects == 2
+
+
+def test_shipments_with_warehouse_use_one_select():
+    url = "/api/v1/shipments/with-warehouse?limit=500"
+    _, small_selects = count_selects(url, warehouses=1)
+    shipments, large_selects = count_selects(url, warehouses=30)
+
+    assert len(shipments) == 150
+    assert shipments[-1]["warehouse"]["name"] == "W29"
+    assert small_selects == large_selects == 1
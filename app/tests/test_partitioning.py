@@ -0,0 +1,116 @@
+from app.core.partitioning import PartitionMap
+from app.core.rabbitmq import RabbitMQConnection, DistributedEventConsumer
+from app.core.transport import InMemoryBroker, InMemoryTransport
+from app.tests.test_transport import RecordingClient
+
+SERVERS = ["A", "B", "C", "D"]
+
+
+def test_ring_placement_is_stable():
+    ring = PartitionMap(SERVERS, partition_count=32, replication_factor=2)
+    for partition in range(32):
+        owners = ring.owners(partition)
+        assert len(set(owners)) == 2
+
+    # Dropping a server only reassigns the partitions it held
+    smaller = PartitionMap(["A", "B", "C"], partition_count=32, replication_factor=2)
+    for partition in range(32):
+        if "D" not in ring.owners(partition):
+            assert smaller.owners(partition) == ring.owners(partition)
+
+
+def test_shipment_events_reach_only_partition_owners():
+    partitions = PartitionMap(SERVERS, partition_count=4, replication_factor=2,
+                              placement={"0": ["A", "B"], "1": ["C", "D"], "2": ["B", "C"], "3": ["A", "D"]})
+    broker = InMemoryBroker()
+    connections, clients = {}, {}
+    for server_id in SERVERS:
+        connection = RabbitMQConnection(server_id=server_id, allowed_servers=[s for s in SERVERS if s != server_id],
+                                        transport=InMemoryTransport(broker), partitions=partitions)
+        assert connection.connect()
+        clients[server_id] = RecordingClient()
+        assert DistributedEventConsumer(connection=connection, http_client=clients[server_id]).subscribe()
+        connections[server_id] = connection
+
+    # Warehouse 5 is in partition 1, held by C and D
+    connections["A"].publish_distributed_event(
+        "shipment.created", "/api/v1/shipments/", "POST", {"warehouse_id": 5}, None, "op",
+        partition=connections["A"].partition_for(5), resource_key="T-1"
+    )
+    # Unpartitioned events still go to every peer
+    connections["A"].publish_distributed_event("warehouse.created", "/api/v1/warehouses/", "POST", {}, None, "op")
+    broker.run_until_idle()
+
+    received = {server_id: [url for _, url, _ in client.calls] for server_id, client in clients.items()}
+    assert received["A"] == []
+    assert received["B"] == ["http://localhost:8001/api/v1/warehouses/"]
+    assert len(received["C"]) == len(received["D"]) == 2
+
+
+def test_non_holder_forwards_instead_of_serving_or_storing(monkeypatch):
+    from types import SimpleNamespace
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from app.api.api_v1.endpoints import shipments
+    from app.core import partitioning
+    from app.core.config import settings
+    from app.db.session import get_db
+    from app.main import app
+    from app.models.base import Base
+    from app.models.logistic import Shipment, Warehouse
+
+    # A holds even warehouses, B odd ones
+    partitions = PartitionMap(["A", "B"], partition_count=2, replication_factor=1,
+                              placement={"0": ["A"], "1": ["B"]})
+    monkeypatch.setattr(partitioning, "partition_map", partitions)
+    monkeypatch.setattr(shipments, "partition_map", partitions)
+    monkeypatch.setattr(settings, "PARTITIONING", True)
+    monkeypatch.setattr(settings, "SERVER_ID", "A")
+    monkeypatch.setattr(settings, "SERVER_ENDPOINTS", {"B": "http://b"})
+    calls = []
+
+    def holder(method, url, **kwargs):
+        calls.append((method, url))
+        return SimpleNamespace(status_code=200, json=lambda: {"served_by": "B"})
+
+    monkeypatch.setattr(partitioning.httpx, "request", holder)
+    monkeypatch.setattr(partitioning.httpx, "get", lambda url, **kwargs: holder("GET", url, **kwargs))
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+    db = Session()
+    db.add_all([Warehouse(name="W2", location="Oslo"), Warehouse(name="W3", location="Bergen")])
+    # A copy of B's shipment left over from before partitioning
+    db.add(Shipment(tracking_number="T-OLD", origin="Oslo", destination="Bergen", weight=1.0, warehouse_id=3))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        headers = {"operation-name": "test"}
+        created = client.post("/api/v1/shipments/", headers=headers, json={
+            "tracking_number": "T-1", "origin": "Oslo", "destination": "Bergen", "weight": 2.0, "warehouse_id": 1
+        })
+        listed = client.get("/api/v1/shipments/", headers=headers)
+        by_id = client.get("/api/v1/shipments/1", headers=headers)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert created.json() == {"served_by": "B"} and created.headers["X-Served-By"] == "B"
+    assert listed.json() == []
+    assert by_id.json() == {"served_by": "B"}
+    assert calls == [("POST", "http://b/api/v1/shipments/"), ("GET", "http://b/api/v1/shipments/tracking/T-OLD")]
+    db = Session()
+    assert [s.tracking_number for s in db.query(Shipment)] == ["T-OLD"]
+    db.close()
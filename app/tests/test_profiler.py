@@ -0,0 +1,38 @@
+import threading
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.profiler import collapsed, profiler
+from app.main import app
+
+
+def busy_endpoint(stop, operation_name):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_samples_are_filed_under_the_operation():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_endpoint, args=(stop, "bulk-import"))
+    worker.start()
+    try:
+        stacks = profiler.profile(0.2, interval=0.002)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = collapsed(stacks).splitlines()
+    busy = [line for line in lines if "busy_endpoint" in line]
+    assert busy and all(line.startswith("operation-name=bulk-import;") for line in busy)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0 and stack.split(";")[-1].startswith("busy_endpoint")
+
+
+def test_profile_endpoint_needs_the_admin_token(monkeypatch):
+    client = TestClient(app)
+    headers = {"operation-name": "profile"}
+    assert client.post("/api/v1/admin/profile?seconds=0.05", headers=headers).status_code == 403
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "secret")
+    response = client.post("/api/v1/admin/profile?seconds=0.05", headers=dict(headers, **{"X-Admin-Token": "secret"}))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
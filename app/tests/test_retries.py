@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+from app.core.config import settings
+from app.core.rabbitmq import DistributedEventConsumer, LAST_ERROR_HEADER, RETRY_COUNT_HEADER
+from app.core.transport import Delivery
+from app.dlq import replay_events
+
+QUEUE = "server_B_events"
+
+
+class PublishRecorder:
+    """Stands in for a transport; records publishes, serves ``get`` from a list"""
+
+    def __init__(self, pending=()):
+        self.published = []
+        self.acked = []
+        self.pending = list(pending)
+
+    def publish(self, exchange, routing_key, body, headers=None, content_type=None):
+        self.published.append((routing_key, body, headers))
+
+    def get(self, queue):
+        return self.pending.pop(0) if self.pending else None
+
+    def ack(self, delivery_tag):
+        self.acked.append(delivery_tag)
+
+
+def delivery(headers=None, tag=1):
+    return Delivery(body=b"{}", routing_key="A.B", delivery_tag=tag,
+                    headers=dict(headers or {}), content_type="application/json")
+
+
+def retry_target(headers, retryable=True):
+    transport = PublishRecorder()
+    consumer = DistributedEventConsumer(connection=SimpleNamespace(queue_name=QUEUE, transport=transport))
+    consumer.schedule_retry(delivery(headers), "boom", retryable)
+    [(target, _, published_headers)] = transport.published
+    return target, published_headers
+
+
+def test_failures_walk_the_delay_tiers_then_dead_letter(monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_RETRY_DELAYS_MS", [100, 1000])
+
+    assert retry_target({}) == (f"{QUEUE}.retry.100ms", {RETRY_COUNT_HEADER: 1, LAST_ERROR_HEADER: "boom"})
+    assert retry_target({RETRY_COUNT_HEADER: 1})[0] == f"{QUEUE}.retry.1000ms"
+    target, headers = retry_target({RETRY_COUNT_HEADER: 2, "operation-name": "op"})
+    assert target == f"{QUEUE}.dead"
+    assert headers == {RETRY_COUNT_HEADER: 3, LAST_ERROR_HEADER: "boom", "operation-name": "op"}
+
+
+def test_permanent_failures_skip_the_tiers():
+    assert retry_target({}, retryable=False)[0] == f"{QUEUE}.dead"
+
+
+def test_replay_resets_the_retry_budget():
+    transport = PublishRecorder([
+        delivery({RETRY_COUNT_HEADER: 4, LAST_ERROR_HEADER: "boom", "operation-name": "op"}, tag=7)
+    ])
+    assert replay_events(transport, QUEUE, f"{QUEUE}.dead", limit=10) == 1
+    assert transport.published == [(QUEUE, b"{}", {"operation-name": "op"})]
+    assert transport.acked == [7]
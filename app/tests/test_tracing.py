@@ -0,0 +1,42 @@
+from app.core.rabbitmq import RabbitMQConnection, DistributedEventConsumer
+from app.core.tracing import InMemoryExporter, parse_traceparent, tracer
+from app.core.transport import InMemoryBroker, InMemoryTransport
+from app.tests.test_transport import RecordingClient
+
+
+class HeaderRecordingClient(RecordingClient):
+    def _call(self, method, url, **kwargs):
+        self.headers = kwargs.get("headers")
+        return super()._call(method, url, **kwargs)
+
+
+def test_trace_follows_event_from_publish_to_apply(monkeypatch):
+    exporter = InMemoryExporter()
+    monkeypatch.setattr(tracer, "exporter", exporter)
+    broker = InMemoryBroker()
+    publisher = RabbitMQConnection(server_id="A", allowed_servers=["B"], transport=InMemoryTransport(broker))
+    assert publisher.connect()
+    client = HeaderRecordingClient()
+    consumer = DistributedEventConsumer(
+        connection=RabbitMQConnection(server_id="B", allowed_servers=["A"], transport=InMemoryTransport(broker)),
+        http_client=client
+    )
+    assert consumer.subscribe()
+
+    with tracer.span("POST /api/v1/warehouses/") as root:
+        publisher.publish_distributed_event("warehouse.created", "/api/v1/warehouses/", "POST", {}, None, "op")
+    broker.run_until_idle()
+
+    spans = {span["name"]: span for span in exporter.find(root.trace_id)}
+    assert set(spans) == {"POST /api/v1/warehouses/", "publish", "queue.wait", "apply"}
+    assert spans["publish"]["parent_id"] == root.span_id
+    assert spans["queue.wait"]["parent_id"] == spans["apply"]["parent_id"] == spans["publish"]["span_id"]
+    # The self-call that applies the event continues the same trace
+    assert parse_traceparent(client.headers["traceparent"]) == (root.trace_id, spans["apply"]["span_id"])
+
+
+def test_untraced_delivery_adds_nothing():
+    assert not tracer.enabled
+    assert tracer.inject({}) == {}
+    with tracer.span("anything") as span:
+        assert span is None
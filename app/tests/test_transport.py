@@ -0,0 +1,215 @@
+import json
+import threading
+from app.core.rabbitmq import (
+    RabbitMQConnection, DistributedEventConsumer,
+    events_queue_name, retry_queue_name, dead_letter_queue_name
+)
+from app.core.transport import InMemoryBroker, InMemoryTransport, topic_matches
+from app.core.local_transport import LocalBrokerServer, MessageLog, UnixSocketTransport
+from app.core.config import settings
+
+SERVERS = ["A", "B", "C", "D"]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+
+class RecordingClient:
+    """Stands in for the consumer's httpx client; fails the first ``failures`` calls"""
+
+    def __init__(self, failures=0, status_code=503):
+        self.calls = []
+        self.failures = failures
+        self.status_code = status_code
+
+    def _call(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs.get("json")))
+        if len(self.calls) <= self.failures:
+            return FakeResponse(self.status_code)
+        return FakeResponse(200)
+
+    def post(self, url, **kwargs):
+        return self._call("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self._call("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self._call("DELETE", url, **kwargs)
+
+    def close(self):
+        pass
+
+
+def make_cluster(broker, clients=None):
+    clients = clients or {}
+    connections, consumers = {}, {}
+    for server_id in SERVERS:
+        peers = [s for s in SERVERS if s != server_id]
+        connection = RabbitMQConnection(
+            server_id=server_id, allowed_servers=peers, transport=InMemoryTransport(broker)
+        )
+        assert connection.connect()
+        consumer = DistributedEventConsumer(
+            connection=connection, http_client=clients.get(server_id, RecordingClient())
+        )
+        assert consumer.subscribe()
+        connections[server_id] = connection
+        consumers[server_id] = consumer
+    return connections, consumers
+
+
+def test_topic_matching():
+    assert topic_matches("A.B", "A.B")
+    assert topic_matches("*.B", "C.B")
+    assert not topic_matches("*.B", "C.B.x")
+    assert topic_matches("A.#", "A")
+    assert topic_matches("A.#", "A.B.C")
+    assert topic_matches("#.C", "A.B.C")
+    assert not topic_matches("A.*", "B.A")
+
+
+def test_event_reaches_every_peer_once():
+    broker = InMemoryBroker()
+    connections, consumers = make_cluster(broker)
+
+    assert connections["A"].publish_distributed_event(
+        "warehouse.created", "/api/v1/warehouses/", "POST",
+        {"name": "Main", "location": "NY"}, None, "create-main"
+    )
+    assert broker.run_until_idle() == 3
+
+    assert consumers["A"].http_client.calls == []
+    for server_id in ["B", "C", "D"]:
+        calls = consumers[server_id].http_client.calls
+        assert len(calls) == 1
+        method, url, body = calls[0]
+        assert method == "POST"
+        assert url == f"{settings.SERVER_ENDPOINTS[server_id]}/api/v1/warehouses/"
+        assert body == {"name": "Main", "location": "NY"}
+
+
+def test_failed_event_waits_in_retry_tier_then_succeeds():
+    clock = FakeClock()
+    broker = InMemoryBroker(clock=clock)
+    connections, consumers = make_cluster(broker, {"B": RecordingClient(failures=1)})
+    queue_name = events_queue_name("B")
+    first_delay = settings.EVENT_RETRY_DELAYS_MS[0]
+
+    connections["A"].publish_distributed_event(
+        "shipment.deleted", "/api/v1/shipments/7", "DELETE", None, 7, "delete-7"
+    )
+    broker.run_until_idle()
+
+    client = consumers["B"].http_client
+    assert len(client.calls) == 1
+    assert broker.depth(queue_name) == 0
+    assert broker.depth(retry_queue_name(queue_name, first_delay)) == 1
+
+    # Nothing is redelivered before the TTL expires
+    clock.now += first_delay / 1000.0 / 2
+    assert broker.run_until_idle() == 0
+
+    clock.now += first_delay / 1000.0
+    assert broker.run_until_idle() == 1
+    assert len(client.calls) == 2
+    assert broker.depth(retry_queue_name(queue_name, first_delay)) == 0
+    assert broker.depth(dead_letter_queue_name(queue_name)) == 0
+
+
+def test_permanent_failure_is_dead_lettered():
+    broker = InMemoryBroker()
+    connections, consumers = make_cluster(broker, {"C": RecordingClient(failures=99, status_code=422)})
+    queue_name = events_queue_name("C")
+
+    connections["A"].publish_distributed_event(
+        "shipment.updated", "/api/v1/shipments/1", "PUT", {"weight": -1}, 1, "update-1"
+    )
+    broker.run_until_idle()
+
+    dead_queue = dead_letter_queue_name(queue_name)
+    assert broker.depth(dead_queue) == 1
+    delivery = connections["C"].transport.get(dead_queue)
+    assert delivery.headers["x-retry-count"] == 1
+    assert "422" in delivery.headers["x-last-error"]
+    assert json.loads(delivery.body)["event_type"] == "shipment.updated"
+
+
+def test_unix_socket_transport_survives_broker_restart(tmp_path):
+    socket_path = str(tmp_path / "events.sock")
+    log_path = str(tmp_path / "broker.log")
+
+    server = LocalBrokerServer(socket_path=socket_path, log_path=log_path)
+    server.start()
+    publisher = RabbitMQConnection(server_id="A", allowed_servers=["B"],
+                                   transport=UnixSocketTransport(socket_path))
+    consumer_connection = RabbitMQConnection(server_id="B", allowed_servers=["A"],
+                                             transport=UnixSocketTransport(socket_path))
+    assert publisher.connect() and consumer_connection.connect()
+    publisher.transport.confirm_delivery()
+
+    publisher.publish_distributed_event("warehouse.deleted", "/api/v1/warehouses/3", "DELETE", None, 3, "op")
+    publisher.publish_distributed_event("warehouse.deleted", "/api/v1/warehouses/4", "DELETE", None, 4, "op")
+    first = consumer_connection.transport.get(events_queue_name("B"))
+    consumer_connection.transport.ack(first.delivery_tag)
+    assert json.loads(first.body)["resource_id"] == 3
+    # Round trip so the fire-and-forget ack is processed before the restart
+    assert consumer_connection.transport.declare_queue(events_queue_name("B")) == 1
+
+    publisher.disconnect()
+    consumer_connection.disconnect()
+    server.stop()
+
+    # Only the unacked event comes back from the log
+    server = LocalBrokerServer(socket_path=socket_path, log_path=log_path)
+    server.start()
+    try:
+        client = RecordingClient()
+        consumer = DistributedEventConsumer(
+            connection=RabbitMQConnection(server_id="B", allowed_servers=["A"],
+                                          transport=UnixSocketTransport(socket_path)),
+            http_client=client
+        )
+        assert consumer.subscribe()
+        transport = consumer.connection.transport
+        threading.Timer(0.2, transport.stop_consuming).start()
+        transport.start_consuming()
+        assert [call[1] for call in client.calls] == [f"{settings.SERVER_ENDPOINTS['B']}/api/v1/warehouses/4"]
+        consumer.connection.disconnect()
+    finally:
+        server.stop()
+
+
+def test_journal_is_compacted_while_running(tmp_path):
+    log_path = str(tmp_path / "broker.log")
+    log = MessageLog(log_path, compact_after=20)
+    broker = InMemoryBroker()
+    log.replay(broker)
+    broker.journal = log
+    transport = InMemoryTransport(broker)
+    transport.connect()
+    transport.declare_queue("q", durable=True)
+
+    for n in range(200):
+        transport.publish("", "q", str(n).encode())
+        if n % 10:
+            transport.ack(transport.get("q").delivery_tag)
+    with open(log_path) as f:
+        lines = sum(1 for _ in f)
+    # Live messages plus fewer than compact_after dead lines, not two lines per event
+    assert lines < broker.depth("q") + 1 + 20
+    log.close()
+
+    restored = InMemoryBroker()
+    assert MessageLog(log_path).replay(restored) == broker.depth("q")
@@ -0,0 +1,53 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.models.base import Base
+from app.models.logistic import WarehouseStats
+from app.schemas.logistic import ShipmentCreate, ShipmentUpdate
+from app.services.logistic_service import ShipmentService, WarehouseStatsService
+from app.services.replication import ReplicatedRequest
+
+
+def make_session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def create(db, tracking_number, weight, warehouse_id=1):
+    shipment = ShipmentCreate(tracking_number=tracking_number, origin="Oslo", destination="Bergen",
+                              weight=weight, warehouse_id=warehouse_id)
+    return ShipmentService.create_shipment(db, shipment, "create", ReplicatedRequest("B"))
+
+
+def test_stats_follow_shipment_writes():
+    db = make_session()
+    first = create(db, "T-1", 2.0)
+    second = create(db, "T-2", 3.0)
+    create(db, "T-3", 4.0, warehouse_id=2)
+
+    ShipmentService.update_shipment(db, first.id, ShipmentUpdate(status="delivered", weight=2.5),
+                                    "update", ReplicatedRequest("B"))
+    ShipmentService.update_shipment(db, second.id, ShipmentUpdate(warehouse_id=2),
+                                    "update", ReplicatedRequest("B"))
+    ShipmentService.delete_shipment(db, second.id, "delete", ReplicatedRequest("B"))
+
+    stats = WarehouseStatsService.get_stats(db, 1)
+    assert stats["shipment_count"] == 1
+    assert stats["by_status"] == {"delivered": {"shipment_count": 1, "total_weight": 2.5}}
+    assert WarehouseStatsService.get_stats(db, 2)["total_weight"] == 4.0
+    assert WarehouseStatsService.find_drift(db) == []
+
+
+def test_rebuild_repairs_drift():
+    db = make_session()
+    create(db, "T-1", 2.0)
+    db.query(WarehouseStats).update({"shipment_count": 5})
+    db.commit()
+
+    drift = WarehouseStatsService.find_drift(db)
+    assert [(d["warehouse_id"], d["status"], d["stored"]["shipment_count"]) for d in drift] == [(1, "pending", 5)]
+
+    WarehouseStatsService.rebuild(db)
+    assert WarehouseStatsService.find_drift(db) == []
+    assert WarehouseStatsService.get_stats(db, 1)["shipment_count"] == 1
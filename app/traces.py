@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Trace Viewer
+Merge the span files of every server (TRACE_EXPORTER=jsonl) and print one
+trace as a tree: where a write spent its time from API entry on the origin to
+the apply on each peer
+
+Usage: python -m app.traces TRACE_ID [traces_A.jsonl traces_B.jsonl ...]
+"""
+
+import glob
+import argparse
+from collections import defaultdict
+from app.core.tracing import read_spans
+
+
+def print_tree(spans) -> None:
+    children = defaultdict(list)
+    ids = {span["span_id"] for span in spans}
+    for span in sorted(spans, key=lambda s: s["start"]):
+        # Spans whose parent was not recorded (e.g. on a server without a file) become roots
+        children[span["parent_id"] if span["parent_id"] in ids else None].append(span)
+    origin = min(span["start"] for span in spans)
+
+    def walk(parent_id, depth):
+        for span in children[parent_id]:
+            offset = (span["start"] - origin) * 1000
+            print(f"{offset:>10.1f} ms  {span['duration_ms']:>9.1f} ms  [{span['server']}] "
+                  f"{'  ' * depth}{span['name']}  {span['attributes']}")
+            walk(span["span_id"], depth + 1)
+
+    print(f"{'start':>13}  {'duration':>12}")
+    walk(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print one trace across servers")
+    parser.add_argument("trace_id")
+    parser.add_argument("files", nargs="*", help="Span files (default: ./traces_*.jsonl)")
+    args = parser.parse_args()
+
+    spans = [
+        span
+        for path in args.files or sorted(glob.glob("traces_*.jsonl"))
+        for span in read_spans(path)
+        if span["trace_id"] == args.trace_id
+    ]
+    if not spans:
+        print(f"No spans found for trace {args.trace_id}")
+        return
+    print_tree(spans)
+
+
+if __name__ == "__main__":
+    main()
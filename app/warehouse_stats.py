@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Warehouse Stats Maintenance
+Compare the incrementally maintained warehouse_stats table with the shipments
+table, or rebuild it from scratch
+
+Usage: SERVER_ID=A python -m app.warehouse_stats check
+       SERVER_ID=A python -m app.warehouse_stats rebuild
+"""
+
+import sys
+import json
+import argparse
+import logging
+from app.db.session import SessionLocal, init_db
+from app.services.logistic_service import WarehouseStatsService
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or rebuild warehouse_stats")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    args = parser.parse_args()
+    
+    init_db()
+    db = SessionLocal()
+    try:
+        if args.command == "check":
+            drift = WarehouseStatsService.find_drift(db)
+            for bucket in drift:
+                print(json.dumps(bucket))
+            logger.info(f"{len(drift)} drifted buckets")
+            if drift:
+                sys.exit(1)
+        else:
+            buckets = WarehouseStatsService.rebuild(db)
+            logger.info(f"Rebuilt {buckets} warehouse_stats buckets")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
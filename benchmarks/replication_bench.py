@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+Replication throughput and latency benchmark
+Starts a cluster of N servers (API + consumer per server, fresh SQLite files) on top of
+the local Unix-socket broker or RabbitMQ, drives a create/update/delete/read mix and
+reports write latency, time-to-visible on every peer, apply rate per consumer and the
+CPU/DB cost per event. Results are written as JSON so runs can be compared across commits.
+
+Usage: python -m benchmarks.replication_bench [--servers 4] [--ops 2000] [--mix create=40,update=30,delete=10,read=20]
+       python -m benchmarks.replication_bench --embedded-consumer   # consumer inside each API process
+       python -m benchmarks.replication_bench --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import string
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import statistics
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+
+API = "/api/v1"
+HEADERS = {"operation-name": "replication-bench"}
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(pct):
+        return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "p50": round(pick(50) * 1000, 3),
+        "p99": round(pick(99) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+        "mean": round(statistics.mean(ordered) * 1000, 3),
+    }
+
+
+def cpu_seconds(pid: int) -> float:
+    """User + system CPU time of a process (Linux /proc)"""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def rss_mb(pid: int) -> float:
+    """Resident memory of a process in MB (Linux /proc)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Cluster:
+    """N servers, each an API process plus a consumer process (or an embedded
+    consumer task) with its own database"""
+
+    def __init__(self, size: int, broker: str, base_port: int, workdir: str, extra_env: Dict[str, str],
+                 embedded_consumer: bool = False):
+        self.server_ids = list(string.ascii_uppercase[:size])
+        self.ports = {sid: base_port + i for i, sid in enumerate(self.server_ids)}
+        self.urls = {sid: f"http://127.0.0.1:{port}" for sid, port in self.ports.items()}
+        self.broker = broker
+        self.workdir = workdir
+        self.extra_env = extra_env
+        self.embedded_consumer = embedded_consumer
+        self.startup_seconds = None
+        self.broker_process = None
+        self.servers: Dict[str, subprocess.Popen] = {}
+        self.consumers: Dict[str, subprocess.Popen] = {}
+        self.socket_path = os.path.join(workdir, "broker.sock")
+
+    def _env(self, server_id: str) -> Dict[str, str]:
+        env = dict(os.environ)
+        env.update({
+            "SERVER_ID": server_id,
+            "SERVER_PORT": str(self.ports[server_id]),
+            "ALLOWED_SERVERS": json.dumps([s for s in self.server_ids if s != server_id]),
+            "SERVER_ENDPOINTS": json.dumps(self.urls),
+            "DATABASE_URL": f"sqlite:///{self.workdir}/server_{server_id}.db",
+            "EVENT_TRANSPORT": "unix" if self.broker == "unix" else "rabbitmq",
+            "LOCAL_BROKER_SOCKET": self.socket_path,
+            "EMBEDDED_CONSUMER": "true" if self.embedded_consumer else "false",
+        })
+        env.update(self.extra_env)
+        return env
+
+    def _spawn(self, args: List[str], env: Dict[str, str], log_name: str) -> subprocess.Popen:
+        log = open(os.path.join(self.workdir, log_name), "w")
+        return subprocess.Popen([sys.executable] + args, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    def start(self) -> None:
+        if self.broker == "unix":
+            env = dict(os.environ, LOCAL_BROKER_SOCKET=self.socket_path,
+                       LOCAL_BROKER_LOG=os.path.join(self.workdir, "broker.log"))
+            self.broker_process = self._spawn(["-m", "app.local_broker"], env, "broker.log.txt")
+            self._wait(lambda: os.path.exists(self.socket_path), "local broker")
+
+        started = time.perf_counter()
+        for sid in self.server_ids:
+            self.servers[sid] = self._spawn(
+                ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                 "--port", str(self.ports[sid]), "--log-level", "warning"],
+                self._env(sid), f"server_{sid}.log"
+            )
+        for sid in self.server_ids:
+            self._wait(lambda sid=sid: self._is_up(sid), f"server {sid}")
+            if not self.embedded_consumer:
+                self.consumers[sid] = self._spawn(["-m", "app.consumer"], self._env(sid), f"consumer_{sid}.log")
+        self.startup_seconds = time.perf_counter() - started
+        # Give consumers time to subscribe before traffic starts
+        time.sleep(1.0)
+
+    def _is_up(self, sid: str) -> bool:
+        try:
+            return httpx.get(f"{self.urls[sid]}{API}/ping", headers=HEADERS, timeout=1).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    @staticmethod
+    def _wait(predicate, what: str, timeout: float = 30) -> None:
+        deadline = time.time() + timeout
+        while not predicate():
+            if time.time() > deadline:
+                raise RuntimeError(f"Timed out waiting for {what}")
+            time.sleep(0.1)
+
+    def processes(self) -> Dict[str, int]:
+        pids = {f"server_{sid}": p.pid for sid, p in self.servers.items()}
+        pids.update({f"consumer_{sid}": p.pid for sid, p in self.consumers.items()})
+        return pids
+
+    def stop(self) -> None:
+        for process in list(self.consumers.values()) + list(self.servers.values()) + [self.broker_process]:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        for process in list(self.consumers.values()) + list(self.servers.values()) + [self.broker_process]:
+            if process is not None:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+
+class Workload:
+    """Drives the operation mix and samples time-to-visible on every peer"""
+
+    def __init__(self, cluster: Cluster, args):
+        self.cluster = cluster
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.mix = self._parse_mix(args.mix)
+        self.remaining = args.ops
+        self.live: List[dict] = []
+        self.write_latency: Dict[str, List[float]] = {"create": [], "update": [], "delete": []}
+        self.read_latency: List[float] = []
+        self.visibility: List[float] = []
+        self.unconverged = 0
+        self.errors = 0
+        self.visibility_tasks: List[asyncio.Task] = []
+        self.writers = cluster.server_ids if args.write_target == "spread" else cluster.server_ids[:1]
+
+    @staticmethod
+    def _parse_mix(mix: str) -> Dict[str, float]:
+        weights = {}
+        for part in mix.split(","):
+            name, weight = part.split("=")
+            if name not in ("create", "update", "delete", "read"):
+                raise ValueError(f"Unknown operation in mix: {name}")
+            weights[name] = float(weight)
+        return weights
+
+    async def setup(self, client: httpx.AsyncClient) -> None:
+        """Create warehouses on the first server and wait until every peer has them"""
+        origin = self.cluster.urls[self.cluster.server_ids[0]]
+        for i in range(self.args.warehouses):
+            response = await client.post(f"{origin}{API}/warehouses/", headers=HEADERS,
+                                         json={"name": f"Bench {i}", "location": "Bench City"})
+            response.raise_for_status()
+        for sid in self.cluster.server_ids:
+            url = f"{self.cluster.urls[sid]}{API}/warehouses/?limit=1000"
+            deadline = time.time() + 30
+            while len((await client.get(url, headers=HEADERS)).json()) < self.args.warehouses:
+                if time.time() > deadline:
+                    raise RuntimeError(f"Warehouses did not replicate to {sid}")
+                await asyncio.sleep(0.05)
+
+    def _next_operation(self) -> Optional[str]:
+        if self.remaining <= 0:
+            return None
+        self.remaining -= 1
+        operation = self.random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        if operation in ("update", "delete", "read") and not self.live:
+            operation = "create"
+        return operation
+
+    async def worker(self, client: httpx.AsyncClient) -> None:
+        while True:
+            operation = self._next_operation()
+            if operation is None:
+                return
+            try:
+                await getattr(self, f"do_{operation}")(client)
+            except httpx.HTTPError:
+                self.errors += 1
+
+    async def do_create(self, client):
+        origin = self.random.choice(self.writers)
+        shipment = {
+            "tracking_number": f"BENCH-{uuid.uuid4().hex[:16]}",
+            "origin": "Bench Origin",
+            "destination": "Bench Destination",
+            "weight": round(self.random.uniform(1, 100), 3),
+            "warehouse_id": self.random.randint(1, self.args.warehouses),
+        }
+        started = time.perf_counter()
+        response = await client.post(f"{self.cluster.urls[origin]}{API}/shipments/",
+                                     headers=HEADERS, json=shipment)
+        if response.status_code != 200:
+            self.errors += 1
+            return
+        self.write_latency["create"].append(time.perf_counter() - started)
+        record = dict(shipment, id=response.json()["id"], server=origin)
+        self.live.append(record)
+        self._sample_visibility(client, record, lambda r: r.status_code == 200)
+
+    async def do_update(self, client):
+        # Take the shipment out of the live set so no other worker touches it meanwhile
+        record = self.live.pop(self.random.randrange(len(self.live)))
+        weight = round(self.random.uniform(100, 200), 3)
+        started = time.perf_counter()
+        response = await client.put(f"{self.cluster.urls[record['server']]}{API}/shipments/{record['id']}",
+                                    headers=HEADERS, json={"weight": weight})
+        self.live.append(record)
+        if response.status_code != 200:
+            self.errors += 1
+            return
+        self.write_latency["update"].append(time.perf_counter() - started)
+        record["weight"] = weight
+        self._sample_visibility(client, record,
+                                lambda r: r.status_code == 200 and r.json()["weight"] == weight)
+
+    async def do_delete(self, client):
+        record = self.live.pop(self.random.randrange(len(self.live)))
+        started = time.perf_counter()
+        response = await client.delete(f"{self.cluster.urls[record['server']]}{API}/shipments/{record['id']}",
+                                       headers=HEADERS)
+        if response.status_code != 200:
+            self.errors += 1
+            return
+        self.write_latency["delete"].append(time.perf_counter() - started)
+        self._sample_visibility(client, record, lambda r: r.status_code == 404)
+
+    async def do_read(self, client):
+        record = self.random.choice(self.live)
+        server = self.random.choice(self.cluster.server_ids)
+        started = time.perf_counter()
+        await client.get(f"{self.cluster.urls[server]}{API}/shipments/tracking/{record['tracking_number']}",
+                         headers=HEADERS)
+        self.read_latency.append(time.perf_counter() - started)
+
+    def _sample_visibility(self, client, record, is_visible) -> None:
+        if self.random.random() >= self.args.visibility_sample:
+            return
+        peers = [sid for sid in self.cluster.server_ids if sid != record["server"]]
+        self.visibility_tasks.append(asyncio.create_task(
+            self._wait_visible(client, peers, record["tracking_number"], is_visible, time.perf_counter())
+        ))
+
+    async def _wait_visible(self, client, peers, tracking_number, is_visible, written_at) -> None:
+        async def on_peer(sid):
+            url = f"{self.cluster.urls[sid]}{API}/shipments/tracking/{tracking_number}"
+            deadline = written_at + self.args.visibility_timeout
+            while time.perf_counter() < deadline:
+                if is_visible(await client.get(url, headers=HEADERS)):
+                    return True
+                await asyncio.sleep(self.args.poll_interval)
+            return False
+
+        results = await asyncio.gather(*(on_peer(sid) for sid in peers))
+        if all(results):
+            self.visibility.append(time.perf_counter() - written_at)
+        else:
+            self.unconverged += 1
+
+
+async def fetch_metrics(client: httpx.AsyncClient, cluster: Cluster) -> Dict[str, Dict[str, float]]:
+    snapshots = {}
+    for sid in cluster.server_ids:
+        response = await client.get(f"{cluster.urls[sid]}{API}/metrics", headers=HEADERS)
+        snapshots[sid] = response.json()["metrics"]
+    return snapshots
+
+
+def delta(after: Dict[str, float], before: Dict[str, float], key: str) -> float:
+    return after.get(key, 0) - before.get(key, 0)
+
+
+async def wait_for_drain(client, cluster, before, started, stall_timeout: float) -> Dict[str, dict]:
+    """Wait until every server applied all writes made elsewhere; returns per-consumer apply stats"""
+    pending = set(cluster.server_ids)
+    drained = {}
+    last_progress, last_total = time.perf_counter(), -1
+    while pending:
+        after = await fetch_metrics(client, cluster)
+        local = {sid: delta(after[sid], before[sid], "writes.local") for sid in cluster.server_ids}
+        total = 0
+        for sid in list(pending):
+            expected = sum(v for s, v in local.items() if s != sid)
+            applied = delta(after[sid], before[sid], "writes.replicated")
+            total += applied
+            if applied >= expected:
+                pending.discard(sid)
+                elapsed = time.perf_counter() - started
+                drained[sid] = {"applied": int(applied), "expected": int(expected),
+                                "seconds": round(elapsed, 3),
+                                "events_per_sec": round(applied / elapsed, 1) if applied else 0.0}
+        if total != last_total:
+            last_progress, last_total = time.perf_counter(), total
+        elif time.perf_counter() - last_progress > stall_timeout:
+            for sid in pending:
+                expected = sum(v for s, v in local.items() if s != sid)
+                applied = delta(after[sid], before[sid], "writes.replicated")
+                elapsed = time.perf_counter() - started
+                drained[sid] = {"applied": int(applied), "expected": int(expected),
+                                "seconds": round(elapsed, 3),
+                                "events_per_sec": round(applied / elapsed, 1) if applied else 0.0}
+            break
+        await asyncio.sleep(0.05)
+    return drained
+
+
+async def run_benchmark(cluster: Cluster, args) -> dict:
+    workload = Workload(cluster, args)
+    limits = httpx.Limits(max_connections=args.concurrency * 4)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        await workload.setup(client)
+
+        pids = cluster.processes()
+        cpu_before = {name: cpu_seconds(pid) for name, pid in pids.items()}
+        metrics_before = await fetch_metrics(client, cluster)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(workload.worker(client) for _ in range(args.concurrency)))
+        drive_seconds = time.perf_counter() - started
+        consumers = await wait_for_drain(client, cluster, metrics_before, started, args.stall_timeout)
+        await asyncio.gather(*workload.visibility_tasks)
+
+        metrics_after = await fetch_metrics(client, cluster)
+        cpu_after = {name: cpu_seconds(pid) for name, pid in pids.items()}
+        rss = {name: round(rss_mb(pid), 1) for name, pid in pids.items()}
+
+    writes = sum(len(v) for v in workload.write_latency.values())
+    events = sum(delta(metrics_after[s], metrics_before[s], "writes.local")
+                 + delta(metrics_after[s], metrics_before[s], "writes.replicated")
+                 for s in cluster.server_ids)
+    statements = sum(delta(metrics_after[s], metrics_before[s], "db.statements") for s in cluster.server_ids)
+    db_seconds = sum(delta(metrics_after[s], metrics_before[s], "db.seconds") for s in cluster.server_ids)
+    cpu = {name: round(cpu_after[name] - cpu_before[name], 3) for name in pids}
+    all_writes = [v for values in workload.write_latency.values() for v in values]
+
+    return {
+        "write_latency_ms": dict({op: percentiles(v) for op, v in workload.write_latency.items()},
+                                 all=percentiles(all_writes)),
+        "read_latency_ms": percentiles(workload.read_latency),
+        "visibility_ms": dict(percentiles(workload.visibility), unconverged=workload.unconverged),
+        "consumers": consumers,
+        "throughput": {
+            "writes": writes,
+            "reads": len(workload.read_latency),
+            "errors": workload.errors,
+            "drive_seconds": round(drive_seconds, 3),
+            "writes_per_sec": round(writes / drive_seconds, 1),
+        },
+        "cost": {
+            "events_applied": int(events),
+            "cpu_seconds": cpu,
+            "cpu_ms_per_event": round(sum(cpu.values()) * 1000 / events, 3) if events else None,
+            "db_statements_per_event": round(statements / events, 2) if events else None,
+            "db_ms_per_event": round(db_seconds * 1000 / events, 3) if events else None,
+            "rss_mb": dict(rss, total=round(sum(rss.values()), 1)),
+            "startup_seconds": round(cluster.startup_seconds, 3),
+        },
+    }
+
+
+KEY_METRICS = [
+    ("write p50 ms", ("write_latency_ms", "all", "p50")),
+    ("write p99 ms", ("write_latency_ms", "all", "p99")),
+    ("visible p50 ms", ("visibility_ms", "p50")),
+    ("visible p99 ms", ("visibility_ms", "p99")),
+    ("writes/sec", ("throughput", "writes_per_sec")),
+    ("cpu ms/event", ("cost", "cpu_ms_per_event")),
+    ("db stmts/event", ("cost", "db_statements_per_event")),
+    ("db ms/event", ("cost", "db_ms_per_event")),
+    ("rss MB total", ("cost", "rss_mb", "total")),
+    ("startup s", ("cost", "startup_seconds")),
+]
+
+
+def lookup(result: dict, path) -> Optional[float]:
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def print_summary(result: dict) -> None:
+    for label, path in KEY_METRICS:
+        print(f"{label:>16}: {lookup(result['results'], path)}")
+    for sid, stats in result["results"]["consumers"].items():
+        print(f"{'consumer ' + sid:>16}: {stats['events_per_sec']} ev/s ({stats['applied']}/{stats['expected']})")
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'metric':>16}  {old.get('commit') or 'old':>10}  {new.get('commit') or 'new':>10}  change")
+    for label, path in KEY_METRICS:
+        before, after = lookup(old["results"], path), lookup(new["results"], path)
+        change = f"{(after - before) / before * 100:+.1f}%" if before and after is not None else "n/a"
+        print(f"{label:>16}  {before!s:>10}  {after!s:>10}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cross-server replication")
+    parser.add_argument("--servers", type=int, default=4)
+    parser.add_argument("--broker", choices=["unix", "rabbitmq"], default="unix",
+                        help="unix starts a local broker stand-in; rabbitmq uses RABBITMQ_* settings")
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--mix", default="create=40,update=30,delete=10,read=20")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warehouses", type=int, default=5)
+    parser.add_argument("--write-target", choices=["single", "spread"], default="single",
+                        help="single: all writes on the first server; spread: writes on every server")
+    parser.add_argument("--visibility-sample", type=float, default=0.2, help="Fraction of writes to track")
+    parser.add_argument("--visibility-timeout", type=float, default=30.0)
+    parser.add_argument("--poll-interval", type=float, default=0.005)
+    parser.add_argument("--stall-timeout", type=float, default=10.0)
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--embedded-consumer", action="store_true",
+                        help="Run each consumer inside its API process (EMBEDDED_CONSUMER=true)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for every server/consumer (repeatable)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory with logs and databases")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    workdir = tempfile.mkdtemp(prefix="replication_bench_")
+    cluster = Cluster(args.servers, args.broker, args.base_port, workdir, extra_env, args.embedded_consumer)
+    try:
+        cluster.start()
+        results = asyncio.run(run_benchmark(cluster, args))
+    finally:
+        cluster.stop()
+
+    commit = git_commit()
+    result = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare", "output", "keep")},
+        "results": results,
+    }
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{commit or 'unknown'}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+
+    print_summary(result)
+    print(f"Results written to {output}")
+    if args.keep:
+        print(f"Logs and databases kept in {workdir}")
+    else:
+        subprocess.run(["rm", "-rf", workdir])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+List serialisation benchmark
+Fills a scratch SQLite database with shipments and compares rows/sec of
+GET /shipments/ through the default path (ORM objects validated against
+response_model) and the fast path (?fast=true: column tuples encoded with orjson).
+Both responses are checked to be identical before timing.
+
+Usage: python -m benchmarks.serialization_bench [--rows 20000] [--pages 100 1000 10000] [--repeat 5]
+"""
+
+import os
+import json
+import time
+import logging
+import argparse
+import tempfile
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.db.session import get_db
+from app.models.base import Base
+from app.models.logistic import Warehouse, Shipment
+
+HEADERS = {"operation-name": "serialization-bench"}
+STATUSES = ["pending", "in_transit", "delivered"]
+
+
+def populate(engine, rows: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(Warehouse), [{"name": "Bench", "location": "Bench City", "created_at": now}])
+        conn.execute(insert(Shipment), [
+            {
+                "tracking_number": f"BENCH-{i:08d}",
+                "origin": "Bench Origin",
+                "destination": "Bench Destination",
+                "weight": 1.0 + i % 97 * 0.25,
+                "status": STATUSES[i % 3],
+                "warehouse_id": 1,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(rows)
+        ])
+
+
+def measure(client: TestClient, url: str, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(url, headers=HEADERS)
+        elapsed = time.perf_counter() - started
+        assert response.status_code == 200
+        best = min(best, elapsed)
+    return rows / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare list response serialisation paths")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5, help="Requests per measurement (best is kept)")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    # TestClient logs every request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    workdir = tempfile.mkdtemp(prefix="serialization_bench_")
+    engine = create_engine(f"sqlite:///{workdir}/bench.db", connect_args={"check_same_thread": False})
+    populate(engine, args.rows)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def bench_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = bench_db
+    client = TestClient(app)
+    results = {}
+    try:
+        for page in args.pages:
+            url = f"/api/v1/shipments/?limit={page}"
+            default = client.get(url, headers=HEADERS).json()
+            fast = client.get(f"{url}&fast=true", headers=HEADERS).json()
+            if default != fast:
+                raise RuntimeError(f"Fast path response differs from the default path at limit={page}")
+
+            rows = len(default)
+            default_rate = measure(client, url, rows, args.repeat)
+            fast_rate = measure(client, f"{url}&fast=true", rows, args.repeat)
+            results[page] = {
+                "rows": rows,
+                "default_rows_per_sec": round(default_rate),
+                "fast_rows_per_sec": round(fast_rate),
+                "speedup": round(fast_rate / default_rate, 2),
+            }
+            print(f"limit={page:>6}: default {default_rate:>10.0f} rows/s  "
+                  f"fast {fast_rate:>10.0f} rows/s  x{fast_rate / default_rate:.2f}")
+    finally:
+        app.dependency_overrides.clear()
+        engine.dispose()
+        os.remove(f"{workdir}/bench.db")
+        os.rmdir(workdir)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Transport latency benchmark
+Publishes N events through each transport and measures publish -> consume latency
+and throughput. The Unix-socket broker runs as a separate process, like in production;
+RabbitMQ is skipped when it is not reachable.
+
+Usage: python -m benchmarks.transport_bench [--messages 5000] [--durable] [--transports memory unix rabbitmq]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import subprocess
+import statistics
+from app.core.transport import InMemoryBroker, InMemoryTransport, PikaTransport
+from app.core.local_transport import UnixSocketTransport
+
+EXCHANGE = "transport_bench"
+QUEUE = "transport_bench_events"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(publisher, consumer, messages: int, payload_size: int, latency_samples: int):
+    """Flood ``messages`` events for throughput, then send ``latency_samples``
+    one at a time so latency is not dominated by queueing"""
+    for transport in (publisher, consumer):
+        transport.declare_exchange(EXCHANGE, "topic")
+    consumer.declare_queue(QUEUE)
+    consumer.bind_queue(QUEUE, EXCHANGE, "*.bench")
+    consumer.purge(QUEUE)
+    consumer.set_prefetch(100)
+
+    received = []
+    arrived = threading.Semaphore(0)
+    padding = "x" * payload_size
+
+    def on_delivery(delivery):
+        message = json.loads(delivery.body)
+        consumer.ack(delivery.delivery_tag)
+        if message.get("stop"):
+            # Stop from the consumer's own thread; pika channels are not thread-safe
+            consumer.stop_consuming()
+            return
+        received.append(time.perf_counter() - message["sent"])
+        arrived.release()
+
+    def publish(**extra):
+        body = json.dumps(dict({"sent": time.perf_counter(), "padding": padding}, **extra)).encode()
+        publisher.publish(EXCHANGE, "A.bench", body, headers={"operation-name": "bench"},
+                          content_type="application/json")
+
+    def wait_for(count):
+        for _ in range(count):
+            if not arrived.acquire(timeout=60):
+                raise RuntimeError(f"Only {len(received)} events consumed")
+
+    consumer.consume(QUEUE, on_delivery)
+    consumer_thread = threading.Thread(target=consumer.start_consuming, daemon=True)
+    consumer_thread.start()
+
+    started = time.perf_counter()
+    for _ in range(messages):
+        publish()
+    publish_seconds = time.perf_counter() - started
+    wait_for(messages)
+    total_seconds = time.perf_counter() - started
+
+    received.clear()
+    for _ in range(latency_samples):
+        publish()
+        wait_for(1)
+    latencies = list(received)
+
+    publish(stop=True)
+    consumer_thread.join(timeout=5)
+
+    return {
+        "messages": messages,
+        "publish_per_sec": round(messages / publish_seconds),
+        "end_to_end_per_sec": round(messages / total_seconds),
+        "latency_p50_us": round(percentile(latencies, 50) * 1e6, 1),
+        "latency_p99_us": round(percentile(latencies, 99) * 1e6, 1),
+        "latency_mean_us": round(statistics.mean(latencies) * 1e6, 1),
+    }
+
+
+def bench_memory(args):
+    broker = InMemoryBroker()
+    publisher, consumer = InMemoryTransport(broker), InMemoryTransport(broker)
+    publisher.connect()
+    consumer.connect()
+    return run(publisher, consumer, args.messages, args.payload, args.latency_samples)
+
+
+def bench_unix(args):
+    workdir = tempfile.mkdtemp(prefix="transport_bench_")
+    socket_path = os.path.join(workdir, "broker.sock")
+    env = dict(os.environ, LOCAL_BROKER_SOCKET=socket_path,
+               LOCAL_BROKER_LOG=os.path.join(workdir, "broker.log") if args.durable else "")
+    broker = subprocess.Popen([sys.executable, "-m", "app.local_broker"], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 10
+        while not os.path.exists(socket_path):
+            if time.time() > deadline:
+                raise RuntimeError("Local broker did not start")
+            time.sleep(0.05)
+        publisher, consumer = UnixSocketTransport(socket_path), UnixSocketTransport(socket_path)
+        publisher.connect()
+        consumer.connect()
+        result = run(publisher, consumer, args.messages, args.payload, args.latency_samples)
+        publisher.close()
+        consumer.close()
+        return result
+    finally:
+        broker.terminate()
+        broker.wait()
+
+
+def bench_rabbitmq(args):
+    publisher, consumer = PikaTransport(), PikaTransport()
+    try:
+        publisher.connect()
+        consumer.connect()
+    except Exception as e:
+        print(f"Skipping rabbitmq: {e!r}", file=sys.stderr)
+        return None
+    try:
+        return run(publisher, consumer, args.messages, args.payload, args.latency_samples)
+    finally:
+        publisher.close()
+        consumer.close()
+
+
+BENCHMARKS = {"memory": bench_memory, "unix": bench_unix, "rabbitmq": bench_rabbitmq}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare event transports")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--latency-samples", type=int, default=500, help="Events sent one at a time")
+    parser.add_argument("--payload", type=int, default=256, help="Padding bytes per event")
+    parser.add_argument("--durable", action="store_true", help="Enable the local broker's message log")
+    parser.add_argument("--transports", nargs="+", default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.transports:
+        result = BENCHMARKS[name](args)
+        if result is not None:
+            results[name] = result
+            print(f"{name:>9}: {result['end_to_end_per_sec']:>7} ev/s  "
+                  f"p50 {result['latency_p50_us']:>9}us  p99 {result['latency_p99_us']:>9}us")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
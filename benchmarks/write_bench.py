@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Write throughput benchmark
+Creates shipments from N concurrent threads through ShipmentService (the same
+path POST /shipments/ takes) against a scratch SQLite file, once committing
+every write on its own and once with GROUP_COMMIT, and reports writes/sec and
+commits issued. Events go to the in-memory transport so no broker is needed.
+
+Usage: python -m benchmarks.write_bench [--writes 2000] [--concurrency 1 8 32] [--window-ms 2]
+"""
+
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+from types import SimpleNamespace
+
+# Must be set before the app modules read their settings
+os.environ.setdefault("EVENT_TRANSPORT", "memory")
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.models.base import Base  # noqa: E402
+from app.schemas.logistic import ShipmentCreate  # noqa: E402
+from app.services.logistic_service import ShipmentService  # noqa: E402
+
+
+def local_request():
+    return SimpleNamespace(state=SimpleNamespace(is_replicated=False))
+
+
+def run(Session, writes: int, concurrency: int, prefix: str) -> float:
+    per_thread = writes // concurrency
+
+    def worker(t):
+        for n in range(per_thread):
+            db = Session()
+            try:
+                shipment = ShipmentCreate(tracking_number=f"{prefix}-{t}-{n}", origin="Oslo",
+                                          destination="Bergen", weight=1.0, warehouse_id=1 + n % 10)
+                ShipmentService.create_shipment(db, shipment, "write-bench", local_request())
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return per_thread * concurrency / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-write commits with group commit")
+    parser.add_argument("--writes", type=int, default=2000, help="Writes per measurement")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--window-ms", type=float, default=settings.GROUP_COMMIT_WINDOW_MS)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    settings.GROUP_COMMIT_WINDOW_MS = args.window_ms
+
+    workdir = tempfile.mkdtemp(prefix="write_bench_")
+    engine = create_engine(f"sqlite:///{workdir}/bench.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    results = {}
+    try:
+        for concurrency in args.concurrency:
+            row = {}
+            for mode in ("single", "group"):
+                settings.GROUP_COMMIT = mode == "group"
+                commits.clear()
+                rate = run(Session, args.writes, concurrency, f"{mode}-{concurrency}")
+                row[mode] = {"writes_per_sec": round(rate), "commits": len(commits)}
+            row["speedup"] = round(row["group"]["writes_per_sec"] / row["single"]["writes_per_sec"], 2)
+            results[concurrency] = row
+            print(f"concurrency={concurrency:>3}: single {row['single']['writes_per_sec']:>6} w/s "
+                  f"({row['single']['commits']} commits)  group {row['group']['writes_per_sec']:>6} w/s "
+                  f"({row['group']['commits']} commits)  x{row['speedup']:.2f}")
+    finally:
+        engine.dispose()
+        os.remove(f"{workdir}/bench.db")
+        os.rmdir(workdir)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,39 @@
 #!/usr/bin/env python3
 """
 Script to start a server with specific configuration
-Usage: python start_server.py A  # Starts server A on port 8000
+Usage: python start_server.py A  # Starts server A on port 8000 (development, auto-reload)
        python start_server.py B  # Starts server B on port 8001
+       python start_server.py A --prod --workers 4  # Production: 4 workers + publisher sidecar
 """
 
-import sys
 import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
 import uvicorn
-from app.core.config import settings
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python start_server.py <server_id>")
-        print("Available servers: A, B, C, D")
-        sys.exit(1)
-    
-    server_id = sys.argv[1].upper()
-    
-    if server_id not in ["A", "B", "C", "D"]:
-        print(f"Invalid server ID: {server_id}")
-        print("Available servers: A, B, C, D")
-        sys.exit(1)
-    
-    # Set environment variables for the server
+SERVER_IDS = ["A", "B", "C", "D"]
+DEFAULT_PORTS = {"A": 8000, "B": 8001, "C": 8002, "D": 8003}
+
+
+def load_env_file(server_id):
+    """Export the server's .env file so this process and its children share it"""
     env_file = f".env.server_{server_id.lower()}"
     if os.path.exists(env_file):
-        # Load environment variables from file
         with open(env_file, 'r') as f:
             for line in f:
                 if '=' in line and not line.startswith('#'):
                     key, value = line.strip().split('=', 1)
-                    os.environ[key] = value.strip('"[]')
-    
-    # Override with command line server ID
-    os.environ['SERVER_ID'] = server_id
-    
-    # Determine port based on server ID
-    port_map = {"A": 8000, "B": 8001, "C": 8002, "D": 8003}
-    port = port_map.get(server_id, 8000)
-    
-    print(f"Starting server {server_id} on port {port}")
-    print(f"Server will consume events from: {os.environ.get('ALLOWED_SERVERS', 'B,C,D')}")
-    
-    # Start the server
+                    value = value.strip()
+                    # Drop surrounding quotes but keep JSON values such as ["B", "C", "D"] intact
+                    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+                        value = value[1:-1]
+                    os.environ[key] = value
+
+
+def run_dev(port):
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
@@ -52,5 +42,89 @@ def main():
         log_level="info"
     )
 
+
+def run_prod(port, workers):
+    """Run N uvicorn workers that publish through one sidecar process.
+
+    The sidecar owns the only broker connection for this server. On shutdown
+    uvicorn lets the workers finish in-flight requests first; the sidecar is
+    stopped afterwards so it can publish everything they handed over.
+    """
+    from app.core.config import settings
+    from app.core.rabbitmq import publisher_socket_path
+    from app.db.session import init_db
+
+    socket_path = publisher_socket_path()
+    sidecar = subprocess.Popen(
+        [sys.executable, "-m", "app.publisher_sidecar"],
+        env=dict(os.environ, PUBLISHER_MODE="direct")
+    )
+    deadline = time.time() + 30
+    while not os.path.exists(socket_path):
+        if sidecar.poll() is not None or time.time() > deadline:
+            print("Publisher sidecar failed to start - is the broker reachable?")
+            sidecar.kill()
+            sys.exit(1)
+        time.sleep(0.1)
+
+    # Create tables once here instead of racing from every worker
+    init_db()
+    os.environ['PUBLISHER_MODE'] = "sidecar"
+    os.environ['PUBLISHER_SOCKET'] = socket_path
+
+    print(f"Starting {workers} workers; events go through the publisher sidecar at {socket_path}")
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host="0.0.0.0",
+            port=port,
+            workers=workers,
+            log_level="info",
+            timeout_graceful_shutdown=settings.SHUTDOWN_TIMEOUT
+        )
+    finally:
+        if sidecar.poll() is None:
+            sidecar.send_signal(signal.SIGTERM)
+        try:
+            sidecar.wait(timeout=settings.SHUTDOWN_TIMEOUT + 5)
+        except subprocess.TimeoutExpired:
+            sidecar.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start a server of the distributed logistic system")
+    parser.add_argument("server_id", help="Server to start (A, B, C, D)")
+    parser.add_argument("--port", type=int, help="Port to listen on (default: SERVER_PORT or the A-D port map)")
+    parser.add_argument("--prod", action="store_true", help="Multi-worker production mode with a publisher sidecar")
+    parser.add_argument("--workers", type=int, help="Worker processes in --prod mode (default: WORKERS or one per CPU)")
+    args = parser.parse_args()
+
+    server_id = args.server_id.upper()
+
+    if server_id not in SERVER_IDS:
+        print(f"Invalid server ID: {server_id}")
+        print("Available servers: A, B, C, D")
+        sys.exit(1)
+
+    # Set environment variables for the server
+    load_env_file(server_id)
+
+    # Override with command line server ID
+    os.environ['SERVER_ID'] = server_id
+
+    # Port: command line, then the server's env file, then the default map
+    port = args.port or int(os.environ.get('SERVER_PORT', DEFAULT_PORTS[server_id]))
+    os.environ['SERVER_PORT'] = str(port)
+
+    print(f"Starting server {server_id} on port {port}")
+    print(f"Server will consume events from: {os.environ.get('ALLOWED_SERVERS', 'B,C,D')}")
+
+    if args.prod:
+        from app.core.config import settings
+        workers = args.workers or settings.WORKERS or os.cpu_count() or 1
+        run_prod(port, workers)
+    else:
+        run_dev(port)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()